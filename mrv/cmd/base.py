@@ -6,6 +6,8 @@ import subprocess
 from mrv.path import make_path, BasePath
 import logging
 import optparse
+import traceback
+import time
 
 log = logging.getLogger("mrv.cmd.base")
 
@@ -14,7 +16,8 @@ __docformat__ = "restructuredtext"
 __all__ = [ 'is_supported_maya_version', 'python_version_of', 'parse_maya_version', 'update_env_path', 
 			'maya_location', 'update_maya_environment', 'exec_python_interpreter', 'uses_mayapy', 
 			'exec_maya_binary', 'available_maya_versions', 'python_executable', 'find_mrv_script',
-			'log_exception', 'SpawnedHelpFormatter', 'SpawnedOptionParser', 'SpawnedCommand']
+			'log_exception', 'SpawnedHelpFormatter', 'SpawnedOptionParser', 'SpawnedCommand', 
+			'SpawnedJobError', 'SpawnedJob', 'SpawnedJobPool', 'SpawnedJobCommand']
 
 #{ Globals
 maya_to_py_version_map = {
@@ -578,6 +581,10 @@ class SpawnedCommand(object):
 	# additional arguments to pass on to the newly created process
 	_add_args = ['--mrv-no-maya']
 	
+	# arguments to pass to the executable before all others, i.e. the maya version 
+	# to launch. See `_exec_arguments` to compute them per spawn
+	_exec_args = list()
+	
 	# The usage of your command in BMF
 	# i.e. %prog [options]
 	k_usage = None
@@ -634,6 +641,12 @@ class SpawnedCommand(object):
 											prog=self.k_program_name, spawned=spawned)
 		self.log = logging.getLogger(self.k_program_name)
 		
+	@classmethod
+	def _exec_arguments(cls):
+		""":return: list of arguments to pass to the executable before all others, 
+			by default our _exec_args"""
+		return list(cls._exec_args)
+		
 	@classmethod
 	def spawn(cls, *args, **kwargs):
 		"""Spawn a new standalone process of this command type
@@ -644,7 +657,9 @@ class SpawnedCommand(object):
 		
 		Returns: Subprocess.Popen instance"""
 		import spcmd
-		margs = [cls._exec_path, spcmd.__file__, cls.k_class_path]
+		margs = [cls._exec_path]
+		margs.extend(cls._exec_arguments())
+		margs.extend((spcmd.__file__, cls.k_class_path))
 		margs.extend(args)
 		margs.extend(cls._add_args)
 		
@@ -880,7 +895,355 @@ class SpawnedCommand(object):
 			option groups themselves after calling the base class implementation"""
 		return self.parser
 	#} END needing subclass
+	
+
+#{ Jobs
+
+class SpawnedJobError(Exception):
+	"""Raised if a job failed, or didn't finish in time"""
+
+
+class SpawnedJob(object):
+	"""Future representing a job which is processed in the background by a 
+	`SpawnedJobCommand`, as scheduled by a `SpawnedJobPool`.
+	
+	The job is described by a plain file whose contents are only known to the 
+	command. The command reports the job's progress, result and errors in the 
+	job's status file, which is the path of the job file with '.status' appended.
+	It contains one 'progress <float>', 'done <result>' or 'error <message>' 
+	entry per line.
+	
+	:note: all queries update the pool, which allows it to start queued jobs"""
+	__slots__ = ('pool', 'jobfile', 'process', '_status')
+	
+	k_status_ext = '.status'
+	
+	def __init__(self, pool, jobfile):
+		self.pool = pool
+		self.jobfile = jobfile
+		self.process = None		# set once the pool started the job
+		self._status = None		# tuple(progress, result, error) once we are done
+		
+	def __repr__(self):
+		return "SpawnedJob(%r)" % self.jobfile
+		
+	@classmethod
+	def status_file(cls, jobfile):
+		""":return: path to the status file of the given job file"""
+		return jobfile + cls.k_status_ext
+		
+	def _read_status(self):
+		""":return: tuple(progress, result, error) as found in our status file. 
+		result and error are None if they have not been reported yet"""
+		progress, result, error = 0.0, None, None
+		try:
+			fp = open(self.status_file(self.jobfile), 'r')
+		except IOError:
+			return progress, result, error
+		# END handle missing status
+		
+		try:
+			for line in fp:
+				tokens = line.rstrip('\n').split(' ', 1)
+				if len(tokens) != 2:
+					continue
+				key, value = tokens
+				if key == 'progress':
+					try:
+						progress = float(value)
+					except ValueError:
+						pass
+					# END ignore partial writes
+				elif key == 'done':
+					result = value
+					progress = 1.0
+				elif key == 'error':
+					error = (error and error + '\n' + value) or value
+				# END handle key
+			# END for each line
+		finally:
+			fp.close()
+		# END assure file gets closed
+		return progress, result, error
+	
+	def _finish(self, status=None):
+		"""Mark the job done with the given status or with the one we read"""
+		if status is None:
+			progress, result, error = self._read_status()
+			if result is None and error is None:
+				code = self.process.returncode
+				error = "Job was not processed, worker exited with code %s" % code
+			# END handle crashed workers
+			status = (progress, result, error)
+		# END read status
+		self._status = status
+	
+	#{ Interface
+	
+	def running(self):
+		""":return: True if the job is currently being processed"""
+		self.pool.poll()
+		return self.process is not None and self._status is None
+	
+	def done(self):
+		""":return: True if the job finished, was cancelled or failed"""
+		self.pool.poll()
+		return self._status is not None
+	
+	def progress(self):
+		""":return: float from 0.0 to 1.0 indicating the progress of the job, 
+		as reported by the worker"""
+		self.pool.poll()
+		if self._status is not None:
+			return self._status[0]
+		if self.process is None:
+			return 0.0
+		return self._read_status()[0]
+		
+	def error(self):
+		""":return: None if the job is not done yet or succeeded, the error 
+		message otherwise"""
+		if not self.done():
+			return None
+		return self._status[2]
+		
+	def result(self, timeout=None):
+		"""Wait for the job to finish
+		
+		:param timeout: if not None, the amount of seconds to wait at most
+		:return: result string as reported by the worker
+		:raise SpawnedJobError: if the job failed or didn't finish in time"""
+		st = time.time()
+		while not self.done():
+			if timeout is not None and time.time() - st >= timeout:
+				raise SpawnedJobError("Job %s did not finish within %f s" % (self.jobfile, timeout))
+			# END handle timeout
+			time.sleep(self.pool.poll_interval)
+		# END wait for job
+		
+		error = self._status[2]
+		if error is not None:
+			raise SpawnedJobError("Job %s failed: %s" % (self.jobfile, error))
+		return self._status[1]
+		
+	def cancel(self):
+		"""Cancel the job if it was not started yet
+		
+		:return: True if the job was cancelled"""
+		return self.pool.cancel(self)
+	
+	#} END interface
+
+
+class SpawnedJobPool(object):
+	"""Processes job files using a limited amount of processes of the given 
+	`SpawnedJobCommand` type, which are started using its spawn method.
+	
+	Queued jobs are distributed among the available worker slots, each worker 
+	processes its jobs one after another. The pool does not use threads, 
+	instead it is updated whenever the state of a job or the pool is queried
+	
+	>>> pool = SpawnedJobPool(MyJobCommand, max_workers=4)
+	>>> jobs = pool.submit(*jobfiles)
+	>>> print [job.result() for job in jobs]"""
+	__slots__ = ('command', 'max_workers', 'popen_kwargs', 'poll_interval', '_queue', '_workers', '_batches')
+	
+	def __init__(self, command, max_workers=2, poll_interval=0.05, **kwargs):
+		"""
+		:param command: SpawnedJobCommand type whose spawn method will be used to 
+			start a worker process
+		:param max_workers: maximum amount of worker processes to run at once
+		:param poll_interval: time in seconds to sleep between polls when waiting
+		:param kwargs: passed to the spawn method of the command, and thus to
+			subprocess.Popen"""
+		if max_workers < 1:
+			raise ValueError("Need at least one worker, got %i" % max_workers)
+		# END check max workers
+		self.command = command
+		self.max_workers = max_workers
+		self.popen_kwargs = kwargs
+		self.poll_interval = poll_interval
+		self._queue = list()		# jobs waiting to be processed
+		self._workers = list()		# list(tuple(process, list(job, ...)), ...)
+		self._batches = list()		# list(tuple(list(job, ...), on_done), ...)
+		
+	def _finish_batches(self):
+		"""Call the on_done callbacks of all submissions whose jobs are done"""
+		for batch in self._batches[:]:
+			jobs, on_done = batch
+			if [job for job in jobs if job._status is None]:
+				continue
+			self._batches.remove(batch)
+			on_done(jobs)
+		# END for each batch
+		
+	def _start_workers(self):
+		"""Distribute queued jobs among the free worker slots"""
+		free = self.max_workers - len(self._workers)
+		while free and self._queue:
+			count = (len(self._queue) + free - 1) / free
+			jobs = self._queue[:count]
+			del(self._queue[:count])
+			
+			process = self.command.spawn(*[job.jobfile for job in jobs], **self.popen_kwargs)
+			for job in jobs:
+				job.process = process
+			# END for each job
+			self._workers.append((process, jobs))
+			free -= 1
+		# END while there are free slots
+	
+	#{ Interface
+	
+	def submit(self, *jobfiles, **kwargs):
+		"""Queue the given job files for processing
+		
+		:param kwargs: 
+			 * on_done:
+			 	callable receiving the list of SpawnedJob instances of this call once 
+			 	all of them are done, failed or were cancelled. It is called while 
+			 	the pool is updated
+		:return: list of SpawnedJob instances, one for each job file
+		:note: existing status files of the jobs will be removed"""
+		on_done = kwargs.pop('on_done', None)
+		if kwargs:
+			raise TypeError("Unexpected keyword arguments: %s" % ', '.join(kwargs.keys()))
+		# END check arguments
+		
+		jobs = list()
+		for jobfile in jobfiles:
+			statusfile = SpawnedJob.status_file(jobfile)
+			if os.path.isfile(statusfile):
+				os.remove(statusfile)
+			# END remove previous status
+			jobs.append(SpawnedJob(self, jobfile))
+		# END for each job file
+		self._queue.extend(jobs)
+		if on_done is not None:
+			self._batches.append((jobs, on_done))
+		# END handle callback
+		self.poll()
+		return jobs
+		
+	def poll(self):
+		"""Update the state of all running jobs and start queued ones if worker 
+		slots became available"""
+		for worker in self._workers[:]:
+			process, jobs = worker
+			exited = process.poll() is not None
+			for job in jobs:
+				if job._status is not None:
+					continue
+				if exited:
+					job._finish()
+				else:
+					status = job._read_status()
+					if status[1] is not None or status[2] is not None:
+						job._finish(status)
+					# END handle job done
+				# END handle exited worker
+			# END for each job
+			if exited:
+				self._workers.remove(worker)
+			# END remove finished worker
+		# END for each worker
+		self._finish_batches()
+		self._start_workers()
+		
+	def cancel(self, job):
+		"""Cancel the given job if it was not started yet
+		
+		:return: True if the job was cancelled"""
+		if job not in self._queue:
+			return False
+		self._queue.remove(job)
+		job._finish((0.0, None, "Job was cancelled"))
+		self._finish_batches()
+		return True
+		
+	def pending(self):
+		""":return: amount of jobs which are queued or being processed"""
+		self.poll()
+		count = len(self._queue)
+		for process, jobs in self._workers:
+			count += len([job for job in jobs if job._status is None])
+		# END for each worker
+		return count
+		
+	def wait(self, timeout=None):
+		"""Wait until all jobs are done
+		
+		:param timeout: if not None, the amount of seconds to wait at most
+		:return: True if all jobs are done, False if the timeout was hit"""
+		st = time.time()
+		while self.pending():
+			if timeout is not None and time.time() - st >= timeout:
+				return False
+			# END handle timeout
+			time.sleep(self.poll_interval)
+		# END while there are pending jobs
+		return True
+	
+	#} END interface
+
+
+class SpawnedJobCommand(SpawnedCommand):
+	"""Command processing all job files passed to it on the commandline, as 
+	spawned by a `SpawnedJobPool`.
+	
+	Derived types must implement ``process_job``, see `SpawnedJob` for the 
+	protocol used to report the results"""
+	__slots__ = tuple()
+	
+	k_usage = "%prog jobfile [jobfile ...]"
+	
+	def _process(self, jobfile):
+		"""Process the given job file and write the results to its status file"""
+		status = open(SpawnedJob.status_file(jobfile), 'a')
+		def progress(value):
+			status.write("progress %f\n" % value)
+			status.flush()
+		# END utility
+		
+		try:
+			try:
+				result = self.process_job(jobfile, progress)
+			except Exception:
+				self.log.error("Failed to process job %s" % jobfile, exc_info=True)
+				for line in traceback.format_exc().splitlines():
+					status.write("error %s\n" % line)
+				# END for each line
+			else:
+				status.write("done %s\n" % (result or ''))
+			# END handle errors
+		finally:
+			status.close()
+		# END assure file gets closed
+	
+	@log_exception
+	def execute(self, options, args):
+		if not args:
+			raise ValueError("Please specify at least one job file")
+		# END check args
+		
+		for jobfile in args:
+			self._process(jobfile)
+		# END for each job file
+		
+	#{ Overridable
+	
+	def process_job(self, jobfile, progress):
+		"""Process the given job
+		
+		:param jobfile: path to the plain file describing the job
+		:param progress: function taking a float from 0.0 to 1.0 which should be 
+			called to report the progress of the job
+		:return: single-line string representing the result of the job, i.e. 
+			the path to an output file
+		:note: raise an exception to indicate failure"""
+		raise NotImplementedError("To be implemented by subclass")
 		
+	#} END overridable
 		
-#} END classes
+#} END jobs
 
@@ -25,8 +25,179 @@ def _isRootOf( root, other ):
 	:note: the arguments are very specific, but this allows the method 
 		to be faster than usual"""
 	return (other+':').startswith(root)
+	
+def _melString( value ):
+	""":return: value as quoted mel string"""
+	return '"%s"' % value.replace( '\\', '\\\\' ).replace( '"', '\\"' )
+	
+def _namespaceSnapshot( ):
+	""":return: set of the absolute names of all namespaces in the scene, including 
+		the root namespace, but not the default namespaces"""
+	try:
+		names = noneToList( cmds.namespaceInfo( Namespace.rootpath, listOnlyNamespaces=1, recurse=1 ) )
+	except (TypeError, RuntimeError):
+		# maya doesn't support recursive listings - walk the hierarchy
+		names = RootNamespace.childrenDeep()
+	# END handle maya support
+	
+	snapshot = set( ( RootNamespace, ) )
+	for name in names:
+		ns = Namespace( name )
+		if ns.toRelative().split( Namespace._sep )[0] in Namespace._defaultns:
+			continue
+		snapshot.add( ns )
+	# END for each name
+	return snapshot
+	
+def _planCreation( namespace, existing, plan ):
+	"""Append ( parent, basename ) tuples to the plan list for the given namespace and 
+	all of its parents which are not in the existing set. Planned namespaces will 
+	be added to the existing set"""
+	tokens = namespace.split( namespace._sep )
+	for i in range( 1, len( tokens ) ):
+		base = Namespace( namespace._sep.join( tokens[:i+1] ) )
+		if base in existing:
+			continue
+		existing.add( base )
+		plan.append( ( base.parent(), base.basename() ) )
+	# END for each token
 #} END internal utilities
 
+#{ Namespace Index
+
+class _NamespaceIndex( object ):
+	"""Maps relative namespace names to the MObjects of the nodes they directly contain.
+
+	The index is built in one pass over all nodes of the scene. Adding, removing
+	or renaming any node invalidates it, which causes it to be rebuilt with the
+	next lookup"""
+	__slots__ = ( 'nodes', 'callbackIDs' )
+
+	def __init__( self ):
+		self.nodes = None		# relative namespace -> list( MObject, ... )
+		self.callbackIDs = ( 	api.MDGMessage.addNodeAddedCallback( self._nodeChanged ),
+								api.MDGMessage.addNodeRemovedCallback( self._nodeChanged ),
+								api.MNodeMessage.addNameChangedCallback( api.MObject(), self._nameChanged ) )
+
+	def _nodeChanged( self, node, clientData ):
+		self.nodes = None
+
+	def _nameChanged( self, node, prevName, clientData ):
+		self.nodes = None
+
+	@classmethod
+	def scan( cls ):
+		""":return: dict( relativeNamespace -> list( MObject, ... ) ) of all nodes in the scene,
+		the root namespace is ''"""
+		nodes = dict()
+		iterator = api.MItDependencyNodes()
+		mfndep = api.MFnDependencyNode()
+		setObject = mfndep.setObject
+		parentNamespace = mfndep.parentNamespace
+		thisNode = iterator.thisNode
+		isDone = iterator.isDone
+		next = iterator.next
+
+		while not isDone():
+			node = thisNode()
+			setObject( node )
+			ns = parentNamespace()
+			try:
+				nodes[ ns ].append( node )
+			except KeyError:
+				nodes[ ns ] = [ node ]
+			# END handle new namespace
+			next()
+		# END for each node
+		return nodes
+
+	def update( self ):
+		"""Rebuild the index if it was invalidated"""
+		if self.nodes is None:
+			self.nodes = self.scan()
+		# END rebuild index
+
+	def invalidate( self ):
+		self.nodes = None
+
+	def remove( self ):
+		"""Remove our callbacks"""
+		for callbackID in self.callbackIDs:
+			api.MMessage.removeCallback( callbackID )
+			if hasattr( callbackID, 'disown' ):
+				callbackID.disown()
+			# END prevent memory leak message
+		# END for each callback id
+
+	def namespaces( self, relativeNamespace, depth ):
+		""":return: list of relative namespace names we have nodes for, which are
+		relativeNamespace itself or its children up to the given depth
+		:param relativeNamespace: relative name of the namespace, '' for root
+		:param depth: see `Namespace.iterNodes`"""
+		self.update()
+		if depth == 0:
+			if relativeNamespace in self.nodes:
+				return [ relativeNamespace ]
+			return list()
+		# END handle depth 0
+
+		rval = list()
+		if relativeNamespace:
+			prefix = relativeNamespace + ':'
+			offset = relativeNamespace.count( ':' )
+			for ns in self.nodes:
+				if ns != relativeNamespace:
+					if not ns.startswith( prefix ):
+						continue
+					if depth > -1 and ns.count( ':' ) - offset > depth:
+						continue
+				# END handle child namespaces
+				rval.append( ns )
+			# END for each namespace
+		else:
+			for ns in self.nodes:
+				if depth > -1 and ns and ns.count( ':' ) + 1 > depth:
+					continue
+				rval.append( ns )
+			# END for each namespace
+		# END handle root
+		return rval
+
+	def iterNodes( self, relativeNamespace, depth ):
+		""":return: iterator yielding the MObjects of all nodes in the given namespace
+			and its children up to the given depth
+		:param relativeNamespace: see `namespaces`"""
+		namespaces = self.namespaces( relativeNamespace, depth )
+		nodes = self.nodes
+		for ns in namespaces:
+			for node in nodes[ ns ]:
+				yield node
+		# END for each namespace
+
+# the index is created on first use
+_namespaceIndexInstance = None
+
+def _namespaceIndex( ):
+	""":return: up-to-date _NamespaceIndex of the current scene"""
+	global _namespaceIndexInstance
+	if _namespaceIndexInstance is None:
+		_namespaceIndexInstance = _NamespaceIndex()
+		import atexit
+		atexit.register( _removeNamespaceIndex )
+	# END create index
+	_namespaceIndexInstance.update()
+	return _namespaceIndexInstance
+	
+def _removeNamespaceIndex( ):
+	"""Remove the index and its callbacks, it will be recreated on next use"""
+	global _namespaceIndexInstance
+	if _namespaceIndexInstance is None:
+		return
+	_namespaceIndexInstance.remove()
+	_namespaceIndexInstance = None
+
+#} END namespace index
+
 class Namespace( unicode, iDagItem ):
 	""" Represents a Maya namespace
 	Namespaces follow the given nameing conventions:
@@ -215,6 +386,127 @@ class Namespace( unicode, iDagItem ):
 		return self
 
 	#} END edit methods
+	
+	#{ Bulk Edit Methods
+	
+	@classmethod
+	@undo.undoable
+	def createMany( cls, namespaceNames ):
+		"""Create all given namespaces in one undoable step
+		
+		:param namespaceNames: iterable of namespace names, see `create`
+		:return: list of Namespace objects, one for each of the given names
+		:note: existing namespaces and duplicates are ignored"""
+		existing = _namespaceSnapshot()
+		plan = list()
+		out = list()
+		for name in namespaceNames:
+			newns = cls( name )
+			_planCreation( newns, existing, plan )
+			out.append( newns )
+		# END for each name
+		
+		mod = undo.DGModifier()
+		for parent, basename in plan:
+			mod.commandToExecute( "namespace -p %s -add %s" % ( _melString( parent ), _melString( basename ) ) )
+		mod.doIt()
+		return out
+	
+	@classmethod
+	@undo.undoable
+	def moveNodesMany( cls, moves, force = True, autocreate = True ):
+		"""Move the objects of many namespaces in one undoable step, see `moveNodes`
+		
+		:param moves: iterable of ( sourceNamespace, targetNamespace ) tuples. The moves
+			are performed in order
+		:param force: if True, name clashes will be resolved by renaming
+		:param autocreate: if True, target namespaces will be created if they do not 
+			exist yet
+		:raise ValueError: if a source namespace, or a target namespace if autocreate 
+			is False, does not exist. In that case, nothing will be changed"""
+		existing = _namespaceSnapshot()
+		plan = list()
+		pairs = list()
+		for source, target in moves:
+			source, target = cls( source ), cls( target )
+			if source not in existing:
+				raise ValueError( "Namespace %s does not exist" % source )
+			if target not in existing:
+				if not autocreate:
+					raise ValueError( "Namespace %s does not exist" % target )
+				_planCreation( target, existing, plan )
+			# END handle missing target
+			pairs.append( ( source, target ) )
+		# END for each move
+		
+		mod = undo.DGModifier()
+		for parent, basename in plan:
+			mod.commandToExecute( "namespace -p %s -add %s" % ( _melString( parent ), _melString( basename ) ) )
+		flags = ( force and "-force " ) or ""
+		for source, target in pairs:
+			mod.commandToExecute( "namespace %s-mv %s %s" % ( flags, _melString( source ), _melString( target ) ) )
+		mod.doIt()
+		
+	@classmethod
+	@undo.undoable
+	def deleteMany( cls, namespaces, move_to_namespace = rootpath, autocreate = True ):
+		"""Delete many namespaces and their sub-namespaces in one undoable step, see `delete`
+		
+		:param namespaces: iterable of namespaces to delete, namespaces which do not 
+			exist are ignored
+		:param move_to_namespace: if None, the namespaces to be deleted must be empty.
+			Otherwise their objects will be moved into it prior to deletion
+		:param autocreate: if True, move_to_namespace will be created if it does not exist yet
+		:raise ValueError: if the root namespace should be deleted, or if move_to_namespace 
+			would be deleted or does not exist"""
+		existing = _namespaceSnapshot()
+		deleted = set()
+		for ns in namespaces:
+			ns = cls( ns )
+			if ns == cls.rootpath:
+				raise ValueError( "Cannot delete root namespace" )
+			if ns not in existing:
+				continue
+			
+			prefix = ns + ns._sep
+			deleted.add( ns )
+			for other in existing:
+				if other.startswith( prefix ):
+					deleted.add( other )
+			# END for each existing namespace
+		# END for each namespace
+		
+		plan = list()
+		if move_to_namespace:
+			move_to_namespace = cls( move_to_namespace )
+			for ns in deleted:
+				if _isRootOf( ns.toRelative() + ns._sep, move_to_namespace.toRelative() ):
+					raise ValueError( "Cannot move objects into namespace %s as it will be deleted" % move_to_namespace )
+			# END for each deleted namespace
+			if move_to_namespace not in existing:
+				if not autocreate:
+					raise ValueError( "Namespace %s does not exist" % move_to_namespace )
+				_planCreation( move_to_namespace, existing, plan )
+			# END handle missing target
+		# END handle move target
+		
+		mod = undo.DGModifier()
+		for parent, basename in plan:
+			mod.commandToExecute( "namespace -p %s -add %s" % ( _melString( parent ), _melString( basename ) ) )
+		
+		# the current namespace cannot be removed
+		if cls.current() in deleted:
+			mod.commandToExecute( "namespace -set %s" % _melString( cls.rootpath ) )
+		
+		# children first
+		for ns in sorted( deleted, key = lambda ns: ns.count( ns._sep ), reverse = True ):
+			if move_to_namespace:
+				mod.commandToExecute( "namespace -force -mv %s %s" % ( _melString( ns ), _melString( move_to_namespace ) ) )
+			mod.commandToExecute( "namespace -rm %s" % _melString( ns ) )
+		# END for each namespace to delete
+		mod.doIt()
+		
+	#} END bulk edit methods
 
 	def parent( self ):
 		""":return: parent namespace of this instance"""
@@ -271,6 +563,29 @@ class Namespace( unicode, iDagItem ):
 				return testns
 		# END while loop
 		raise AssertionError("Should never get here")
+		
+	@classmethod
+	def findUniqueMany( cls, basenames, incrementFunc = defaultIncrFunc ):
+		"""Find unique namespaces for all given basenames, see `findUnique`
+		
+		:return: list of unique namespaces, one for each basename. They do neither 
+			exist in the scene, nor do they clash with each other
+		:note: uses one snapshot of the existing namespaces instead of testing 
+			each candidate for existence"""
+		taken = _namespaceSnapshot()
+		out = list()
+		for basename in basenames:
+			i = 0
+			while True:
+				testns = cls( incrementFunc( basename, i ) )
+				i += 1
+				if testns not in taken:
+					break
+			# END while loop
+			taken.add( testns )
+			out.append( testns )
+		# END for each basename
+		return out
 
 	def exists( self ):
 		""":return: True if this namespace exists"""
@@ -373,9 +688,9 @@ class Namespace( unicode, iDagItem ):
 			 	you will receive MDagPaths or MObjects depending on the 'dag' kwarg
 			 	
 			 * dag: 
-			 	if True, default False, only dag nodes will be returned, otherwise you will 
-				receive dag nodes and dg nodes. Instance information will be lost on the way
-				though.
+			 	if True, default False, only dag nodes will be returned, once for each of 
+			 	their instances. Otherwise you will receive dag nodes and dg nodes, and 
+			 	instance information will be lost on the way.
 				
 			 * depth: 
 			 	if 0, default 0, only objects in this namespace will be returned
@@ -383,6 +698,13 @@ class Namespace( unicode, iDagItem ):
 				if -1, all subnamespaces will be included as well, the depth is unlimited
 				
 				if 0<depth<x include all objects up to the 'depth' subnamespace
+				
+			 * index:
+			 	if True, default True, the nodes will be retrieved from an index of all 
+			 	namespaces which is built in one pass over the scene and kept until nodes 
+			 	are added, removed or renamed. It is not used if kwargs for `iterDagNodes` 
+			 	or `iterDgNodes` other than the ones listed here are given.
+			 	Nodes will be returned in creation order rather than in hierarchy order.
 		:note: this method is quite similar to `FileReference.iterNodes`, but 
 			has a different feature set and needs this code here for maximum performance"""
 		import nt
@@ -391,12 +713,39 @@ class Namespace( unicode, iDagItem ):
 		predicate = kwargs.pop('predicate', lambda n: True)
 		depth = kwargs.pop('depth', 0)
 		
+		if kwargs.pop('index', True) and not [k for k in kwargs if k != 'asNode']:
+			for n in self._iterIndexedNodes(args, dag, asNode, predicate, depth):
+				yield n
+			return
+		# END use index
+		
 		# we handle node conversion
 		kwargs['asNode'] = False
 		pred = None
 		iter_type = None
-		nsGetRelativeTo = type(self).relativeTo
-		selfrela = self.toRelative()+':'
+		
+		# parentNamespace returns relative names, '' for the root namespace, which 
+		# contains all namespaces
+		selfrel = ''
+		if self != self.rootpath:
+			selfrel = self.toRelative()
+		# END handle root
+		selfprefix = ''
+		if selfrel:
+			selfprefix = selfrel + ':'
+		# END handle root
+		lenprefix = len(selfprefix)
+		
+		def inDepth(ns):
+			if ns == selfrel:		# its depth 0
+				return True
+			if not ns.startswith(selfprefix):
+				return False
+			
+			# one separator means two subpaths
+			return depth < 0 or ns[lenprefix:].count(':')+1 <= depth
+		# END utility
+		
 		if dag:
 			mfndag = api.MFnDagNode()
 			mfndagSetObject = mfndag.setObject
@@ -404,49 +753,19 @@ class Namespace( unicode, iDagItem ):
 			
 			def check_filter(n):
 				mfndagSetObject(n)
-				ns = mfndagParentNamespace()
-				if not _isRootOf(selfrela, ns):
-					return False
-				
-				# check depth
-				if depth > -1:
-					ns = Namespace(ns)
-					if self == ns:		# its depth 0
-						return True
-					
-					# one separator means two subpaths
-					if nsGetRelativeTo(ns, self).count(':')+1 > depth:
-						return False
-				# END handle depth
-				return True
+				return inDepth(mfndagParentNamespace())
 			# END filter
 			
 			iter_type = nt.it.iterDagNodes
 			pred = check_filter
 		else:
-			iter_type = nt.it.iterDgNodes
 			mfndep = api.MFnDependencyNode()
 			mfndepSetObject = mfndep.setObject
 			mfndepParentNamespace = mfndep.parentNamespace
 			
 			def check_filter(n):
 				mfndepSetObject(n)
-				ns = mfndepParentNamespace()
-				if not _isRootOf(selfrela, ns):
-					return False
-				# END first namespace check
-				
-				# duplicated to be as fast as possible
-				# check depth
-				if depth > -1:
-					ns = Namespace(ns)
-					if self == ns:		# its depth 0
-						return True
-					
-					if nsGetRelativeTo(ns, self).count(':')+1 > depth:
-						return False
-				# END handle depth
-				return True
+				return inDepth(mfndepParentNamespace())
 			# END filter
 			iter_type = nt.it.iterDgNodes
 			pred = check_filter
@@ -461,6 +780,51 @@ class Namespace( unicode, iDagItem ):
 			if predicate(n):
 				yield n
 		# END for each object to yield
+		
+	def _iterIndexedNodes( self, types, dag, asNode, predicate, depth ):
+		"""Implements `iterNodes` using the namespace index"""
+		import nt
+		NodeFromObj = nt.NodeFromObj
+		getAllPathsTo = api.MDagPath.getAllPathsTo
+		kDagNode = api.MFn.kDagNode
+		
+		selfrel = ''
+		if self != self.rootpath:
+			selfrel = self.toRelative()
+		# END handle root
+		
+		for n in _namespaceIndex().iterNodes(selfrel, depth):
+			if types:
+				for t in types:
+					if n.hasFn(t):
+						break
+				else:
+					continue
+				# END type filter
+			# END handle types
+			
+			if dag:
+				if not n.hasFn(kDagNode):
+					continue
+				
+				# yield all instances, like the dag iterator does
+				paths = api.MDagPathArray()
+				getAllPathsTo(n, paths)
+				for i in xrange(paths.length()):
+					path = api.MDagPath(paths[i])
+					if asNode:
+						path = NodeFromObj(path)
+					if predicate(path):
+						yield path
+				# END for each instance
+				continue
+			# END handle dag nodes
+			
+			if asNode:
+				n = NodeFromObj(n)
+			if predicate(n):
+				yield n
+		# END for each indexed node
 	#} END object retrieval
 	
 
@@ -25,6 +25,7 @@ import inspect
 import itertools
 import it
 import os
+import array
 
 # Doesnt need all as it is just a utility package containing patches that are applies
 # to API classes
@@ -503,8 +504,15 @@ class MPlug( api.MPlug ):
 			has to be broken to achieve that.
 			If False, the connection will fail if destplug is already connected to another plug
 		:return: destplug allowing chained connections a.connectTo(b).connectTo(c)
-		:raise RuntimeError: If destination is already connected and force = False"""
-		mod = undo.DGModifier( )
+		:raise RuntimeError: If destination is already connected and force = False
+		:note: within an `undo.Transaction`, the connection is deferred until the 
+			transaction is flushed, which is when errors will be raised"""
+		transaction = undo.Transaction.active()
+		if transaction is not None:
+			mod = transaction.modifier()
+		else:
+			mod = undo.DGModifier( )
+		# END handle transaction
 
 		# is destination already input-connected ? - disconnect it if required
 		# Optimization: We only care if force is specified. It will fail otherwise
@@ -521,6 +529,9 @@ class MPlug( api.MPlug ):
 			# END destination is connected
 		# END force mode
 		mod.connect( self, destplug )	# finally do the connection
+		if transaction is not None:
+			return destplug
+		# END deferred connection
 		
 		try:
 			mod.doIt( )
@@ -753,7 +764,14 @@ class MPlug( api.MPlug ):
 		""":return: index of logical indexed plug that does not yet exist
 		:note: as this method does a thorough search, it is relatively slow
 			compared to a simple numPlugs + 1 algorithm
+		:note: within a `base.LogicalIndexAllocation` block, the index is retrieved
+			from a shared `base.LogicalIndexAllocator` in constant time
 		:note: only makes sense for array plugs"""
+		allocator = base.LogicalIndexAllocator.active(self)
+		if allocator is not None:
+			return allocator.nextIndex()
+		# END use allocator
+		
 		indices = api.MIntArray()
 		self.getExistingArrayAttributeIndices( indices )
 
@@ -779,6 +797,16 @@ class MPlug( api.MPlug ):
 		""":return: plug at newly created logical index
 		:note: only valid for array plugs"""
 		return self.elementByLogicalIndex(self.mnextLogicalIndex())
+		
+	def mnextLogicalPlugs( self, count ):
+		""":return: list of count plugs at consecutive logical indices which do not 
+			yet exist. The existing indices are only read once.
+		:note: only valid for array plugs"""
+		allocator = base.LogicalIndexAllocator.active(self)
+		if allocator is None:
+			allocator = base.LogicalIndexAllocator(self)
+		# END get allocator
+		return allocator.nextPlugs(count)
 
 	def mwrappedAttribute( self ):
 		""":return: Attribute instance of our underlying attribute"""
@@ -859,7 +887,14 @@ if int(os.environ.get('MRV_DEBUG_MPLUG_SETX', 0)):
 class ArrayBase( Abstract ):
 	""" Base class for all maya arrays to easily fix them
 	
-	:note: set _apicls class variable to your api base class """
+	:note: set _apicls class variable to your api base class 
+	:note: set the _bulk* class variables to support bulk construction through `mfromBulk`"""
+	
+	# MScriptUtil method returning a pointer as taken by the array constructor, 
+	# the array.array typecode of the values, and the amount of values per element
+	_bulkPtrGetter = None
+	_bulkTypecode = None
+	_bulkValuesPerElement = 1
 
 	def __len__( self ):
 		return self._apicls.length( self )
@@ -871,6 +906,10 @@ class ArrayBase( Abstract ):
 	@classmethod
 	def mfromMultiple(cls, *args):
 		""":return: Array created from the given elements"""
+		if cls._bulkPtrGetter is not None and cls._bulkValuesPerElement == 1:
+			return cls.mfromBulk(args)
+		# END use bulk construction
+		
 		ia = cls()
 		ia.setLength(len(args))
 		
@@ -893,9 +932,55 @@ class ArrayBase( Abstract ):
 			append(index)
 		return ia
 	
+	@classmethod
+	def mfromBulk(cls, values):
+		"""
+		:return: Array created from all values at once through an MScriptUtil pointer, 
+			which is much faster than adding them one by one
+		:param values: list, tuple, xrange or array.array of values, or a buffer whose 
+			contents are native values of the array's type. Compound elements, like MPoints, 
+			are given by consecutive values, i.e. x, y, z, w
+		:raise ValueError: if the amount of values does not fit the element size
+		:note: falls back to `mfromList` if the array type does not support bulk construction"""
+		if isinstance(values, buffer) or hasattr(values, 'tobytes'):
+			native = array.array(cls._bulkTypecode or 'd')
+			if isinstance(values, buffer):
+				native.fromstring(str(values))
+			else:
+				native.fromstring(values.tobytes())
+			# END handle buffer type
+			values = native
+		# END handle buffers
+		
+		if isinstance(values, array.array):
+			values = values.tolist()
+		elif not isinstance(values, list):
+			values = list(values)
+		# END convert to list
+		
+		if cls._bulkPtrGetter is None:
+			return cls.mfromList(values)
+		# END handle unsupported types
+		
+		count = len(values)
+		if count % cls._bulkValuesPerElement:
+			raise ValueError("Amount of values (%i) must be a multiple of %i" % (count, cls._bulkValuesPerElement))
+		if not count:
+			return cls()
+		# END handle empty arrays
+		
+		su = api.MScriptUtil()
+		su.createFromList(values, count)
+		return cls(getattr(su, cls._bulkPtrGetter)(), count / cls._bulkValuesPerElement)
+	
 	@classmethod
 	def mfromList(cls, list):
-		""":return: Array created from the given list of elements"""
+		""":return: Array created from the given list of elements
+		:note: uses `mfromBulk` for arrays of plain values if possible"""
+		if cls._bulkPtrGetter is not None and cls._bulkValuesPerElement == 1:
+			return cls.mfromBulk(list)
+		# END use bulk construction
+		
 		ia = cls()
 		ia.setLength(len(list))
 		
@@ -971,6 +1056,9 @@ class MPointArray( api.MPointArray, ArrayBase ):
 	
 	:note: for performance reasons, we do not provide negative index support"""
 	_apicls = api.MPointArray
+	_bulkPtrGetter = 'asDouble4Ptr'
+	_bulkTypecode = 'd'
+	_bulkValuesPerElement = 4
 	
 	def __iter__( self ):
 		""":return: iterator object"""
@@ -1015,6 +1103,8 @@ class MFloatPointArray( api.MFloatPointArray, ArrayBase ):
 class MDoubleArray( api.MDoubleArray, ArrayBase ):
 	""":note: for performance reasons, we do not provide negative index support"""
 	_apicls = api.MDoubleArray
+	_bulkPtrGetter = 'asDoublePtr'
+	_bulkTypecode = 'd'
 	
 	def __iter__( self ):
 		""":return: iterator object"""
@@ -1035,35 +1125,23 @@ class MFloatArray( api.MFloatArray, ArrayBase ):
 class MIntArray( api.MIntArray, ArrayBase ):
 	"""Attach additional creator functions"""
 	_apicls = api.MIntArray
+	_bulkPtrGetter = 'asIntPtr'
+	_bulkTypecode = 'i'
 	
 	@classmethod
-	def mfromRange(cls, i, j):
+	def mfromRange(cls, i, j, step=1):
 		""":return: An MIntArray initialized with integers ranging from i to j
 		:param i: first integer of the returned array
-		:param j: last integer of returned array will have the value j-1"""
+		:param j: last integer of returned array will have the value j-1
+		:param step: distance between two consecutive integers"""
 		if j < i:
 			raise ValueError("j < i violated")
 		if j < 0 or i < 0:
 			raise ValueError("negative ranges are not supported")
+		if step < 1:
+			raise ValueError("step must be positive")
 		
-		ia = api.MIntArray()
-		l = j - i
-		ia.setLength(l)
-		
-		# wouldn't it be great to have a real for loop now ?
-		ci = 0
-		set = ia.set
-		for i in xrange(i, j):
-			set(i, ci)
-			ci += 1
-		# END for each integer
-		
-		# this is slightly slower
-		#for ci, i in enumerate(xrange(i, j)):
-		#	ia[ci] = i
-		# END for each index/value pair
-		
-		return ia
+		return cls.mfromBulk(range(i, j, step))
 
 
 class MSelectionList( api.MSelectionList, ArrayBase ):
@@ -25,6 +25,7 @@ log = logging.getLogger("mrv.maya.nt.base")
 from maya.OpenMaya import MFnDagNode, MDagPath, MObject, MObjectHandle
 
 from itertools import chain
+import array
 import sys
 
 _nodesdict = None				# will be set during maya.nt initialization
@@ -34,7 +35,9 @@ __all__ = ("nodeTypeToNodeTypeCls", "isAbsolutePath", "toApiobj", "toApiobjOrDag
            "toSelectionList", "toComponentSelectionList", "toSelectionListFromNames", 
            "fromSelectionList", "toNodesFromNames", "findByName", "objExists", 
            "delete", "selection", "activeSelectionList", "iterSelection", "select", 
-           "createNode", "SetFilter", "Node", "NodeFromObj", "NodeFromStr", 
+           "createNode", "createNodes", "SetFilter", "LogicalIndexAllocator", "LogicalIndexAllocation", 
+           "componentAssignmentsMany", 
+           "Node", "NodeFromObj", "NodeFromStr", 
            "DependNode", "Entity", "DagNode", "Attribute", "UnitAttribute", "TypedAttribute", 
            "NumericAttribute", "MessageAttribute", "MatrixAttribute", "LightDataAttribute", 
            "GenericAttribute", "EnumAttribute", "CompoundAttribute", "Data", "VectorArrayData", 
@@ -321,11 +324,18 @@ def delete(*args, **kwargs):
 		 
 		Using this flag will be slower, but yields much better results if deleting complex
 		dag and dependency trees with locked attributes, conversion nodes, transforms and shapes
+		 * bulk:
+		 	if True, default False, all nodes will be deleted by a single modifier
+		 	which is much faster when deleting many nodes. Dag nodes whose parents
+		 	are deleted as well will be skipped as they are deleted implicitly.
+		 	Implies presort
 	:note: in general , no matter which options have been chosen , api deletion does not work well
 		as the used algorithm is totally different and inferior to the mel implementaiton
 	:note: will not raise in case of an error, but print a notification message
 	:note: all deletions will be stored on one undo operation"""
 	presort = kwargs.get("presort", False)
+	bulk = kwargs.get("bulk", False)
+	presort = presort or bulk
 
 	# presort - this allows objects high up in the hierarchy to be deleted first
 	# Otherwise we might have trouble deleting the ones lower in the hierarchy
@@ -342,6 +352,22 @@ def delete(*args, **kwargs):
 				depnodes.append(node)
 		# END for each node in nodes for categorizing
 
+		if bulk:
+			# children go with their parents
+			paths = set(str(n) for n in dagnodes)
+			def hasDeletedParent(path):
+				index = path.rfind('|')
+				while index > 0:
+					path = path[:index]
+					if path in paths:
+						return True
+					index = path.rfind('|')
+				# END for each parent path
+				return False
+			# END utility
+			dagnodes = [n for n in dagnodes if not hasDeletedParent(str(n))]
+		# END prune dag nodes
+
 		# long paths first
 		dagnodes.sort(key = lambda n: len(str(n).split('|')), reverse = True)
 
@@ -349,18 +375,50 @@ def delete(*args, **kwargs):
 		nodes = chain(dagnodes, depnodes)
 	# END presorting
 
+	def deleteEach(nodes):
+		for node in nodes:
+			if not node.isValid():
+				continue
+	
+			try:
+				node.delete()
+			except RuntimeError:
+				log.error("Deletion of %s failed" % node)
+			# END exception handling
+		# END for each node to delete
+	# END utility
+
 	# NOTE: objects really want to be deleted individually - otherwise
 	# maya might just crash for some reason !!
-	for node in nodes:
-		if not node.isValid():
-			continue
-
+	# Within a transaction, the nodes' delete methods only queue the deletion. 
+	# If the modifier fails to delete all of them, the edits it applied are 
+	# undone, and we fall back to deleting the nodes individually
+	if not bulk:
+		deleteEach(nodes)
+		return
+	# END handle individual deletion
+	
+	nodes = list(nodes)
+	bulkFailed = False
+	transaction = undo.Transaction()
+	transaction.begin()
+	try:
+		deleteEach(nodes)
+	finally:
 		try:
-			node.delete()
+			transaction.flush()
 		except RuntimeError:
-			log.error("Deletion of %s failed" % node)
-		# END exception handling
-	# END for each node to delete
+			log.error("Bulk deletion failed, deleting nodes individually")
+			transaction.abort()
+			bulkFailed = True
+		else:
+			transaction.end()
+		# END apply bulk deletion
+	# END assure transaction ends
+	
+	if bulkFailed:
+		deleteEach(nodes)
+	# END handle failed bulk deletion
 
 def selection(filterType=api.MFn.kInvalid, **kwargs):
 	""":return: list of Nodes from the current selection
@@ -421,6 +479,17 @@ def select(*nodesOrSelectionList , **kwargs):
 	api.MGlobal.selectCommand(sellist , adjustment)
 
 
+def _discardCreatedNodes(transaction, nodes):
+	"""Delete the given nodes, which were queued for creation on the modifier of
+	the given transaction, using the same modifier. This way, neither the next 
+	flush nor redo will bring them back"""
+	transaction.flush()
+	modifier = transaction.modifier()
+	for node in reversed(nodes):
+		modifier.deleteNode(node)
+	# END for each node
+	transaction.flush()
+
 @undoable
 def createNode(nodename, nodetype, autocreateNamespace=True, renameOnClash = True,
 			     forceNewLeaf=True , maxShapesPerTransform = 0):
@@ -446,6 +515,8 @@ def createNode(nodename, nodetype, autocreateNamespace=True, renameOnClash = Tru
 	:raise RuntimeError: If nodename contains namespaces or parents that may not be created
 	:raise NameError: If name of desired node clashes as existing node has different type
 	:note: As this method is checking a lot and tries to be smart, its relatively slow (creates ~1200 nodes / s)
+	:note: within an `undo.Transaction`, the nodes are created using the transaction's 
+		modifier
 	:return: the newly create Node"""
 	if nodename in ('|', ''):
 		raise RuntimeError("Cannot create '|' or ''")
@@ -476,6 +547,13 @@ def createNode(nodename, nodetype, autocreateNamespace=True, renameOnClash = Tru
 	do_existence_checks = True
 	dgmod = None
 	dagmod = None
+	dgmod_createNode = None
+	created = list()		# nodes queued for creation on the transaction's modifier
+	transaction = undo.Transaction.active()
+	if transaction is not None:
+		dgmod_createNode = api.MDGModifier.createNode
+	# END handle transaction
+	
 	for i in xrange(start_index, lenSubpaths):						# first token always pipe, need absolute paths
 		nodepartialname = '|'.join(subpaths[0 : i+1])				# full path to the node so far
 		is_last_iteration = i == lenSubpaths - 1
@@ -523,6 +601,12 @@ def createNode(nodename, nodetype, autocreateNamespace=True, renameOnClash = Tru
 
 		if autocreateNamespace:
 			nsm.createNamespace(":".join(dagtoken.split(":")[0:-1]))	# will resolve to root namespace at least
+		
+		if transaction is not None:
+			# creating namespaces may have flushed the transaction, which provides 
+			# a new modifier in that case
+			dagmod = dgmod = transaction.modifier()
+		# END refresh modifier
 
 		# see whether we have to create a transform or the actual nodetype
 		actualtype = "transform"
@@ -545,6 +629,7 @@ def createNode(nodename, nodetype, autocreateNamespace=True, renameOnClash = Tru
 				newapiobj = dagmod.createNode(actualtype)							# create
 
 			dagmod.renameNode(newapiobj, dagtoken)									# rename
+			created.append(newapiobj)
 
 			parentnode = createdNode = newapiobj				# update parent
 		else:
@@ -557,7 +642,11 @@ def createNode(nodename, nodetype, autocreateNamespace=True, renameOnClash = Tru
 			# and recover
 			mod = dgmod
 			try:
-				newapiobj = dgmod.createNode(actualtype)								# create
+				if dgmod_createNode is None:
+					newapiobj = dgmod.createNode(actualtype)							# create
+				else:
+					newapiobj = dgmod_createNode(dgmod, actualtype)						# create dg node on dag modifier
+				# END handle transaction
 			except RuntimeError:
 				if dagmod is None:
 					dagmod = api.MDagModifier()
@@ -575,12 +664,14 @@ def createNode(nodename, nodetype, autocreateNamespace=True, renameOnClash = Tru
 				# But here we are, and it cannot be helped.
 				if is_shape:
 					trans = dagmod.createNode("transform")
+					created.append(trans)
 					newapiobj = dagmod.createNode(actualtype, trans)
 				else:
 					newapiobj = dagmod.createNode(actualtype)
 				# END shape handling
 			# END handle dag node
 			mod.renameNode(newapiobj, dagtoken)									# rename
+			created.append(newapiobj)
 			createdNode = newapiobj
 		# END (partial) node creation
 
@@ -593,6 +684,9 @@ def createNode(nodename, nodetype, autocreateNamespace=True, renameOnClash = Tru
 			# Is it a renamed node because because a dep node of the same name existed ?
 			# Could be that a child of the same name existed too
 			if not renameOnClash:
+				if transaction is not None:
+					_discardCreatedNodes(transaction, created)
+				# END remove queued nodes
 				msg = "named %s did already exist - cannot create a dag node with same name due to maya limitation" % nodepartialname
 				raise NameError(msg)
 			else:
@@ -603,18 +697,218 @@ def createNode(nodename, nodetype, autocreateNamespace=True, renameOnClash = Tru
 	# END for each partial path
 	
 	# add the modifiers to the undo stack
-	op = undo.GenericOperationStack()
-	if dgmod is not None:
-		op.addCmd(dgmod.doIt, dgmod.undoIt)
-	if dagmod is not None:
-		op.addCmd(dagmod.doIt, dagmod.undoIt)
-	op.doIt()
+	if transaction is not None:
+		transaction.flush()
+	else:
+		op = undo.GenericOperationStack()
+		if dgmod is not None:
+			op.addCmd(dgmod.doIt, dgmod.undoIt)
+		if dagmod is not None:
+			op.addCmd(dagmod.doIt, dagmod.undoIt)
+		op.doIt()
+	# END handle transaction
 	
 	if createdNode is None:
 		raise RuntimeError("Failed to create %s (%s)" % (nodename, nodetype))
 
 	return NodeFromObj(createdNode)
 
+@undoable
+def createNodes(specs, autocreateNamespace=True, renameOnClash=True, forceNewLeaf=True):
+	"""Create many nodes at once, which is considerably faster than calling 
+	`createNode` for each of them.
+	
+	:param specs: iterable of tuples of (nodename, nodetype[, parent]). nodename and 
+		nodetype are interpreted as in `createNode`. If parent is given, it may be a
+		DagNode, an MDagPath or an absolute path to a dag node, nodename will 
+		be placed below it. The parent may also be created by this call, as long 
+		as its spec comes first.
+	:param autocreateNamespace: see `createNode`
+	:param renameOnClash: see `createNode`
+	:param forceNewLeaf: see `createNode`
+	:raise RuntimeError: If a spec is invalid, or namespaces may not be created
+	:raise NameError: see `createNode`. No node will be created in that case
+	:note: parent paths and namespaces shared by multiple specs are resolved only once, 
+		all nodes are created by a single modifier and end up in one undo operation
+	:note: within an `undo.Transaction`, the nodes are created using the transaction's 
+		modifier
+	:return: list of newly created Nodes, in the order of the given specs"""
+	# NORMALIZE SPECS
+	##################
+	items = list()
+	namespaces = set()
+	for spec in specs:
+		nodename, nodetype = spec[:2]
+		parent = None
+		if len(spec) > 2:
+			parent = spec[2]
+		# END get parent
+		
+		if parent is not None:
+			if isinstance(parent, DagNode):
+				parent = parent.name()
+			elif isinstance(parent, MDagPath):
+				parent = parent.fullPathName()
+			# END convert parent
+			nodename = "%s|%s" % (_makeAbsolutePath(parent).rstrip('|'), nodename.lstrip('|'))
+		# END handle parent
+		
+		if nodename in ('|', ''):
+			raise RuntimeError("Cannot create '|' or ''")
+		
+		if nodename[0] != '|':
+			nodename = '|' + nodename
+		# END make path absolute
+		
+		subpaths = nodename.split('|')
+		if autocreateNamespace:
+			for token in subpaths[1:]:
+				namespaces.add(":".join(token.split(":")[0:-1]))
+			# END for each token
+		# END gather namespaces
+		items.append((subpaths, nodetype))
+	# END for each spec
+	
+	# namespaces are created before we obtain the modifier - namespace creation
+	# is a separate operation which would apply the transaction's modifier
+	for namespace in namespaces:
+		nsm.createNamespace(namespace)
+	# END for each namespace
+	
+	transaction = undo.Transaction.active()
+	if transaction is not None:
+		dagmod = transaction.modifier()
+	else:
+		dagmod = api.MDagModifier()
+	# END handle transaction
+	dgmod_createNode = api.MDGModifier.createNode
+	
+	typeinfo = dict()		# nodetype -> (is_transform_type, is_shape)
+	pathcache = dict()		# requested partial path -> MObject
+	createdNodes = list()
+	queued = list()			# all nodes queued for creation, including parents
+	
+	for subpaths, nodetype in items:
+		try:
+			is_transform_type, is_shape = typeinfo[nodetype]
+		except KeyError:
+			is_transform_type = nodetype == 'transform'
+			is_shape = False
+			if not is_transform_type and nodeTypeTree.has_node(nodetype):
+				parents = list(nodeTypeTree.parent_iter(nodetype))
+				is_transform_type = 'transform' in parents
+				is_shape = 'shape' in parents
+			# END query inheritance
+			typeinfo[nodetype] = (is_transform_type, is_shape)
+		# END obtain type information
+		
+		parentnode = None
+		createdNode = None
+		do_existence_checks = True
+		renameLeafOnClash = renameOnClash
+		lenSubpaths = len(subpaths)
+		
+		for i in xrange(1, lenSubpaths):
+			nodepartialname = '|'.join(subpaths[0 : i+1])
+			is_last_iteration = i == lenSubpaths - 1
+			
+			# EXISTING OR PREVIOUSLY CREATED ITEM ?
+			#######################################
+			nodeapiobj = pathcache.get(nodepartialname)
+			if nodeapiobj is None and do_existence_checks:
+				nodeapiobj = toApiobj(nodepartialname)
+				if nodeapiobj is None:
+					do_existence_checks = False
+				else:
+					pathcache[nodepartialname] = nodeapiobj
+				# END cache existing node
+			# END check existence
+			
+			if nodeapiobj is not None:
+				if not is_last_iteration:
+					parentnode = createdNode = nodeapiobj
+					continue
+				# END intermediate item
+				
+				if not forceNewLeaf:
+					parentnode = createdNode = nodeapiobj
+					_mfndep_setobject(createdNode)
+					existing_node_type = uncapitalize(_mfndep_typename())
+					nodetypecmp = uncapitalize(nodetype)
+					if nodetypecmp != existing_node_type:
+						if nodetypecmp not in nodeTypeTree.parent_iter(existing_node_type):
+							if transaction is not None:
+								_discardCreatedNodes(transaction, queued)
+							# END remove queued nodes
+							msg = "node %s did already exist, its type %s is incompatible with the requested type %s" % (nodepartialname, existing_node_type, nodetype)
+							raise NameError(msg)
+					# END nodetypes different
+					continue
+				# END reuse existing leaf
+				renameLeafOnClash = True
+			# END handle existing item
+			
+			dagtoken = subpaths[i]
+			actualtype = "transform"
+			if is_last_iteration:
+				actualtype = nodetype
+			
+			if parentnode or actualtype == "transform" or (is_last_iteration and is_transform_type):
+				if parentnode:
+					newapiobj = dagmod.createNode(actualtype, parentnode)
+				else:
+					newapiobj = dagmod.createNode(actualtype)
+				# END handle parent
+				parentnode = newapiobj
+			else:
+				# see `createNode` for why shapes get an explicit transform
+				try:
+					newapiobj = dgmod_createNode(dagmod, actualtype)
+				except RuntimeError:
+					if is_shape:
+						trans = dagmod.createNode("transform")
+						queued.append(trans)
+						newapiobj = dagmod.createNode(actualtype, trans)
+					else:
+						newapiobj = dagmod.createNode(actualtype)
+					# END shape handling
+				# END handle dag node
+			# END create node
+			dagmod.renameNode(newapiobj, dagtoken)
+			queued.append(newapiobj)
+			createdNode = newapiobj
+			pathcache.setdefault(nodepartialname, newapiobj)
+			
+			# CLASHING CHECK
+			allowClash = renameOnClash
+			if is_last_iteration:
+				allowClash = renameLeafOnClash
+			# END handle leaf
+			_mfndep_setobject(newapiobj)
+			if _mfndep_name() != dagtoken and not allowClash:
+				if transaction is not None:
+					_discardCreatedNodes(transaction, queued)
+				# END remove queued nodes
+				msg = "named %s did already exist - cannot create a dag node with same name due to maya limitation" % nodepartialname
+				raise NameError(msg)
+			# END handle clash
+		# END for each partial path
+		
+		if createdNode is None:
+			raise RuntimeError("Failed to create %s (%s)" % ('|'.join(subpaths), nodetype))
+		createdNodes.append(createdNode)
+	# END for each item
+	
+	if transaction is not None:
+		transaction.flush()
+	else:
+		op = undo.GenericOperationStack()
+		op.addCmd(dagmod.doIt, dagmod.undoIt)
+		op.doIt()
+	# END apply modifier
+	
+	return [NodeFromObj(n) for n in createdNodes]
+
 #} END base
 
 
@@ -759,6 +1053,243 @@ class SetFilter(tuple):
 		return apiobj.hasFn(self[0])
 	# END SetFilter
 
+
+class LogicalIndexAllocator(object):
+	"""Utility handing out logical indices of an array plug which do not exist yet.
+
+	The existing indices are read only once, each following allocation is
+	answered from memory in amortized constant time. Indices handed out are
+	considered used, even if the caller never creates the respective element.
+
+	The allocator is only valid as long as the array plug is not altered by
+	anyone else, which is why it should only be kept within an undoable method
+	or a `LogicalIndexAllocation` block.
+
+	:note: indices are allocated the same way `MPlug.mnextLogicalIndex` does,
+		hence gaps below the smallest existing index will not be filled"""
+	__slots__ = ('_plug', '_used', '_next')
+
+	# plug name -> allocator, only filled while an allocation block is active
+	_active = dict()
+	_depth = 0
+
+	def __init__(self, arrayplug):
+		if not arrayplug.isArray():
+			raise AssertionError("Given plug %r was not an array plug" % arrayplug)
+		# END sanity check
+		indices = api.MIntArray()
+		arrayplug.getExistingArrayAttributeIndices(indices)
+
+		self._plug = api.MPlug(arrayplug)
+		self._used = set(indices[i] for i in xrange(indices.length()))
+		self._next = 0
+		if indices.length():
+			self._next = indices[0]
+		# END start at the smallest index
+
+	#{ Interface
+
+	@classmethod
+	def active(cls, arrayplug):
+		""":return: allocator shared by all callers for the given plug if an
+			allocation block is active, or None otherwise"""
+		if not cls._depth:
+			return None
+		key = arrayplug.mfullyQualifiedName()
+		try:
+			return cls._active[key]
+		except KeyError:
+			alloc = cls._active[key] = cls(arrayplug)
+			return alloc
+		# END handle cache miss
+
+	def plug(self):
+		""":return: the array plug we allocate indices for"""
+		return self._plug
+
+	def nextIndex(self):
+		""":return: logical index that did not yet exist nor has been handed out before"""
+		used = self._used
+		index = self._next
+		while index in used:
+			index += 1
+		# END skip used indices
+		used.add(index)
+		self._next = index + 1
+		return index
+
+	def nextIndices(self, count):
+		""":return: list of count logical indices as returned by `nextIndex`"""
+		nextIndex = self.nextIndex
+		return [nextIndex() for i in xrange(count)]
+
+	def nextPlug(self):
+		""":return: element plug at the logical index returned by `nextIndex`"""
+		return self._plug.elementByLogicalIndex(self.nextIndex())
+
+	def nextPlugs(self, count):
+		""":return: list of count element plugs, see `nextPlug`"""
+		elementByLogicalIndex = self._plug.elementByLogicalIndex
+		return [elementByLogicalIndex(i) for i in self.nextIndices(count)]
+
+	#} END interface
+
+
+class LogicalIndexAllocation(object):
+	"""Defines a block of bulk operations during which `MPlug.mnextLogicalIndex`
+	and all methods using it are served by one shared `LogicalIndexAllocator` per
+	array plug. This turns appending many elements into a linear operation.
+
+	Call `begin` before the bulk operation and `end` once it is done, or use
+	it in a with statement. Blocks may be nested, the allocators are discarded
+	once the outermost block ends.
+
+	:note: within the block, each index is returned only once, even if the element
+		plug was never created. Modifications of the arrays which do not use
+		mnextLogicalIndex are not tracked
+	:note: undoing operations within the block does not free allocated indices"""
+	__slots__ = ('_started', )
+
+	def __init__(self):
+		self._started = False
+
+	def __enter__(self):
+		self.begin()
+		return self
+
+	def __exit__(self, type, value, traceback):
+		self.end()
+
+	def begin(self):
+		"""Start the allocation block
+
+		:note: subsequent calls have no effect"""
+		if self._started:
+			return
+		LogicalIndexAllocator._depth += 1
+		self._started = True
+
+	def end(self):
+		"""End the allocation block and discard all allocators if it was the outermost
+		one
+
+		:note: has no effect if begin was not called"""
+		if not self._started:
+			return
+		self._started = False
+		LogicalIndexAllocator._depth -= 1
+		if not LogicalIndexAllocator._depth:
+			LogicalIndexAllocator._active.clear()
+		# END clear allocators
+
+
+if hasattr(MObjectHandle, 'hashCode'):
+	def _dagPathKey(dagpath):
+		""":return: hashable key of the given dag path
+		:note: hash codes are not guaranteed to be unique, hence the key may only 
+			be used to find candidates which need to be compared to the dag path"""
+		return (MObjectHandle(dagpath.node()).hashCode(), dagpath.instanceNumber())
+else:
+	def _dagPathKey(dagpath):
+		""":return: hashable key identifying the given dag path"""
+		return dagpath.fullPathName()
+# END handle maya support
+
+def componentAssignmentsMany(shapes, setFilter=None, asComponent=True):
+	"""Retrieve the component assignments of many shapes at once
+	
+	:return: list with one list of tuples(ObjectSetNode, Component_or_MObject) for each 
+		of the given shapes, see `Shape.componentAssignments`
+	:param shapes: iterable of Shape nodes
+	:param setFilter: see `Shape.connectedSets`, defaults to `Shape.fSetsRenderable`
+	:param asComponent: if True, the components will be wrapped into the matching MRV component 
+		type. If False, components are returned as MObjects which may be wrapped lazily, 
+		when needed, using `Component`
+	:note: each set of the scene which could match the set filter is walked only once, 
+		which is much faster than querying the shapes one by one
+	:note: the sets of each shape are ordered as they are found in the scene, which 
+		may differ from the order of the connections of the shape"""
+	if setFilter is None:
+		setFilter = Shape.fSetsRenderable
+	# END handle default filter
+	
+	# dag path key -> [ (MDagPath, [ result index, ... ]), ... ]
+	indices = dict()
+	results = list()
+	nocomponents = set()		# result indices of shapes without components
+	for shape in shapes:
+		path = shape.dagPath()
+		bucket = indices.setdefault(_dagPathKey(path), list())
+		for entry in bucket:
+			if entry[0] == path:
+				break
+		else:
+			entry = (path, list())
+			bucket.append(entry)
+		# END find entry of path
+		
+		if shape.apiType() == api.MFn.kSubdiv:
+			nocomponents.add(len(results))
+		# END subdee special case, see componentAssignments
+		entry[1].append(len(results))
+		results.append(list())
+	# END for each shape
+	if not results:
+		return results
+	# END early bailout
+	
+	sellist = api.MSelectionList()
+	dagpath = MDagPath()
+	setit = api.MItDependencyNodes(setFilter[0])
+	while not setit.isDone():
+		setobj = setit.thisNode()
+		setit.next()
+		if not setFilter(setobj):
+			continue
+		
+		setnode = None
+		sellist.clear()
+		api.MFnSet(setobj).getMembers(sellist, False)
+		for i in xrange(sellist.length()):
+			compobj = MObject()
+			try:
+				sellist.getDagPath(i, dagpath, compobj)
+			except RuntimeError:
+				continue
+			# END skip non-dag members
+			
+			bucket = indices.get(_dagPathKey(dagpath))
+			if bucket is None:
+				continue
+			# END skip other objects
+			
+			rindices = None
+			for path, pindices in bucket:
+				if path == dagpath:
+					rindices = pindices
+					break
+				# END compare candidate
+			# END for each candidate
+			if rindices is None:
+				continue
+			# END skip colliding objects
+			
+			if setnode is None:
+				setnode = NodeFromObj(setobj)
+			# END wrap set lazily
+			
+			if compobj.isNull() or rindices[0] in nocomponents:
+				compobj = MObject()
+			elif asComponent:
+				compobj = Component(compobj)
+			# END handle component type
+			
+			for rindex in rindices:
+				results[rindex].append((setnode, compobj))
+		# END for each member
+	# END for each set
+	return results
+
 #} END utilities
 
 
@@ -1112,7 +1643,8 @@ class DependNode(Node, iDuplicatable):		# parent just for epydoc -
 			a RuntimeException will be thrown if a required namespace does not exist
 		:param renameOnClash: if true, clashing names will automatically be resolved by adjusting the name
 		:return: renamed node which is the node itself
-		:note: for safety reasons, this node is dagnode aware and uses a dag modifier for them !"""
+		:note: for safety reasons, this node is dagnode aware and uses a dag modifier for them !
+		:note: within an `undo.Transaction`, the rename is deferred until the transaction is flushed"""
 		if '|' in newname:
 			raise NameError("new node names may not contain '|' as in %s" % newname)
 
@@ -1151,11 +1683,16 @@ class DependNode(Node, iDuplicatable):		# parent just for epydoc -
 
 		# rename the node
 		mod = None
+		transaction = undo.Transaction.active()
+		if transaction is not None:
+			mod = transaction.modifier()
+		# END handle transaction
 		if isinstance(self, DagNode):
-			mod = undo.DagModifier()
+			if mod is None:
+				mod = undo.DagModifier()
 			shapes = self.shapes()
 			shapenames = [s.basename() for s in shapes ]
-		else:
+		elif mod is None:
 			mod = undo.DGModifier()
 		mod.renameNode(self.object(), newname)
 
@@ -1170,7 +1707,8 @@ class DependNode(Node, iDuplicatable):		# parent just for epydoc -
 			# END for each shape to rename
 		# END handle renamed shapes
 		
-		mod.doIt()
+		if transaction is None:
+			mod.doIt()
 
 		return self
 
@@ -1181,7 +1719,13 @@ class DependNode(Node, iDuplicatable):		# parent just for epydoc -
 		:note: if the undo queue is enabled, the object becomes invalid, but stays alive until it
 			drops off the queue
 		:note: if you want to delete many nodes, its more efficient to delete them
-			using the global `delete` method"""
+			using the global `delete` method
+		:note: within an `undo.Transaction`, the deletion is deferred until the transaction is flushed"""
+		transaction = undo.Transaction.active()
+		if transaction is not None:
+			transaction.modifier().deleteNode(self.object())
+			return
+		# END handle transaction
 		mod = undo.DGModifier()
 		mod.deleteNode(self.object())
 		mod.doIt()
@@ -1423,7 +1967,8 @@ class DagNode(Entity, iDagItem):	# parent just for epydoc
 		:note: will remove all instance of this object and leave this object at only one path -
 			if this is not what you want, use the addChild method instead as it can properly handle this case
 		
-		:note: this method handles namespaces properly """
+		:note: this method handles namespaces properly
+		:note: within an `undo.Transaction`, the transaction's modifier will be used and flushed"""
 		if raiseOnInstance and self.instanceCount(False) > 1:
 			raise RuntimeError("%r is instanced - reparent operation would destroy direct instances" % self)
 
@@ -1445,21 +1990,33 @@ class DagNode(Entity, iDagItem):	# parent just for epydoc
 
 		# As stupid dagmodifier cannot handle instances right (as it works on MObjects
 		mod = None		# create it once we are sure the operation takes place
+		transaction = undo.Transaction.active()
 		if parentnode:
 			if parentnode == self:
 				raise RuntimeError("Cannot parent object %s under itself" % self)
-
-			mod = undo.DagModifier()
-			mod.reparentNode(self.object(), parentnode.object())
 		else:
 			# sanity check
 			if isinstance(self, Shape):
 				raise RuntimeError("Shape %s cannot be parented under root '|' but needs a transform" % self)
+		# END handle parent node
+		
+		if transaction is not None:
+			mod = transaction.modifier()
+		else:
 			mod = undo.DagModifier()
+		# END handle transaction
+		
+		if parentnode:
+			mod.reparentNode(self.object(), parentnode.object())
+		else:
 			mod.reparentNode(self.object())
 		# END handle parent node
 
-		mod.doIt()
+		if transaction is not None:
+			transaction.flush()
+		else:
+			mod.doIt()
+		# END apply modifier
 
 		# UPDATE DAG PATH
 		# find it in parentnodes children
@@ -1683,7 +2240,13 @@ class DagNode(Entity, iDagItem):	# parent just for epydoc
 		:note: if the undo queue is enabled, the object becomes invalid, but stays alive until it
 			drops off the queue
 		:note: if you want to delete many nodes, its more efficient to delete them
-			using the global `delete` method"""
+			using the global `delete` method
+		:note: within an `undo.Transaction`, the deletion is deferred until the transaction is flushed"""
+		transaction = undo.Transaction.active()
+		if transaction is not None:
+			transaction.modifier().deleteNode(self.object())
+			return
+		# END handle transaction
 		mod = undo.DagModifier()
 		mod.deleteNode(self.object())
 		mod.doIt()
@@ -2464,8 +3027,10 @@ class Component(MObject):
 		"""Operates exactly as described in the MFn...IndexComponent documentation, 
 		but returns self to allow combined calls and on-the-fly component generation
 		
+		:param args: MIntArrays, or lists, tuples, xrange objects, array.array('i') objects 
+			or buffers of indices which will be converted to MIntArrays in bulk
 		:return: self"""
-		self._mfncls(self).addElements(*args)
+		self._mfncls(self).addElements(*[ _toIntArray(arg) for arg in args ])
 		return self
 
 	def addElement(self, *args):
@@ -2479,6 +3044,13 @@ class Component(MObject):
 
 Component._base_cls_ = Component
 
+def _toIntArray(indices):
+	""":return: MIntArray with the given indices, see `Component.addElements`, or indices 
+	if it cannot be converted"""
+	if isinstance(indices, (list, tuple, xrange, array.array, buffer)):
+		return api.MIntArray.mfromBulk(indices)
+	return indices
+
 class SingleIndexedComponent(Component):
 	"""precreated class for ease-of-use"""
 	_mfnType = api.MFn.kSingleIndexedComponent
@@ -2777,7 +3349,8 @@ class Shape(DagNode):	 # base for epydoc !
 		:note: SubDivision Components cannot be supported as the component type kSubdivCVComponent
 			cannot be wrapped into any component function set - reevaluate that with new maya versions !
 		:note: deformer set component assignments are only returned for instance 0 ! They apply to all
-			output meshes though"""
+			output meshes though
+		:note: use `componentAssignmentsMany` to query the assignments of many shapes"""
 		# SUBDEE SPECIAL CASE
 		#########################
 		# cannot handle components for subdees - return them empty
@@ -5,11 +5,82 @@ __docformat__ = "restructuredtext"
 import base
 from mrv.enum import (create as enum, Element as elm)
 import maya.OpenMaya as api
+import mrv.maya.undo as undo
+from array import array
 import logging
 log = logging.getLogger("mrv.maya.nt.geometry")
 
 __all__ = ("GeometryShape", "DeformableShape", "ControlPoint", "SurfaceShape", 
-	       "Mesh")
+	       "Mesh", "MeshSnapshot", "copyLightLinksMany")
+
+#{ Light Links
+
+@undoable
+def copyLightLinksMany( pairs, substitute = False ):
+	"""Copy the light links of many shapes onto other shapes at once
+	
+	:param pairs: iterable of tuple( sourceShape, destinationShape ) pairs
+	:param substitute: see `GeometryShape.copyLightLinks`
+	:note: the light linker arrays are read only once to find free indices, all 
+		connections are made by a single modifier"""
+	# SNAPSHOT
+	# (source, destination, link compound plug) of all links to copy
+	links = list()
+	for source, destination in pairs:
+		for input_plug in source.message.moutputs():
+			if input_plug.node().apiType() != api.MFn.kLightLink:
+				continue
+			# we are always connected to the object portion of the compound model
+			# from there we can conclude it all
+			links.append( ( source, destination, input_plug.mparent() ) )
+		# END for each output plug
+	# END for each shape pair
+	
+	if not links:
+		return
+	# END early bailout
+	
+	transaction = undo.Transaction.active()
+	if transaction is not None:
+		mod = transaction.modifier()
+	else:
+		mod = undo.DGModifier()
+	# END handle transaction
+	
+	# array plug name -> allocator
+	allocators = dict()
+	for source, destination, parent_compound in links:
+		if substitute:
+			new_parent_compound = parent_compound
+			mod.disconnect( source.message, parent_compound.child( 1 ) )
+		else:
+			array_plug = parent_compound.array()
+			key = array_plug.mfullyQualifiedName()
+			allocator = allocators.get( key )
+			if allocator is None:
+				allocator = allocators[ key ] = base.LogicalIndexAllocator( array_plug )
+			# END create allocator
+			new_parent_compound = allocator.nextPlug()
+			
+			# the light is only needed if we do not substitute
+			light_plug = parent_compound.child( 0 ).minput()
+			if not light_plug.isNull():
+				mod.connect( light_plug, new_parent_compound.child( 0 ) )
+			# END if lightplug is connected
+		# END handle substitution
+		
+		# connect object
+		mod.connect( destination.message, new_parent_compound.child( 1 ) )
+	# END for each link
+	
+	if transaction is not None:
+		transaction.flush()
+	else:
+		mod.doIt()
+	# END apply connections
+
+#} END light links
+
 
 class GeometryShape( base.Shape ):	# base for epydoc !
 	"""Contains common methods for all geometry types"""
@@ -23,60 +94,9 @@ class GeometryShape( base.Shape ):	# base for epydoc !
 				in place of self, effectively receiving it's light-links whereas self losses
 				them. This is practical in case you create a new shape below a transform that
 				had a previously visible and manipulated shape whose external connections you
-				wouuld like to keep"""
-		def freeLogicalIndex( parent_plug ):
-			""":return: a free parent compound index"""
-			ilogical = parent_plug.logicalIndex()
-			array_plug = parent_plug.array()
-			num_elments = array_plug.numElements()
-
-
-			# one of the logical indices must be the highest one - start searching
-			# at the end of the physical array
-			for iphysical in xrange( num_elments - 1, -1, -1 ):
-				p_plug = array_plug[ iphysical ]
-				try_index = p_plug.logicalIndex() + 1
-				try_plug = array_plug.elementByLogicalIndex( try_index )
-
-				if try_plug.child( 0 ).minput().isNull():
-					return try_index
-			# END endless loop
-
-			raise AssertionError( "Did not find valid free index" )
-		# END helper method
-
-		substitute = kwargs.get( "substitute", False )
-		for input_plug in self.message.moutputs():
-			node = input_plug.mwrappedNode()
-			if node.apiType() != api.MFn.kLightLink:
-				continue
-
-			# we are always connected to the object portion of the compound model
-			# from there we can conclude it all
-			parent_compound = input_plug.mparent()
-			target_compound_index = -1
-			if substitute:
-				target_compound_index = parent_compound.logicalIndex()
-			else:
-				target_compound_index = freeLogicalIndex(parent_compound)
-			# END get some logical index
-
-			new_parent_compound = parent_compound.array().elementByLogicalIndex( target_compound_index )
-
-			# retrieve light link, connect other - light is only needed if we do not
-			# substitute
-			if not substitute:
-				light_plug = parent_compound.child( 0 ).minput()
-				if not light_plug.isNull():
-					light_plug.mconnectTo(new_parent_compound.child( 0 ), force=False)
-				# END if lightplug is connected
-			# END if no substitute required
-
-			# connect object
-			other.message.mconnectTo(new_parent_compound.child(1))
-
-
-		# END for each output plug
+				wouuld like to keep
+		:note: use `copyLightLinksMany` to copy the light links of many shapes"""
+		copyLightLinksMany( ( ( self, other ), ), substitute = kwargs.get( "substitute", False ) )
 
 
 class DeformableShape( GeometryShape ):	# base for epydoc !
@@ -105,6 +125,15 @@ class _SingleIndexedComponentGenerator(object):
 		self._mesh = mesh
 		self._component = component
 		
+	def _numComponents(self):
+		""":return: amount of components of our type on the mesh"""
+		ec = Mesh.eComponentType
+		mesh = self._mesh
+		return {	ec.vertex : mesh.numVertices, 
+					ec.edge : mesh.numEdges, 
+					ec.face : mesh.numPolygons, 
+					ec.uv : mesh.numUVs }[self._component]()
+		
 	def __getslice__(self, i, j):
 		comp = self._mesh.component(self._component)
 		# for some reason , python inside maya returns 31 bit ints to indicate 
@@ -119,21 +148,34 @@ class _SingleIndexedComponentGenerator(object):
 		return comp
 		
 	def __getitem__(self, *args):
+		"""Indices may be given as single integer, multiple integers, slices with 
+		steps, lists, tuples, xrange objects, iterators, array.array('i') objects, buffers 
+		or MIntArrays"""
 		comp = self._mesh.component(self._component)
 		ia = None
 		if len(args) == 1:
 			arg = args[0]
-			if hasattr(arg, 'next'):
-				ia = api.MIntArray.mfromIter(arg)
-			elif isinstance(arg, (list, tuple)):
-				ia = api.MIntArray.mfromList(arg)
+			if isinstance(arg, slice):
+				start, stop, step = arg.start or 0, arg.stop, arg.step or 1
+				if stop is None or stop > self._int32b:
+					if start == 0 and step == 1:
+						comp.setComplete(1)
+						return comp
+					# END handle complete slice
+					stop = self._numComponents()
+				# END handle open slice
+				ia = api.MIntArray.mfromRange(start, stop, step)
+			elif hasattr(arg, 'next'):
+				ia = api.MIntArray.mfromBulk(list(arg))
+			elif isinstance(arg, (list, tuple, xrange, array, buffer)):
+				ia = api.MIntArray.mfromBulk(arg)
 			elif isinstance(arg, api.MIntArray):
 				ia = arg
 			else:
 				ia = api.MIntArray.mfromMultiple(arg)
 			# END handle type
 		else:
-			ia = api.MIntArray.mfromList(args)
+			ia = api.MIntArray.mfromBulk(args)
 		# END handle args
 		
 		return comp.addElements(ia)
@@ -187,6 +229,234 @@ class _SingleIndexedComponentIterator(_SingleIndexedComponentGenerator):
 		
 	# shortcut alias
 	iter = property(iterator)
+	
+
+# (typecode, width) -> name of MScriptUtil method returning a matching pointer
+_ptrGetters = {	('i', 1) : 'asIntPtr', 
+				('f', 1) : 'asFloatPtr', 
+				('d', 1) : 'asDoublePtr', 
+				('f', 3) : 'asFloat3Ptr', 
+				('f', 4) : 'asFloat4Ptr', 
+				('d', 4) : 'asDouble4Ptr' }
+
+def _arrayFromMArrayElements(marray, typecode, width=1):
+	""":return: array.array like `_arrayFromMArray`, but filled element by element"""
+	out = array(typecode)
+	if width == 1:
+		out.extend([marray[i] for i in xrange(marray.length())])
+		return out
+	# END handle plain arrays
+	
+	components = ('x', 'y', 'z', 'w')[:width]
+	for i in xrange(marray.length()):
+		element = marray[i]
+		out.extend([getattr(element, c) for c in components])
+	# END for each element
+	return out
+
+def _arrayFromMArray(marray, typecode, width=1):
+	"""
+	:return: array.array of the given typecode with the contents of the given maya array, 
+		which is copied with one call. The values of compound elements, like MFloatPoints, 
+		are stored consecutively, each element providing width values
+	:param marray: MIntArray, MFloatArray, MDoubleArray, MFloatVectorArray, MFloatPointArray
+		or MPointArray
+	:note: without ctypes ( python 2.4 ), the array is copied element by element"""
+	try:
+		import ctypes
+	except ImportError:
+		return _arrayFromMArrayElements(marray, typecode, width)
+	# END handle ctypes
+	
+	out = array(typecode)
+	count = marray.length() * width
+	if not count:
+		return out
+	# END handle empty arrays
+	
+	su = api.MScriptUtil()
+	su.createFromList([0.0] * count, count)
+	ptr = getattr(su, _ptrGetters[(typecode, width)])()
+	marray.get(ptr)
+	out.fromstring(ctypes.string_at(long(ptr), count * out.itemsize))
+	return out
+	
+def _interleave(arrays):
+	""":return: array with the values of the given arrays of the same length and typecode 
+	interleaved, the first element being followed by the first element of the next array"""
+	nvals = len(arrays)
+	out = array(arrays[0].typecode, [0]) * (len(arrays[0]) * nvals)
+	for i in range(nvals):
+		out[i::nvals] = arrays[i]
+	return out
+	
+def _compact(values, width, keep):
+	""":return: array with only the first keep values of each width values"""
+	out = array(values.typecode, [0]) * (len(values) / width * keep)
+	for i in range(keep):
+		out[i::keep] = values[i::width]
+	return out
+	
+	
+class MeshSnapshot(object):
+	"""Contiguous copies of mesh data, one array.array per channel, as created by 
+	`Mesh.snapshot`.
+	
+	Available channels are:
+	
+	 * points: x, y, z values of each vertex position
+	 * normals: x, y, z values of each normal
+	 * uvs: u, v values of each uv of the uv set
+	 * faceCounts: amount of vertices of each face
+	 * faceConnects: vertex ids of all faces, face by face
+	 * uvCounts: amount of uvs of each face
+	 * uvIds: uv ids of all faces, face by face"""
+	__slots__ = ('_arrays', )
+	
+	# channel name -> amount of values per item
+	kWidths = { 'points' : 3, 'normals' : 3, 'uvs' : 2 }
+	
+	def __init__(self, arrays):
+		self._arrays = arrays
+		
+	def __contains__(self, channel):
+		return channel in self._arrays
+		
+	def __getitem__(self, channel):
+		return self.data(channel)
+		
+	#{ Interface
+	
+	def channels(self):
+		""":return: sorted list of all channel names we contain"""
+		return sorted(self._arrays.keys())
+	
+	def data(self, channel):
+		""":return: array.array of the given channel
+		:raise KeyError: if the channel was not part of the snapshot"""
+		return self._arrays[channel]
+		
+	def count(self, channel):
+		""":return: amount of items in the given channel, i.e. the amount of 
+			points, which is a third of the amount of values"""
+		return len(self._arrays[channel]) / self.kWidths.get(channel, 1)
+		
+	def view(self, channel, start=0, stop=None):
+		"""
+		:return: memory view onto the values start to stop of the given channel, 
+			which does not copy any data. If memoryviews are not supported 
+			for arrays by the interpreter, a buffer is returned
+		:param start: index of the first value
+		:param stop: index one past the last value, or None to view all remaining values
+		:note: indices are value indices, not item indices, the y value of the second 
+			point would be at index 4"""
+		values = self._arrays[channel]
+		if stop is None:
+			stop = len(values)
+		# END handle stop
+		try:
+			return memoryview(values)[start:stop]
+		except (NameError, TypeError):
+			return buffer(values, start * values.itemsize, (stop - start) * values.itemsize)
+		# END handle interpreter support
+	
+	#} END interface
+	
+
+def _tweakChildren(arrayplug):
+	""":return: list of child attributes of the compound elements of the given tweak array plug"""
+	fn = api.MFnCompoundAttribute(arrayplug.attribute())
+	return [ fn.child(i) for i in range(fn.numChildren()) ]
+
+def _tweakArrayElements(arrayplug):
+	""":return: dict(logicalIndex -> tuple(value, ...)) with the values of all existing 
+	elements of the given tweak array plug, like pnts or uvpt
+	:note: reads the whole array through one data handle if possible"""
+	children = _tweakChildren(arrayplug)
+	elements = dict()
+	if not hasattr(arrayplug, 'asMDataHandle'):
+		arrayplug.evaluateNumElements()
+		indices = api.MIntArray()
+		arrayplug.getExistingArrayAttributeIndices(indices)
+		for index in indices:
+			eplug = arrayplug.elementByLogicalIndex(index)
+			elements[index] = tuple([ eplug.child(c).asFloat() for c in range(len(children)) ])
+		# END for each index
+		return elements
+	# END handle maya support
+	
+	handle = arrayplug.asMDataHandle()
+	try:
+		ahandle = api.MArrayDataHandle(handle)
+		for i in xrange(ahandle.elementCount()):
+			ahandle.jumpToArrayElement(i)
+			ehandle = ahandle.inputValue()
+			elements[ahandle.elementIndex()] = tuple([ ehandle.child(c).asFloat() for c in children ])
+		# END for each element
+	finally:
+		arrayplug.destructHandle(handle)
+	# END assure handle is destroyed
+	return elements
+	
+def _setTweakArrayElements(arrayplug, elements):
+	"""Set the given tweak array plug to contain exactly the given elements
+	
+	:param elements: dict(logicalIndex -> tuple(value, ...)) as returned by `_tweakArrayElements`
+	:note: writes the whole array through one data handle if possible, otherwise 
+		elements which are not in elements will be set to 0"""
+	children = _tweakChildren(arrayplug)
+	if not hasattr(arrayplug, 'asMDataHandle'):
+		for index in _tweakArrayElements(arrayplug):
+			if index not in elements:
+				elements[index] = (0.0, ) * len(children)
+		# END for each existing index
+		for index, values in elements.iteritems():
+			eplug = arrayplug.elementByLogicalIndex(index)
+			for c, value in enumerate(values):
+				eplug.child(c).setFloat(value)
+		# END for each element
+		return
+	# END handle maya support
+	
+	handle = arrayplug.asMDataHandle()
+	try:
+		ahandle = api.MArrayDataHandle(handle)
+		builder = ahandle.builder()
+		for i in xrange(ahandle.elementCount()):
+			ahandle.jumpToArrayElement(i)
+			index = ahandle.elementIndex()
+			if index not in elements:
+				builder.removeElement(index)
+		# END for each existing element
+		
+		for index, values in elements.iteritems():
+			ehandle = builder.addElement(index)
+			for child, value in zip(children, values):
+				ehandle.child(child).setFloat(value)
+		# END for each element to set
+		ahandle.set(builder)
+		arrayplug.setMDataHandle(handle)
+	finally:
+		arrayplug.destructHandle(handle)
+	# END assure handle is destroyed
+
+def _setTweakArrays(assignments):
+	"""Apply the given tweak array changes with a single undoable operation
+	
+	:param assignments: list of tuple(arrayplug, elements) pairs, see `_setTweakArrayElements`"""
+	if not assignments:
+		return
+	
+	previous = [ (arrayplug, _tweakArrayElements(arrayplug)) for arrayplug, elements in assignments ]
+	def apply(assignments):
+		for arrayplug, elements in assignments:
+			_setTweakArrayElements(arrayplug, dict(elements))
+	# END utility
+	
+	op = undo.GenericOperation()
+	op.setDoitCmd(apply, assignments)
+	op.setUndoitCmd(apply, previous)
+	op.doIt()
 		
 #} END helpers 
 
@@ -230,17 +500,81 @@ class Mesh( SurfaceShape ):		# base for epydoc !
 	
 	#} END iterator shortcuts
 
+	# channels which can be snapshot
+	kSnapshotChannels = ('points', 'normals', 'uvs', 'faceCounts', 'faceConnects', 'uvCounts', 'uvIds')
+
 	#{ Utilities
+	
+	def snapshot( self, channels = ('points', 'faceCounts', 'faceConnects'), space = api.MSpace.kObject, 
+					pointType = 'f', uvSet = None ):
+		"""Copy the given data channels of the mesh into contiguous arrays
+		
+		:param channels: iterable of channel names, see `kSnapshotChannels` and `MeshSnapshot`
+		:param space: MSpace in which to retrieve points and normals
+		:param pointType: 'f' for 32 bit or 'd' for 64 bit floating point positions
+		:param uvSet: name of the uv set to retrieve uvs from, or None to use the current one
+		:return: `MeshSnapshot` instance
+		:raise ValueError: if a channel or the pointType are unknown
+		:note: each channel requires only one call to the mesh function set, counts and 
+			connects are retrieved together"""
+		channels = set(channels)
+		for channel in channels:
+			if channel not in self.kSnapshotChannels:
+				raise ValueError("Unknown channel: %s" % channel)
+		# END for each channel
+		if pointType not in ('f', 'd'):
+			raise ValueError("Invalid pointType: %s" % pointType)
+		# END check point type
+		if uvSet is None:
+			uvSet = self.currentUVSetName()
+		# END handle uvset
+		
+		arrays = dict()
+		if 'points' in channels:
+			if pointType == 'f':
+				points = api.MFloatPointArray()
+			else:
+				points = api.MPointArray()
+			# END handle point type
+			self.getPoints(points, space)
+			arrays['points'] = _compact(_arrayFromMArray(points, pointType, 4), 4, 3)
+		# END points
+		
+		if 'normals' in channels:
+			normals = api.MFloatVectorArray()
+			self.getNormals(normals, space)
+			arrays['normals'] = _arrayFromMArray(normals, 'f', 3)
+		# END normals
+		
+		if 'uvs' in channels:
+			u, v = api.MFloatArray(), api.MFloatArray()
+			self.getUVs(u, v, uvSet)
+			arrays['uvs'] = _interleave((_arrayFromMArray(u, 'f'), _arrayFromMArray(v, 'f')))
+		# END uvs
+		
+		for count_channel, id_channel, getter, args in (('faceCounts', 'faceConnects', self.getVertices, tuple()), 
+														('uvCounts', 'uvIds', self.getAssignedUVs, (uvSet, ))):
+			if count_channel not in channels and id_channel not in channels:
+				continue
+			counts, ids = api.MIntArray(), api.MIntArray()
+			getter(counts, ids, *args)
+			if count_channel in channels:
+				arrays[count_channel] = _arrayFromMArray(counts, 'i')
+			if id_channel in channels:
+				arrays[id_channel] = _arrayFromMArray(ids, 'i')
+		# END for each topology channel pair
+		
+		return MeshSnapshot(arrays)
 
+	@undoable
 	def copyTweaksTo( self, other ):
 		"""Copy our tweaks onto another mesh
 		
-		:note: we do not check topology for maximum flexibility"""
-		opnts = other.pnts
-		pnts = self.pnts
-		for splug in pnts:
-			opnts.elementByLogicalIndex( splug.logicalIndex() ).msetMObject( splug.asMObject() )
-		# END for each source plug in pnts
+		:note: we do not check topology for maximum flexibility
+		:note: all tweaks are copied with a single operation"""
+		elements = _tweakArrayElements( other.pnts )
+		elements.update( _tweakArrayElements( self.pnts ) )
+		_setTweakArrays( [ ( other.pnts, elements ) ] )
 
 	def isValidMesh( self ):
 		"""
@@ -282,14 +616,16 @@ class Mesh( SurfaceShape ):		# base for epydoc !
 			* [referenced] mesh *with* history:
 			 	put tweakNode into mesh history, copy tweaks onto tweak node
 		:note: currently vertex and uv tweaks will be removed if keep is enabled, thus they must
-			both be specified"""
+			both be specified
+		:note: the tweaks of all given types are read and written in bulk, using a single 
+			undoable operation"""
 		check_types = ( isinstance( tweak_type, ( list, tuple ) ) and tweak_type ) or [ tweak_type ]
 		type_map = {
 							self.eComponentType.vertex : ( "pnts", api.MFnNumericData.k3Float, "polyTweak", api.MFn.kPolyTweak, "tweak" ),
 							self.eComponentType.uv : ( "uvpt", api.MFnNumericData.k2Float, "polyTweakUV", api.MFn.kPolyTweakUV, "uvTweak" )
 					}
 
-		mia = api.MIntArray()
+		assignments = list()
 		for reset_this_type in check_types:
 			try:
 				attrname, datatype, tweak_node_type, tweak_node_type_API, tweakattr = type_map[ reset_this_type ]
@@ -343,42 +679,27 @@ class Mesh( SurfaceShape ):		# base for epydoc !
 					dtweak_plug = tweak_node.findPlug(tweakattr)
 					stweak_plug = self.findPlug(attrname)
 
-					# copy the tweak values - iterate manually as the plug tends to
-					# report incorrect values if history is present - its odd
-					stweak_plug.evaluateNumElements()
-					
-					mia.clear()
-					stweak_plug.getExistingArrayAttributeIndices(mia)
-					for i in mia:
-						try:
-							tplug = stweak_plug.elementByLogicalIndex(i)
-						except RuntimeError:
-							continue
-						else:
-							dtweak_plug.elementByLogicalIndex(i).msetMObject(tplug.asMObject())
-						# END exception handling
-					# END for each tweak plug
+					# copy the tweak values, keeping the existing ones of the tweak node
+					elements = _tweakArrayElements(dtweak_plug)
+					elements.update(_tweakArrayElements(stweak_plug))
+					assignments.append((dtweak_plug, elements))
 
 					# proceed with reset of tweaks
 					pass
 				# END history handling
 			# END keep tweak result handling
 
+			# reset values of all existing elements at once
 			arrayplug = self.findPlug(attrname)
-			dataobj = api.MFnNumericData().create( datatype )
-
-			# reset values, do it for all components at once using a data object
-			try:
-				for p in arrayplug:
-					p.msetMObject( dataobj )
-			except RuntimeError:
-				# especially uvtweak array plugs return incorrect lengths, thus we may
-				# fail once we reach the end of the iteration.
-				# uvpt appears to display a lenght equalling the number of uvpoints in the mesh
-				# possibly only for the current uvset
-				pass
+			elements = _tweakArrayElements(arrayplug)
+			for index, values in elements.iteritems():
+				elements[index] = (0.0, ) * len(values)
+			# END for each element
+			assignments.append((arrayplug, elements))
 		# END for tweak type to reset
 		
+		_setTweakArrays(assignments)
+		
 	def component(self, component_type):
 		""":return: A component object able to hold the given component type
 		:param component_type: a member of the `eComponentType` enumeration"""
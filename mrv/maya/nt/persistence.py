@@ -8,19 +8,32 @@ __docformat__ = "restructuredtext"
 import os
 import sys
 import cPickle
-import cStringIO
 import binascii
+import struct
+import zlib
+from array import array
 import logging
 log = logging.getLogger('mrv.maya.nt.persistence')
 
 import maya.OpenMaya as api
 import maya.OpenMayaMPx as mpx
 
+from mrv.util import BlobStore, approximateSize
+
 persistence_enabled_envvar = "MRV_PERSISTENCE_ENABLED"
 _should_initialize_plugin = int(os.environ.get(persistence_enabled_envvar, False))
 
+# Configures the format in which pickled data is written, see `setPayloadFormat`
+payload_format_envvars = dict(	version = "MRV_PERSISTENCE_PAYLOAD_VERSION", 
+								compressionThreshold = "MRV_PERSISTENCE_COMPRESSION_THRESHOLD", 
+								rawBinary = "MRV_PERSISTENCE_RAW_BINARY", 
+								protocol = "MRV_PERSISTENCE_PICKLE_PROTOCOL", 
+								blobThreshold = "MRV_PERSISTENCE_BLOB_THRESHOLD" )
+
 
-__all__ = ('persistence_enabled_envvar', 'PyPickleData', 'createStorageAttribute')
+__all__ = ('persistence_enabled_envvar', 'payload_format_envvars', 'PyPickleData', 
+			'createStorageAttribute', 'setPayloadFormat', 'payloadFormat', 'blobStore', 
+			'dataTrackingInfo')
 
 #{ Initialization
 
@@ -37,18 +50,469 @@ def __initialize(nodes_module):
 
 #} END initialization
 
+#{ Payload Format
+# Payloads of version 0 are the base64 encoded pickle.
+# Payloads of version 1 start with a 4 byte header of '#', the version, the 
+# compression ('z'lib or 'n'one) and the encoding ('b'ase64 or 'r'aw). Raw payloads
+# are followed by the size of the data as 4 byte little endian unsigned int, 
+# the data and 0 bytes to align it to 4 bytes. Raw payloads are only written
+# to binary files. E'x'ternal payloads are followed by the 40 byte sha1 digest 
+# of the uncompressed pickle and the base64 encoded root of the blob store
+# which contains it.
+
+_kPayloadMagic = '#'
+_kPayloadVersion = 1
+
+_payload_format = dict(	version = _kPayloadVersion, 
+						compressionThreshold = 64 * 1024, 
+						rawBinary = 1, 
+						protocol = cPickle.HIGHEST_PROTOCOL, 
+						blobThreshold = -1 )
+for _key, _envvar in payload_format_envvars.iteritems():
+	if _envvar in os.environ:
+		_payload_format[_key] = int(os.environ[_envvar])
+	# END apply environment
+# END for each format option
+del(_key)
+del(_envvar)
+
+def setPayloadFormat(**kwargs):
+	"""Configure the format in which the pickled data is written into maya files.
+	Files using any format can always be read.
+	
+	:param kwargs:
+		 * version:
+		 	0 writes the format of previous versions, which is base64 encoded pickle 
+		 	data, for files which have to be read by older versions of MRV. 
+		 	1 is the default which supports all of the following options.
+		 * compressionThreshold:
+		 	pickle data of at least the given amount of bytes will be compressed 
+		 	using zlib. Defaults to 64 kb, use a negative value to disable compression
+		 * rawBinary:
+		 	if True, default True, binary files receive the data as is, otherwise 
+		 	it will be base64 encoded, increasing its size by a third
+		 * protocol:
+		 	pickle protocol to use, defaults to the highest available one
+		 * blobThreshold:
+		 	pickle data of at least the given amount of bytes will be written into 
+		 	the `blobStore` next to the file being written, the file only refers to it. 
+		 	Blobs are only written if their content changed, untitled scenes keep 
+		 	all data inline. Defaults to -1, which disables the blob store.
+	:raise ValueError: if an option or version is unknown
+	:note: all options can be preset using the environment variables in 
+		`payload_format_envvars`"""
+	for key in kwargs:
+		if key not in _payload_format:
+			raise ValueError("Unknown payload format option: %s" % key)
+	# END for each key
+	if kwargs.get('version', 0) not in (0, _kPayloadVersion):
+		raise ValueError("Unknown payload version: %i" % kwargs['version'])
+	# END check version
+	_payload_format.update(kwargs)
+	
+def payloadFormat():
+	""":return: dict with the currently configured payload format, as 
+	supported by `setPayloadFormat`"""
+	return _payload_format.copy()
+	
+def blobStore(scenepath=None):
+	""":return: BlobStore which is used for pickle data exceeding the blobThreshold
+		of the `payloadFormat`. It is a directory next to the scene, named after 
+		the scene with the '.blobs' suffix
+	:param scenepath: path to the scene, defaults to the file currently being 
+		written, which is the current scene unless it is being exported"""
+	if scenepath is None:
+		scenepath = _writeTargetFile()
+		if scenepath is None:
+			scenepath = api.MFileIO.currentFile()
+		# END handle untitled scene
+	# END default scene
+	return BlobStore(scenepath + ".blobs")
+	
+def _storeRoot(payload):
+	""":return: root of the blob store the given external payload refers to"""
+	return binascii.a2b_base64(payload[44:].strip())
+	
+def _openBlob(payload, origin=None):
+	""":return: memory map of the blob referred to by the given external payload
+	:param origin: path to the file the payload was read from, or None if unknown
+	:raise IOError: if the blob could not be found in its store, nor in the one 
+		next to the origin, which defaults to the current scene"""
+	digest = payload[4:44]
+	store = BlobStore(_storeRoot(payload))
+	try:
+		return store.open(digest)
+	except IOError:
+		# the file and its blobs might have been moved
+		return blobStore(origin or api.MFileIO.currentFile()).open(digest)
+	# END handle missing blob
+
+def _dumpsPayload(data, asBinary):
+	""":return: tuple(payload, isRaw) of the given python data, according 
+		to the configured payload format. The payload size is a multiple of 4 if 
+		it is raw.
+	:raise cPickle.PicklingError:"""
+	protocol = _payload_format['protocol']
+	if _payload_format['version'] == 0:
+		protocol = 2
+	# END legacy format
+	return _encodePickle(cPickle.dumps(data, protocol), asBinary)
+	
+def _encodePickle(pickled, asBinary):
+	""":return: tuple(payload, isRaw) of the given pickle string, see `_dumpsPayload`"""
+	fmt = _payload_format
+	if fmt['version'] == 0:
+		return binascii.b2a_base64(pickled).strip(), False
+	# END legacy format
+	
+	threshold = fmt['blobThreshold']
+	if threshold > -1 and len(pickled) >= threshold and _writeTargetFile() is not None:
+		store = blobStore()
+		digest = store.put(pickled)
+		return "%s%inx%s%s" % (_kPayloadMagic, _kPayloadVersion, digest, binascii.b2a_base64(store.root()).strip()), False
+	# END handle blob
+	
+	compression = 'n'
+	threshold = fmt['compressionThreshold']
+	if threshold > -1 and len(pickled) >= threshold:
+		compression = 'z'
+		pickled = zlib.compress(pickled)
+	# END handle compression
+	
+	header = "%s%i%s" % (_kPayloadMagic, _kPayloadVersion, compression)
+	if asBinary and fmt['rawBinary']:
+		payload = header + 'r' + struct.pack('<I', len(pickled)) + pickled
+		return payload + '\0' * (-len(payload) % 4), True
+	# END raw binary
+	return header + 'b' + binascii.b2a_base64(pickled).strip(), False
+	
+def _reencodePayload(payload, asBinary, origin=None):
+	""":return: tuple(payload, isRaw) to write the given payload into a stream. 
+		The payload will be reused as is if possible, and converted into the 
+		configured format without unpickling it otherwise. External payloads 
+		are only reused if they refer to the blob store of the file being written, 
+		their blob is copied into it or inlined otherwise
+	:param origin: see `_openBlob`"""
+	isLegacy = not payload.startswith(_kPayloadMagic)
+	isRaw = not isLegacy and payload[3] == 'r'
+	if isLegacy == (_payload_format['version'] == 0) and (asBinary or not isRaw):
+		if isLegacy or payload[3] != 'x':
+			return payload, isRaw
+		# END reuse internal payload
+		
+		target = _writeTargetFile()
+		if _payload_format['blobThreshold'] > -1 and target is not None and \
+			_storeRoot(payload) == blobStore(target).root():
+			return payload, isRaw
+		# END reuse external payload
+	# END reuse payload
+	return _encodePickle(_decodePayload(payload, origin), asBinary)
+	
+def _decodePayload(payload, origin=None):
+	""":return: pickle string contained in the given payload string
+	:param origin: see `_openBlob`
+	:raise ValueError: if the payload version is unknown
+	:raise IOError: if the blob of an external payload does not exist"""
+	if not payload.startswith(_kPayloadMagic):
+		return binascii.a2b_base64(payload)
+	# END legacy format
+	
+	version, compression, encoding = payload[1:4]
+	if version != str(_kPayloadVersion):
+		raise ValueError("Unknown payload version: %s" % version)
+	# END check version
+	
+	if encoding == 'x':
+		blob = _openBlob(payload, origin)
+		try:
+			return blob.read(len(blob))
+		finally:
+			blob.close()
+		# END assure blob is closed
+	elif encoding == 'r':
+		size = struct.unpack('<I', payload[4:8])[0]
+		data = payload[8:8+size]
+	else:
+		data = binascii.a2b_base64(payload[4:])
+	# END handle encoding
+	
+	if compression == 'z':
+		data = zlib.decompress(data)
+	# END handle compression
+	return data
+	
+def _loadsPayload(payload, origin=None):
+	""":return: python data contained in the given payload string
+	:param origin: see `_openBlob`
+	:raise ValueError: if the payload version is unknown
+	:raise IOError: if the blob of an external payload does not exist"""
+	if payload[3:4] == 'x' and payload.startswith("%s%i" % (_kPayloadMagic, _kPayloadVersion)):
+		blob = _openBlob(payload, origin)
+		try:
+			return cPickle.load(blob)
+		finally:
+			blob.close()
+		# END assure blob is closed
+	# END load external payload
+	return cPickle.loads(_decodePayload(payload, origin))
+	
+	
+class _Payload(object):
+	"""Keeps a payload as read from a file, and unpickles it on first access. 
+	As PyPickleData copies share their data, they share the payload as well"""
+	__slots__ = ('_payload', '_data', '_origin')
+	
+	def __init__(self, payload, origin=None):
+		self._payload = payload
+		self._data = None
+		self._origin = origin
+		
+	def isLoaded(self):
+		""":return: True if our payload was unpickled already"""
+		return self._payload is None
+		
+	def payload(self):
+		""":return: our payload string, or None if we are loaded"""
+		return self._payload
+		
+	def origin(self):
+		""":return: path to the file our payload was read from, or None if unknown"""
+		return self._origin
+		
+	def load(self):
+		""":return: our python data, unpickled on the first call
+		:raise ValueError: if the payload version is unknown"""
+		if self._payload is not None:
+			self._data = _loadsPayload(self._payload, self._origin)
+			self._payload = None
+		# END unpickle payload
+		return self._data
+	
+	
+#} END payload format
+
+#{ File Tracking
+
+class _FileTracker(object):
+	"""Keeps a stack of the files which are being read or written, as announced 
+	by the scene messages. The file is known to the check message only, which 
+	is why it is kept until the operation actually starts"""
+	__slots__ = ('_stack', '_pending', 'callbackIDs')
+	
+	def __init__(self, messages):
+		"""Initialize the instance
+		
+		:param messages: list of tuples of (checkFileMessage, beforeMessage, afterMessage)
+			of MSceneMessage"""
+		self._stack = list()
+		self._pending = dict()			# checkMessage -> path
+		self.callbackIDs = list()
+		msg = api.MSceneMessage
+		for check, before, after in messages:
+			self.callbackIDs.append(msg.addCheckFileCallback(check, self._checkFile, check))
+			self.callbackIDs.append(msg.addCallback(before, self._beforeFile, check))
+			self.callbackIDs.append(msg.addCallback(after, self._afterFile))
+		# END for each message
+		
+	def _checkFile(self, retCode, fileObject, check):
+		self._pending[check] = fileObject.resolvedFullName()
+		api.MScriptUtil.setBool(retCode, True)
+		
+	def _beforeFile(self, check):
+		self._stack.append(self._pending.pop(check, None))
+		
+	def _afterFile(self, clientData):
+		if self._stack:
+			self._stack.pop()
+		# END handle stack
+		
+	def current(self):
+		""":return: path to the innermost file being processed, or None"""
+		if self._stack:
+			return self._stack[-1]
+		return None
+		
+	def remove(self):
+		"""Remove our callbacks"""
+		for callbackID in self.callbackIDs:
+			api.MMessage.removeCallback(callbackID)
+			if hasattr(callbackID, 'disown'):
+				callbackID.disown()
+			# END prevent memory leak message
+		# END for each callback id
+		self.callbackIDs = list()
+		
+# trackers of files being read or written, see `_trackFiles`
+_readTracker = None
+_writeTracker = None
+
+def _trackFiles():
+	"""Start tracking the files being read and written"""
+	global _readTracker
+	global _writeTracker
+	msg = api.MSceneMessage
+	_readTracker = _FileTracker(((msg.kBeforeOpenCheck, msg.kBeforeOpen, msg.kAfterOpen), 
+								(msg.kBeforeImportCheck, msg.kBeforeImport, msg.kAfterImport), 
+								(msg.kBeforeReferenceCheck, msg.kBeforeReference, msg.kAfterReference), 
+								(msg.kBeforeLoadReferenceCheck, msg.kBeforeLoadReference, msg.kAfterLoadReference)))
+	_writeTracker = _FileTracker(((msg.kBeforeExportCheck, msg.kBeforeExport, msg.kAfterExport), ))
+	
+def _untrackFiles():
+	"""Stop tracking files, see `_trackFiles`"""
+	global _readTracker
+	global _writeTracker
+	for tracker in (_readTracker, _writeTracker):
+		if tracker is not None:
+			tracker.remove()
+		# END remove callbacks
+	# END for each tracker
+	_readTracker = _writeTracker = None
+	
+def _readSourceFile():
+	""":return: path to the file currently being read, or None if unknown"""
+	if _readTracker is None:
+		return None
+	return _readTracker.current()
+	
+def _writeTargetFile():
+	""":return: path to the file currently being written, which is the exported 
+		file or the current scene. None if the current scene is untitled"""
+	if _writeTracker is not None and _writeTracker.current():
+		return _writeTracker.current()
+	# END handle export
+	
+	import maya.cmds as cmds	# late import
+	if not cmds.file(q=1, sceneName=1):
+		return None
+	# END handle untitled scene
+	return api.MFileIO.currentFile()
+	
+#} END file tracking
+
 #{ Storage Plugin
 
+class _TrackingDict(dict):
+	"""Maps the pointers of PyPickleData instances to their python data. 
+	Payloads which were not unpickled yet will be unpickled and replaced by their 
+	data once they are retrieved.
+	
+	As maya copies data objects each time they are retrieved, many entries share
+	the same data object, which is referenced, not copied. Hence we keep a reference 
+	count per data object, which allows to account for shared data only once
+	
+	:note: the reference counts are used for accounting only, see `dataTrackingInfo`"""
+	__slots__ = '_refs'
+	
+	def __init__(self, *args, **kwargs):
+		dict.__init__(self)
+		self._refs = dict()			# id(data) -> [data, refcount]
+		self.update(*args, **kwargs)
+	
+	def _retain(self, data):
+		ref = self._refs.get(id(data))
+		if ref is None:
+			self._refs[id(data)] = [data, 1]
+		else:
+			ref[1] += 1
+		# END handle new data
+		
+	def _release(self, data):
+		ref = self._refs[id(data)]
+		ref[1] -= 1
+		if not ref[1]:
+			del(self._refs[id(data)])
+		# END drop data
+	
+	def __getitem__(self, key):
+		data = dict.__getitem__(self, key)
+		if type(data) is _Payload:
+			data = data.load()
+			self[key] = data
+		# END handle payload
+		return data
+		
+	def __setitem__(self, key, data):
+		if key in self:
+			self._release(dict.__getitem__(self, key))
+		# END release previous data
+		dict.__setitem__(self, key, data)
+		self._retain(data)
+		
+	def __delitem__(self, key):
+		data = dict.__getitem__(self, key)
+		dict.__delitem__(self, key)
+		self._release(data)
+		
+	def pop(self, key, *args):
+		if key not in self and args:
+			return args[0]
+		# END handle default
+		data = dict.__getitem__(self, key)
+		del(self[key])
+		return data
+		
+	def update(self, *args, **kwargs):
+		for key, data in dict(*args, **kwargs).iteritems():
+			self[key] = data
+		# END for each item
+		
+	def clear(self):
+		dict.clear(self)
+		self._refs.clear()
+		
+	def get(self, key, default=None):
+		try:
+			return self[key]
+		except KeyError:
+			return default
+		# END handle missing key
+		
+	def raw(self, key):
+		""":return: data stored at key without unpickling it, which is either
+			python data or a _Payload"""
+		return dict.__getitem__(self, key)
+		
+	def info(self):
+		""":return: see `dataTrackingInfo`"""
+		nbytes = 0
+		seen = set()
+		for data, count in self._refs.itervalues():
+			if type(data) is _Payload:
+				if not data.isLoaded():
+					nbytes += len(data.payload())
+					seen.add(id(data))
+					continue
+				# END handle payload
+				data = data.load()
+			# END handle lazy data
+			if id(data) in seen:
+				continue
+			seen.add(id(data))
+			nbytes += approximateSize(data, 3)
+		# END for each data object
+		return dict(entries=len(self), data=len(seen), bytes=nbytes)
+
 # GLOBAL PERSITENCE TRACKING DICT
 # assure we only have it once
-if not hasattr(sys, "_maya_pyPickleData_trackingDict"):
-	sys._maya_pyPickleData_trackingDict = dict()
+if not isinstance(getattr(sys, "_maya_pyPickleData_trackingDict", None), _TrackingDict):
+	sys._maya_pyPickleData_trackingDict = _TrackingDict(getattr(sys, "_maya_pyPickleData_trackingDict", dict()))
 
 
 # NOTE: We do not prevent the code to be executed if we are not to load as, 
 # at this point, openMayaAnim has been initialized already which in fact 
 # loads OpenMayaMPx that we would try to delay. 
 
+def dataTrackingInfo():
+	""":return: dict with information about the data tracked for all PyPickleData 
+		instances, with the following keys:
+		
+		 * entries: amount of PyPickleData instances
+		 * data: amount of distinct data objects they refer to, which is smaller 
+		 	than the amount of entries if data is shared
+		 * bytes: approximate amount of bytes used by the distinct data objects
+	:note: computing the amount of bytes walks the data and may take a moment"""
+	return sys._maya_pyPickleData_trackingDict.info()
+
 def createStorageAttribute(dataType, name_prefix=''):
 	""" This method creates an Attribute in a configuration suitable to be used
 	with the ``StorageBase`` interface. 
@@ -89,6 +553,41 @@ def createStorageAttribute(dataType, name_prefix=''):
 	# of scope
 	return api.MObject(aData)
 
+def _readIntPacks(inStream, count):
+	""":return: string of the bytes of count 4 byte integers read from the given 
+	binary stream
+	:note: the bytes of each int are stored least significant byte first"""
+	scriptutil = api.MScriptUtil()
+	scriptutil.createFromInt(0)
+	intptr = scriptutil.asIntPtr()
+	
+	readInt = api.MStreamUtils.readInt
+	getInt = scriptutil.getInt
+	ints = array('i', [0]) * count
+	for i in xrange(count):
+		readInt(inStream, intptr, True)
+		ints[i] = getInt(intptr)
+	# END for each int to read
+	
+	if sys.byteorder != 'little':
+		ints.byteswap()
+	# END handle endianess
+	return ints.tostring()
+
+def _writeIntPacks(ostream, payload):
+	"""Write the given string, whose size must be a multiple of 4, as 4 byte 
+	integers into the given binary stream. It can be read using `_readIntPacks`"""
+	ints = array('i')
+	ints.fromstring(payload)
+	if sys.byteorder != 'little':
+		ints.byteswap()
+	# END handle endianess
+	
+	writeInt = api.MStreamUtils.writeInt
+	for intval in ints:
+		writeInt(ostream, intval, True)
+	# END for each int to write
+
 class StoragePluginNode(mpx.MPxNode):
 	""" Base Class defining the storage node data interfaces  """
 
@@ -122,7 +621,10 @@ class PyPickleData(mpx.MPxData):
 		the copy constructor, even if you retrieve a const data reference, where this would not be
 		required actually. This is fine for most uses
 	:note: as the datatype is reference based, undo is currently not supported (or does not
-		work as it is expected to do"""
+		work as it is expected to do
+	:note: data read from files is unpickled once it is retrieved from the tracking 
+		dict for the first time. Until then, copies share the payload and write it
+		without unpickling it"""
 
 	# The ID used here has been assigned by the autodesk support and is globally unique !
 	kPluginDataId = api.MTypeId(0x0010D135)
@@ -138,7 +640,7 @@ class PyPickleData(mpx.MPxData):
 		
 		:note: we can be called even if maya is already unloaded or shutting down"""
 		if mpx.asHashable is not None:
-			del(sys._maya_pyPickleData_trackingDict[mpx.asHashable(self)])
+			sys._maya_pyPickleData_trackingDict.pop(mpx.asHashable(self), None)
 		# call super just to be on the safe side in future, currently it appears
 		# not to be required
 		try:
@@ -150,73 +652,67 @@ class PyPickleData(mpx.MPxData):
 
 	def _writeToStream(self, ostream, asBinary):
 		"""Write our data binary or ascii respectively"""
-		sout = cStringIO.StringIO()
+		data = self.__data
 		try:
-			cPickle.dump(self.__data, sout, protocol=2)
-		except cPickle.PicklingError, e:
+			if type(data) is _Payload and not data.isLoaded():
+				# untouched data is written without unpickling it
+				payload, isRaw = _reencodePayload(data.payload(), asBinary, data.origin())
+			else:
+				if type(data) is _Payload:
+					data = data.load()
+				payload, isRaw = _dumpsPayload(data, asBinary)
+			# END handle lazy data
+		except (cPickle.PicklingError, ValueError, zlib.error, EnvironmentError), e:
 			log.error(str(e))
 			return
 		# END pickle error handling
+		
+		if isRaw:
+			# 0 bytes terminate char buffers, hence raw data is written as ints
+			_writeIntPacks(ostream, payload)
+			return
+		# END handle raw data
 
 		if not asBinary:
 			api.MStreamUtils.writeChar(ostream, '"', asBinary)
 
-		# assure number of bytes is a multiple of 4
+		# assure number of bytes is a multiple of 4 as we read them in 4 byte packs.
+		# Base64 is already aligned, but we pad with whitespace, which is ignored 
+		# by the decoder, just to be sure. 0 bytes cannot be used as they terminate the stream
 		if asBinary:
-			for c in range(sout.tell() % 4):
-				sout.write(chr(0))		# 0 bytes
-
-		# NOTE: even binaries will be encoded as this circumvents the 0 byte which terminates the
-		# char byte stream ... can't help it but writing individual bytes
-		# TODO: improve this if it turns out to be too slow
-		api.MStreamUtils.writeCharBuffer(ostream, binascii.b2a_base64(sout.getvalue()).strip(), asBinary)
+			payload += ' ' * (-len(payload) % 4)
+		# END handle padding
+		api.MStreamUtils.writeCharBuffer(ostream, payload, asBinary)
 
 		if not asBinary:
 			api.MStreamUtils.writeChar(ostream, '"', asBinary)
 
 	def writeBinary(self, out):
-		"""cPickle to cStringIO, write in 4 byte packs using ScriptUtil"""
+		"""Write our payload, see `setPayloadFormat`"""
 		self._writeToStream(out, True)
 
 	def readBinary(self, inStream, numBytesToRead):
-		"""Read in 4 byte packs to cStringIO, unpickle from there
+		"""Read in 4 byte packs into an int array, keep its bytes as payload to be unpickled
+		on first access
 		
 		:note: this method is more complicated than it needs be since asCharPtr does not work !
 			It returns a string of a single char ... which is not the same :) !
-		:note: YES, this is a CUMBERSOME way to deal with bytes ... terrible, thanks maya :), thanks python"""
-		sio = cStringIO.StringIO()
-		scriptutil = api.MScriptUtil()
-		scriptutil.createFromInt(0)
-		intptr = scriptutil.asIntPtr()
-
+			Hence we still read int by int, but convert all of them to bytes at once"""
 		# require multiple of 4 !
 		if numBytesToRead % 4 != 0:
 			raise AssertionError("Require multiple of for for number of bytes to be read, but is %i" % numBytesToRead)
-
-		bitmask = 255								# mask the lower 8 bit
-		shiftlist = [0, 8, 16, 24]				# used to shift bits by respective values
-		for i in xrange(numBytesToRead  / 4):
-			api.MStreamUtils.readInt(inStream, intptr, True)
-			intval = scriptutil.getInt(intptr)
-
-			# convert to chars - endianess should be taken care of by python
-			for shift in shiftlist:
-				sio.write(chr((intval >> shift) & bitmask))
-			# END for each byte
-		# END for all 4 bytes to read
-
-		self.__data = cPickle.loads(binascii.a2b_base64(sio.getvalue()))
+		
+		self.__data = _Payload(_readIntPacks(inStream, numBytesToRead / 4), _readSourceFile())
 		sys._maya_pyPickleData_trackingDict[mpx.asHashable(self)] = self.__data
 
 	def writeASCII(self, out):
-		"""cPickle to cStringIO, encode with base64 encoding"""
+		"""Write our payload as string, see `setPayloadFormat`"""
 		self._writeToStream(out, False)
 
 	def readASCII(self, args, lastParsedElement):
-		"""Read base64 element and decode to cStringIO, then unpickle"""
+		"""Read the payload string to be unpickled on first access"""
 		parsedIndex = api.MScriptUtil.getUint(lastParsedElement)
-		base64encodedstring = args.asString(parsedIndex)
-		self.__data = cPickle.loads(binascii.a2b_base64(base64encodedstring))
+		self.__data = _Payload(args.asString(parsedIndex), _readSourceFile())
 
 		parsedIndex += 1
 		api.MScriptUtil.setUint(lastParsedElement,parsedIndex)	# proceed the index
@@ -227,7 +723,7 @@ class PyPickleData(mpx.MPxData):
 	def copy(self, other):
 		"""Copy other into self - allows copy pointers as maya copies the data each
 		time you retrieve it"""
-		otherdata = sys._maya_pyPickleData_trackingDict[mpx.asHashable(other)]
+		otherdata = sys._maya_pyPickleData_trackingDict.raw(mpx.asHashable(other))
 		self.__data = otherdata
 		sys._maya_pyPickleData_trackingDict[mpx.asHashable(self)] = self.__data
 
@@ -251,8 +747,10 @@ def initializePlugin(mobject):
 	
 	# register plugin data in the respective class
 	mrv.registerPluginDataTrackingDict(PyPickleData.kPluginDataId, sys._maya_pyPickleData_trackingDict)
+	_trackFiles()
 
 def uninitializePlugin(mobject):
+	_untrackFiles()
 	mplugin = mpx.MFnPlugin(mobject)
 	mplugin.deregisterData(PyPickleData.kPluginDataId)
 	mplugin.deregisterNode(StoragePluginNode.kPluginNodeId)
@@ -9,6 +9,8 @@ import maya.cmds as cmds
 import it
 import mrv.maya.undo as undo
 
+MObjectHandle = api.MObjectHandle
+
 
 #{ Exceptions 
 class ConstraintError( RuntimeError ):
@@ -17,6 +19,442 @@ class ConstraintError( RuntimeError ):
 #} 
 
 
+#{ Membership Index
+
+if hasattr( MObjectHandle, 'hashCode' ):
+	def _nodeKey( node ):
+		""":return: hashable key uniquely identifying the given node MObject"""
+		return MObjectHandle( node ).hashCode()
+else:
+	def _nodeKey( node ):
+		""":return: hashable key uniquely identifying the given node MObject"""
+		if node.hasFn( api.MFn.kDagNode ):
+			return api.MFnDagNode( node ).fullPathName()
+		return api.MFnDependencyNode( node ).name()
+# END handle maya support
+
+def _memberObject( member ):
+	""":return: the given member, which may be a Node, an MObject, an MDagPath or 
+	an MPlug, as MObject, MDagPath or MPlug"""
+	if isinstance( member, nt.DagNode ):
+		return member.dagPath()
+	elif isinstance( member, nt.DependNode ):
+		return member.object()
+	# END convert nodes
+	return member
+
+def _memberKey( member ):
+	""":return: hashable key identifying the given member, which may be a Node, 
+	an MObject, an MDagPath or an MPlug
+	:note: the key is based on a hash code, use `_findMember` to resolve collisions"""
+	member = _memberObject( member )
+	if isinstance( member, api.MDagPath ):
+		return ( _nodeKey( member.node() ), member.instanceNumber() )
+	if isinstance( member, api.MPlug ):
+		return ( _nodeKey( member.node() ), member.partialName( 0, 1, 1, 0, 1, 1 ) )
+	return ( _nodeKey( member ), 0 )
+	
+def _memberNode( member ):
+	""":return: node MObject of the given MObject, MDagPath or MPlug member"""
+	if isinstance( member, api.MObject ):
+		return member
+	return member.node()
+	
+def _findMember( members, member ):
+	"""
+	:return: tuple( key, entry ) of the given member in the members dict of a snapshot, 
+		see `_indexMembers`. entry is None if the member has none, key is the key to 
+		store it under in that case
+	:param member: Node, MObject, MDagPath or MPlug
+	:note: as hash codes are not guaranteed to be unique, the node of an entry is 
+		compared on each hit. Colliding members are stored under keys extended by 
+		the amount of collisions"""
+	member = _memberObject( member )
+	basekey = key = _memberKey( member )
+	entry = members.get( key )
+	collisions = 0
+	while entry is not None and _memberNode( entry[ 0 ] ) != _memberNode( member ):
+		collisions += 1
+		key = ( basekey, collisions )
+		entry = members.get( key )
+	# END resolve collisions
+	return key, entry
+	
+def _componentElements( component ):
+	"""
+	:return: tuple( componentType, set( element, ... ) ) of the given component, 
+		or None if the component is complete or not indexed. Elements are ints for 
+		single indexed components, and tuples of ints otherwise"""
+	if component.hasFn( api.MFn.kSingleIndexedComponent ):
+		fn = api.MFnSingleIndexedComponent( component )
+		if fn.isComplete():
+			return None
+		u = api.MIntArray()
+		fn.getElements( u )
+		return ( fn.componentType(), set( u ) )
+	elif component.hasFn( api.MFn.kDoubleIndexedComponent ):
+		fn = api.MFnDoubleIndexedComponent( component )
+		if fn.isComplete():
+			return None
+		u, v = api.MIntArray(), api.MIntArray()
+		fn.getElements( u, v )
+		return ( fn.componentType(), set( zip( u, v ) ) )
+	elif component.hasFn( api.MFn.kTripleIndexedComponent ):
+		fn = api.MFnTripleIndexedComponent( component )
+		if fn.isComplete():
+			return None
+		u, v, w = api.MIntArray(), api.MIntArray(), api.MIntArray()
+		fn.getElements( u, v, w )
+		return ( fn.componentType(), set( zip( u, v, w ) ) )
+	# END handle component type
+	return None
+	
+def _createComponent( componentType, elements ):
+	""":return: component MObject of the given type with the given elements, as 
+	returned by `_componentElements`"""
+	elements = sorted( elements )
+	if isinstance( elements[ 0 ], tuple ):
+		arrays = [ api.MIntArray() for i in range( len( elements[ 0 ] ) ) ]
+		for element in elements:
+			for array, index in zip( arrays, element ):
+				array.append( index )
+			# END for each index
+		# END for each element
+		if len( arrays ) == 2:
+			fn = api.MFnDoubleIndexedComponent()
+		else:
+			fn = api.MFnTripleIndexedComponent()
+		# END handle dimensions
+		component = fn.create( componentType )
+		fn.addElements( *arrays )
+	else:
+		fn = api.MFnSingleIndexedComponent()
+		component = fn.create( componentType )
+		fn.addElements( api.MIntArray.mfromList( elements ) )
+	# END handle component type
+	return component
+	
+def _indexMembers( sellist ):
+	"""
+	:return: tuple( members, order ) snapshot of the given selection list, members 
+		being a dict( memberKey -> entry ) and order the list of member keys in the order 
+		of the selection list. Each entry is a list( member, is_whole, dict( componentType -> 
+		set( element, ... ) ), list( component, ... ) ), where the last list keeps components
+		which could not be indexed"""
+	members = dict()
+	order = list()
+	for member, component in it.iterSelectionList( sellist, asNode = 0, handleComponents = 1 ):
+		key, entry = _findMember( members, member )
+		if entry is None:
+			entry = members[ key ] = [ member, False, dict(), list() ]
+			order.append( key )
+		# END create entry
+		
+		if component.isNull():
+			entry[ 1 ] = True
+			continue
+		# END whole member
+		
+		elements = _componentElements( component )
+		if elements is None:
+			entry[ 3 ].append( component )
+		else:
+			entry[ 2 ].setdefault( elements[ 0 ], set() ).update( elements[ 1 ] )
+		# END handle component type
+	# END for each member
+	return members, order
+	
+def _mergeMembers( snapshots ):
+	""":return: ( members, order ) snapshot of the union of the given ( members, order ) 
+	snapshots, which remain unaltered"""
+	if len( snapshots ) == 1:
+		return snapshots[ 0 ]
+	
+	members = dict()
+	order = list()
+	for smembers, sorder in snapshots:
+		for skey in sorder:
+			sentry = smembers[ skey ]
+			key, entry = _findMember( members, sentry[ 0 ] )
+			if entry is None:
+				components = dict( [ ( ctype, set( elements ) ) for ctype, elements in sentry[ 2 ].iteritems() ] )
+				members[ key ] = [ sentry[ 0 ], sentry[ 1 ], components, list( sentry[ 3 ] ) ]
+				order.append( key )
+				continue
+			# END new entry
+			
+			entry[ 1 ] = entry[ 1 ] or sentry[ 1 ]
+			for ctype, elements in sentry[ 2 ].iteritems():
+				entry[ 2 ].setdefault( ctype, set() ).update( elements )
+			entry[ 3 ].extend( sentry[ 3 ] )
+		# END for each member
+	# END for each snapshot
+	return members, order
+	
+def _intersectMembers( snapshot, other ):
+	"""
+	:return: ( members, order ) snapshot with the members of snapshot which are in other 
+		as well, or None if components were involved which could not be indexed"""
+	members, order = snapshot
+	omembers = other[ 0 ]
+	rmembers = dict()
+	rorder = list()
+	for key in order:
+		entry = members[ key ]
+		oentry = _findMember( omembers, entry[ 0 ] )[ 1 ]
+		if oentry is None:
+			continue
+		
+		if entry[ 1 ] and oentry[ 1 ]:
+			rentry = [ entry[ 0 ], True, dict(), list() ]
+		elif entry[ 1 ]:
+			rentry = [ entry[ 0 ], False, oentry[ 2 ], oentry[ 3 ] ]
+		elif oentry[ 1 ]:
+			rentry = [ entry[ 0 ], False, entry[ 2 ], entry[ 3 ] ]
+		else:
+			if entry[ 3 ] or oentry[ 3 ]:
+				return None
+			components = dict()
+			for ctype, elements in entry[ 2 ].iteritems():
+				common = elements & oentry[ 2 ].get( ctype, set() )
+				if common:
+					components[ ctype ] = common
+			# END for each component type
+			if not components:
+				continue
+			rentry = [ entry[ 0 ], False, components, list() ]
+		# END handle whole objects and components
+		rmembers[ key ] = rentry
+		rorder.append( key )
+	# END for each member
+	return rmembers, rorder
+	
+def _subtractMembers( snapshot, other ):
+	"""
+	:return: ( members, order ) snapshot with the members of snapshot which are not in other, 
+		or None if components were involved which could not be indexed"""
+	members, order = snapshot
+	omembers = other[ 0 ]
+	rmembers = dict()
+	rorder = list()
+	for key in order:
+		entry = members[ key ]
+		oentry = _findMember( omembers, entry[ 0 ] )[ 1 ]
+		if oentry is not None:
+			if oentry[ 1 ]:
+				continue
+			if entry[ 1 ] or entry[ 3 ] or oentry[ 3 ]:
+				# we would need to know all elements of the object
+				return None
+			
+			components = dict()
+			for ctype, elements in entry[ 2 ].iteritems():
+				remaining = elements - oentry[ 2 ].get( ctype, set() )
+				if remaining:
+					components[ ctype ] = remaining
+			# END for each component type
+			if not components:
+				continue
+			entry = [ entry[ 0 ], False, components, list() ]
+		# END handle intersecting member
+		rmembers[ key ] = entry
+		rorder.append( key )
+	# END for each member
+	return rmembers, rorder
+	
+def _membersToSelectionList( snapshot ):
+	""":return: MSelectionList with the members of the given ( members, order ) snapshot"""
+	members, order = snapshot
+	sellist = api.MSelectionList()
+	for key in order:
+		member, is_whole, components, unindexed = members[ key ]
+		if is_whole or not isinstance( member, api.MDagPath ):
+			sellist.add( member )
+			continue
+		# END handle whole members
+		
+		for ctype, elements in components.iteritems():
+			sellist.add( member, _createComponent( ctype, elements ), True )
+		for component in unindexed:
+			sellist.add( member, component, True )
+	# END for each member
+	return sellist
+	
+
+class MembershipIndex( object ):
+	"""Hashed snapshot of the members of an object set, allowing to test membership 
+	in constant time.
+	
+	The snapshot is taken on first use and kept until the membership of the set 
+	changes, which is when it will be retaken with the next query.
+	
+	:note: obtain instances using `ObjectSet.membershipIndex`"""
+	__slots__ = ( 'handle', 'members', 'order', 'callbackIDs' )
+	
+	def __init__( self, setobj ):
+		self.handle = MObjectHandle( setobj )
+		self.members = None		# see _indexMembers
+		self.order = None
+		if hasattr( api, 'MObjectSetMessage' ):
+			callbackID = api.MObjectSetMessage.addSetMembersModifiedCallback( setobj, self._membersModified )
+		else:
+			callbackID = api.MNodeMessage.addAttributeChangedCallback( setobj, self._attributeChanged )
+		# END handle maya support
+		self.callbackIDs = ( callbackID, api.MNodeMessage.addNodePreRemovalCallback( setobj, self._nodeRemoved ) )
+	
+	def _membersModified( self, node, clientData ):
+		self.invalidate()
+		
+	def _nodeRemoved( self, node, clientData ):
+		key = _nodeKey( node )
+		if _membershipIndexCache.get( key ) is self:
+			del( _membershipIndexCache[ key ] )
+		# END drop from cache
+		self.remove()
+		
+	def _attributeChanged( self, msg, plug, otherPlug, clientData ):
+		if msg & ( api.MNodeMessage.kConnectionMade | api.MNodeMessage.kConnectionBroken ):
+			self.invalidate()
+		# END handle membership change
+	
+	def _update( self ):
+		"""Retake the snapshot if it was invalidated"""
+		if self.members is not None:
+			return
+		
+		sellist = api.MSelectionList()
+		api.MFnSet( self.handle.object() ).getMembers( sellist, False )
+		self.members, self.order = _indexMembers( sellist )
+		
+	#{ Interface
+	
+	def invalidate( self ):
+		"""Mark the snapshot out of date"""
+		self.members = None
+		self.order = None
+		
+	def snapshot( self ):
+		""":return: tuple( members, order ) of the current snapshot
+		:note: the returned structures must not be altered"""
+		self._update()
+		return self.members, self.order
+		
+	def isIndexOf( self, setobj ):
+		""":return: True if we index the given object set"""
+		return self.handle.isValid() and self.handle.object() == setobj
+	
+	def remove( self ):
+		"""Remove our callbacks"""
+		for callbackID in self.callbackIDs:
+			api.MMessage.removeCallback( callbackID )
+			if hasattr( callbackID, 'disown' ):
+				callbackID.disown()
+			# END prevent memory leak message
+		# END for each callback id
+		self.callbackIDs = tuple()
+		
+	def contains( self, member, component = None ):
+		""":return: True if the given member is part of the object set
+		:param member: Node, MObject, MDagPath or MPlug
+		:param component: if given and not null, all its elements must be part 
+			of the set, either explicitly or because the whole member is in the set"""
+		self._update()
+		entry = _findMember( self.members, member )[ 1 ]
+		if entry is None:
+			return False
+		if component is None or component.isNull() or entry[ 1 ]:
+			return True
+		
+		elements = _componentElements( component )
+		if elements is None or entry[ 3 ]:
+			# complete or exotic components are left to maya
+			memberobj = entry[ 0 ]
+			if isinstance( memberobj, api.MDagPath ):
+				return api.MFnSet( self.handle.object() ).isMember( memberobj, component )
+			return False
+		# END handle unindexed components
+		
+		indexed = entry[ 2 ].get( elements[ 0 ] )
+		return indexed is not None and elements[ 1 ].issubset( indexed )
+		
+	def areMembers( self, members ):
+		""":return: list of bools, one for each of the given members, True if the respective 
+			member is part of the object set
+		:param members: iterable of Nodes, MObjects, MDagPaths or MPlugs, or an MSelectionList, 
+			whose components will be taken into consideration"""
+		if isinstance( members, api.MSelectionList ):
+			contains = self.contains
+			return [ contains( m, c ) for m, c in it.iterSelectionList( members, asNode = 0, handleComponents = 1 ) ]
+		# END handle selection lists
+		
+		self._update()
+		indexed = self.members
+		return [ _findMember( indexed, m )[ 1 ] is not None for m in members ]
+		
+	def __len__( self ):
+		""":return: amount of distinct members, components of the same object count once"""
+		self._update()
+		return len( self.members )
+		
+	def __contains__( self, member ):
+		return self.contains( member )
+	
+	#} END interface
+	
+# set hashkey -> MembershipIndex
+_membershipIndexCache = dict()
+
+# ids of the scene callbacks clearing the cache, registered with its first entry
+_membershipIndexCallbackIDs = list()
+
+def _clearMembershipIndexCache( *args ):
+	"""Remove all indices, as the scene they refer to is gone"""
+	for index in _membershipIndexCache.values():
+		index.remove()
+	# END for each index
+	_membershipIndexCache.clear()
+	
+def _removeMembershipIndexCallbacks( ):
+	"""Remove our scene callbacks and all indices"""
+	_clearMembershipIndexCache()
+	for callbackID in _membershipIndexCallbackIDs:
+		api.MMessage.removeCallback( callbackID )
+		if hasattr( callbackID, 'disown' ):
+			callbackID.disown()
+		# END prevent memory leak message
+	# END for each callback id
+	del( _membershipIndexCallbackIDs[:] )
+	
+def _registerMembershipIndexCallbacks( ):
+	"""Clear the cache whenever the scene changes, and remove our callbacks on exit"""
+	if _membershipIndexCallbackIDs:
+		return
+	# END handle registered
+	for msg in ( api.MSceneMessage.kAfterNew, api.MSceneMessage.kBeforeOpen ):
+		_membershipIndexCallbackIDs.append( api.MSceneMessage.addCallback( msg, _clearMembershipIndexCache ) )
+	# END for each scene message
+	import atexit
+	atexit.register( _removeMembershipIndexCallbacks )
+
+def _membershipIndex( setobj ):
+	""":return: up-to-date MembershipIndex of the given object set MObject"""
+	key = _nodeKey( setobj )
+	index = _membershipIndexCache.get( key )
+	if index is not None and not index.isIndexOf( setobj ):
+		index.remove()
+		index = None
+	# END handle stale index
+	
+	if index is None:
+		_registerMembershipIndexCallbacks()
+		index = MembershipIndex( setobj )
+		_membershipIndexCache[ key ] = index
+	# END create index
+	return index
+
+#} END membership index
+
+
 class ObjectSet:
 	""" Extended and more convenient object set interface dealing with Nodes ( and 
 	provides the original MFnSet interface as well
@@ -352,6 +790,20 @@ class ObjectSet:
 			return self._mfncls( self._apiobj ).isMember( self._toMemberObj( obj ), component )
 		return self._mfncls( self._apiobj ).isMember( self._toMemberObj( obj ) )
 		
+	def membershipIndex( self ):
+		"""
+		:return: `MembershipIndex` with a snapshot of our members, useful to test many 
+			objects for membership. The snapshot will be retaken automatically once our
+			members change"""
+		return _membershipIndex( self._apiobj )
+		
+	def areMembers( self, nodes ):
+		"""
+		:return: list of bools, True for each of the given nodes which is a member 
+			of this set
+		:param nodes: see `MembershipIndex.areMembers`"""
+		return self.membershipIndex().areMembers( nodes )
+		
 	#} END member query
 	
 	# Aliases
@@ -431,8 +883,40 @@ class ObjectSet:
 		raise TypeError( "Type InputObjects for set operation ( %r ) was not recognized" % objects )
 		
 	
+	@classmethod
+	def _toSetOpSnapshots( cls, objects, sets_are_members = False ):
+		"""
+		:return: list of ( members, order ) snapshots of the given objects, which are the 
+			same input as for `_toValidSetOpInput`
+		:note: sets are represented by their `MembershipIndex`, other objects are indexed 
+			right away"""
+		if isinstance( objects, ( tuple, list ) ):
+			if not objects:
+				return list()
+			if not sets_are_members and isinstance( objects[ 0 ], ObjectSet ):
+				return [ setNode.membershipIndex().snapshot() for setNode in objects ]
+			return [ _indexMembers( nt.toSelectionList( objects ) ) ]
+		# END list handling
+		
+		singleobj = objects
+		if isinstance( singleobj, api.MSelectionList ):
+			return [ _indexMembers( singleobj ) ]
+		if not sets_are_members and isinstance( singleobj, ObjectSet ):
+			return [ singleobj.membershipIndex().snapshot() ]
+		if isinstance( singleobj, cls._TmpSet ):
+			return [ _membershipIndex( singleobj.setobj ).snapshot() ]
+		if isinstance( singleobj, api.MObject ) and singleobj.hasFn( api.MFn.kSet ):
+			return [ _membershipIndex( singleobj ).snapshot() ]
+		if isinstance( singleobj, api.MObjectArray ):
+			return [ _membershipIndex( singleobj[ i ] ).snapshot() for i in range( singleobj.length() ) ]
+		
+		# Can be Node, MDagPath or plug or MObject ( not set )
+		return cls._toSetOpSnapshots( ( singleobj, ), sets_are_members = sets_are_members )
+	
 	def _applySetOp( self, objects, opid, **kwargs ):
-		"""Apply the set operation with the given id"""
+		"""Apply the set operation with the given id using MFnSet
+		
+		:note: requires temporary sets for objects which are no sets"""
 		# have to do it in steps to assure our temporary set will be deleted after 
 		# the operation has finished
 		obj = fobj = self._toValidSetOpInput( objects, **kwargs )
@@ -472,10 +956,13 @@ class ObjectSet:
 			If you have objects in a list as well as sets
 			themselves, objects must come first as the operation will fail otherwise.
 		:param sets_are_members: if True, objects can contain sets, but they should not be treated 
-			as sets to apply the set operation with, they should simply be members of this set, and 
-			thus need to be wrapped into a tmp set as well
-		:return: MSelectionList of all objects of self and objects """
-		return self._applySetOp( objects, "union", sets_are_members = sets_are_members )
+			as sets to apply the set operation with, they should simply be members of this set
+		:return: MSelectionList of all objects of self and objects
+		:note: operates on the `MembershipIndex` snapshots of the sets involved, components
+			of the same object are merged"""
+		snapshots = self._toSetOpSnapshots( objects, sets_are_members = sets_are_members )
+		snapshots.insert( 0, self.membershipIndex().snapshot() )
+		return _membersToSelectionList( _mergeMembers( snapshots ) )
 		
 	def getIntersection( self, objects, sets_are_members = False  ):
 		"""As `union`, but returns the intersection ( items in common ) of this 
@@ -483,15 +970,44 @@ class ObjectSet:
 		
 		:param objects: see `union`
 		:param sets_are_members: see `union`
-		:return: MSelectionList of objects being in self and in objects"""
-		return self._applySetOp( objects, "intersection", sets_are_members = sets_are_members )
+		:return: MSelectionList of objects being in self and in objects
+		:note: if components are involved which cannot be indexed, the operation 
+			will be performed by maya"""
+		snapshots = self._toSetOpSnapshots( objects, sets_are_members = sets_are_members )
+		if not snapshots:
+			return api.MSelectionList()
+		
+		# members need to be in every given set
+		result = self.membershipIndex().snapshot()
+		for snapshot in snapshots:
+			result = _intersectMembers( result, snapshot )
+			if result is None:
+				return self._applySetOp( objects, "intersection", sets_are_members = sets_are_members )
+		# END for each snapshot
+		return _membersToSelectionList( result )
 		
 	def getDifference( self, objects, sets_are_members = False  ):
 		"""return the result of ``self minus objects``, thus objects will be substracted from our obejcts
 		
 		:param objects: see `union`
 		:param sets_are_members: see `union`
-		:return: MSelectionList containing objects of self not being in objects list"""
+		:return: MSelectionList containing objects of self not being in objects list
+		:note: if components are involved which cannot be indexed, the operation 
+			will be performed by maya"""
+		snapshots = self._toSetOpSnapshots( objects, sets_are_members = sets_are_members )
+		own = self.membershipIndex().snapshot()
+		if not snapshots:
+			return _membersToSelectionList( own )
+			
+		result = _subtractMembers( own, _mergeMembers( snapshots ) )
+		if result is None:
+			return self._mfnDifference( objects, sets_are_members = sets_are_members )
+		return _membersToSelectionList( result )
+		
+	@undoable
+	def _mfnDifference( self, objects, sets_are_members = False ):
+		"""Compute the difference using MFnSet, temporarily removing the intersecting 
+		members from this set"""
 		# have to do the intersections individually and keep them 
 		intersections = list()
 		obj = fobj = self._toValidSetOpInput( objects, sets_are_members = sets_are_members )
@@ -505,7 +1021,7 @@ class ObjectSet:
 			fobj = [ fobj ]
 		
 		for item in fobj:
-			intersections.append( self.intersection( item ) )
+			intersections.append( self._applySetOp( item, "intersection" ) )
 		
 		# remove intersecting members temporarily 
 		for its in intersections:
@@ -563,7 +1079,7 @@ class ObjectSet:
 	
 	def __contains__( self, obj ):
 		""":return: True if the given obj is member of this set"""
-		return self.isMember( obj )
+		return self.membershipIndex().contains( obj )
 	#} END protocols 
 	
 	
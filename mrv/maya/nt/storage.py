@@ -5,21 +5,178 @@ mrv and derived nodes.
 __docformat__ = "restructuredtext"
 
 import os
+import sys
 from persistence import PyPickleData
 import maya.OpenMaya as api
 
 import mrv.maya.undo as undo
 from mrv.util import iDuplicatable
 
-from base import Node, DependNode, Data, createNode, delete
+from base import Node, DependNode, Data, createNode, delete, LogicalIndexAllocation
 from set import ObjectSet
 
 import copy
+import bisect
 
 MFnDependencyNode = api.MFnDependencyNode
+MObjectHandle = api.MObjectHandle
 
 __all__ = ("StorageBase", "StorageNode")
 
+#{ DataID Index
+
+class _DataIDIndex(object):
+	"""Maps the dataIDs of the elements of a master plug to their logical indices.
+	
+	The index is kept in sync with the edits made by this module. Changes to the 
+	elements or ids which are made by anyone else, including undo and redo, 
+	invalidate it, which causes it to be rebuilt with the next lookup. Once the 
+	node is removed, the index drops out of the cache"""
+	__slots__ = ('handle', 'key', 'masterAttr', 'idAttr', 'ids', 'order', 'suppress', 'callbackIDs')
+	
+	kEditMask = (	api.MNodeMessage.kAttributeSet | api.MNodeMessage.kAttributeArrayAdded | 
+					api.MNodeMessage.kAttributeArrayRemoved | api.MNodeMessage.kAttributeAdded | 
+					api.MNodeMessage.kAttributeRemoved | api.MNodeMessage.kAttributeRenamed | 
+					api.MNodeMessage.kConnectionMade | api.MNodeMessage.kConnectionBroken )
+	
+	def __init__(self, masterPlug, key):
+		node = masterPlug.node()
+		self.handle = MObjectHandle(node)
+		self.key = key			# key in the _dataIDIndexCache
+		self.masterAttr = masterPlug.attribute()
+		self.idAttr = api.MFnCompoundAttribute(self.masterAttr).child(0)
+		self.ids = None			# dataID -> logical index
+		self.order = None		# (logicalIndex, dataID) tuples in physical order
+		self.suppress = False
+		self.callbackIDs = (	api.MNodeMessage.addAttributeChangedCallback(node, self._attributeChanged), 
+								api.MNodeMessage.addNodePreRemovalCallback(node, self._nodeRemoved))
+		
+	def _nodeRemoved(self, node, clientData):
+		if _dataIDIndexCache.get(self.key) is self:
+			del(_dataIDIndexCache[self.key])
+		# END drop from cache
+		self.remove()
+		
+	def _attributeChanged(self, msg, plug, otherPlug, clientData):
+		if self.suppress or self.ids is None or not (msg & self.kEditMask):
+			return
+		attr = plug.attribute()
+		if attr == self.idAttr or attr == self.masterAttr:
+			self.invalidate()
+		# END handle relevant change
+	
+	@classmethod
+	def scan(cls, masterPlug):
+		""":return: tuple(dict(dataID -> logicalIndex), list((logicalIndex, dataID), ...)) 
+		of the given master plug's elements, in physical order. The first element wins 
+		if a dataID exists multiple times"""
+		ids = dict()
+		order = list()
+		for compoundplug in masterPlug:
+			did = compoundplug.child(0).asString()
+			logicalIndex = compoundplug.logicalIndex()
+			if did not in ids:
+				ids[did] = logicalIndex
+			order.append((logicalIndex, did))
+		# END for each compound plug element
+		return ids, order
+	
+	def update(self, masterPlug):
+		"""Rebuild the index if it was invalidated"""
+		if self.ids is None:
+			self.ids, self.order = self.scan(masterPlug)
+		# END rebuild index
+	
+	def invalidate(self):
+		self.ids = None
+		self.order = None
+		
+	def add(self, dataID, logicalIndex):
+		"""Record a new element, which may fill a gap in the logical indices"""
+		if self.ids is None:
+			return
+		self.ids.setdefault(dataID, logicalIndex)
+		bisect.insort(self.order, (logicalIndex, dataID))
+		
+	def isIndexOf(self, node):
+		""":return: True if we index the given node"""
+		return self.handle.isValid() and self.handle.object() == node
+		
+	def remove(self):
+		"""Remove our callbacks"""
+		for callbackID in self.callbackIDs:
+			api.MMessage.removeCallback(callbackID)
+			if hasattr(callbackID, 'disown'):
+				callbackID.disown()
+			# END prevent memory leak message
+		# END for each callback id
+		self.callbackIDs = tuple()
+	
+# (MObjectHandle.hashCode, master plug name) -> _DataIDIndex
+_dataIDIndexCache = dict()
+
+# ids of the scene callbacks clearing the cache, registered with its first entry
+_dataIDIndexCallbackIDs = list()
+
+def _clearDataIDIndexCache(*args):
+	"""Remove all indices, as the scene they refer to is gone"""
+	for index in _dataIDIndexCache.values():
+		index.remove()
+	# END for each index
+	_dataIDIndexCache.clear()
+	
+def _removeDataIDIndexCallbacks():
+	"""Remove our scene callbacks and all indices"""
+	_clearDataIDIndexCache()
+	for callbackID in _dataIDIndexCallbackIDs:
+		api.MMessage.removeCallback(callbackID)
+		if hasattr(callbackID, 'disown'):
+			callbackID.disown()
+		# END prevent memory leak message
+	# END for each callback id
+	del(_dataIDIndexCallbackIDs[:])
+	
+def _registerDataIDIndexCallbacks():
+	"""Clear the cache whenever the scene changes, and remove our callbacks on exit"""
+	if _dataIDIndexCallbackIDs:
+		return
+	# END handle registered
+	for msg in (api.MSceneMessage.kAfterNew, api.MSceneMessage.kBeforeOpen):
+		_dataIDIndexCallbackIDs.append(api.MSceneMessage.addCallback(msg, _clearDataIDIndexCache))
+	# END for each scene message
+	import atexit
+	atexit.register(_removeDataIDIndexCallbacks)
+
+def _dataIDIndex(masterPlug):
+	""":return: up-to-date _DataIDIndex of the given master plug, or None if 
+	the plug cannot be indexed"""
+	if not hasattr(MObjectHandle, 'hashCode'):
+		return None
+	# END handle maya support
+	
+	node = masterPlug.node()
+	handle = MObjectHandle(node)
+	if not handle.isValid():
+		return None
+	# END handle invalid nodes
+	
+	key = (handle.hashCode(), masterPlug.partialName())
+	index = _dataIDIndexCache.get(key)
+	if index is not None and not index.isIndexOf(node):
+		index.remove()
+		index = None
+	# END handle stale index
+	
+	if index is None:
+		_registerDataIDIndexCallbacks()
+		index = _DataIDIndex(masterPlug, key)
+		_dataIDIndexCache[key] = index
+	# END create index
+	index.update(masterPlug)
+	return index
+	
+#} END dataid index
+
 #{ Procedural Access
 # Functions to access most functionality of the storagebase without actually deriving from it
 # They are as low-level as possible regarding their input parameters
@@ -27,6 +184,14 @@ __all__ = ("StorageBase", "StorageNode")
 def findStoragePlug(masterPlug, dataID):
 	""":return: compound plug containing all data and connections for the given dataID
 	:param masterPlug: compound plug containing all data"""
+	index = _dataIDIndex(masterPlug)
+	if index is not None:
+		logicalIndex = index.ids.get(dataID)
+		if logicalIndex is None:
+			return None
+		return masterPlug.elementByLogicalIndex(logicalIndex)
+	# END use index
+	
 	for compoundplug in masterPlug:
 		if compoundplug.child(0).asString() == dataID:
 			return compoundplug
@@ -38,8 +203,36 @@ def _makeElementPlug(masterPlug, dataID):
 	"""Find an empty logical plug index and return the newly created
 	logical plug with given dataID - unconditionally"""
 	elementPlug = masterPlug.mnextLogicalPlug()
-	elementPlug.child(0).msetString(dataID)
+	index = _dataIDIndex(masterPlug)
+	if index is None:
+		elementPlug.child(0).msetString(dataID)
+		return elementPlug
+	# END handle no index
+	
+	index.suppress = True
+	try:
+		elementPlug.child(0).msetString(dataID)
+	finally:
+		index.suppress = False
+	# END keep index
+	index.add(dataID, elementPlug.logicalIndex())
 	return elementPlug
+	
+def _typedStoragePlug(matchedplug, plugType):
+	""":return: plug of the given plugType below matchedplug, see `storagePlug`"""
+	if plugType is None:
+		return (matchedplug.child(2), matchedplug.child(3))
+	elif plugType == StorageBase.kStorage:
+		return matchedplug
+	elif plugType == StorageBase.kValue:
+		return matchedplug.child(2)
+	elif plugType == StorageBase.kMessage:
+		return matchedplug.child(3)
+	elif plugType == StorageBase.kFlags:
+		return matchedplug.child(1)
+	else:
+		raise TypeError("Invalid plugType value: %s" % plugType)
+	#END handle plug type
 
 @undoable
 def storagePlug(masterPlug, dataID, plugType = None, autoCreate=False):
@@ -66,20 +259,48 @@ def storagePlug(masterPlug, dataID, plugType = None, autoCreate=False):
 			raise AttributeError("Plug with id %s not found" % dataID)
 	# END matched plug not found handling
 	
-	# return the result
-	if plugType is None:
-		return (matchedplug.child(2), matchedplug.child(3))
-	elif plugType == StorageBase.kStorage:
-		return matchedplug
-	elif plugType == StorageBase.kValue:
-		return matchedplug.child(2)
-	elif plugType == StorageBase.kMessage:
-		return matchedplug.child(3)
-	elif plugType == StorageBase.kFlags:
-		return matchedplug.child(1)
+	return _typedStoragePlug(matchedplug, plugType)
+	
+@undoable
+def storagePlugs(masterPlug, dataIDs, plugType = None, autoCreate=False):
+	"""
+	:return: list of plugs as returned by `storagePlug`, one for each of the given dataIDs
+	:param dataIDs: iterable of data ids
+	:param plugType: see `storagePlug`
+	:param autoCreate: see `storagePlug`
+	:raise AttributeError: see `storagePlug`
+	:note: the elements of the master plug will be scanned at most once, the logical
+		indices of new elements are allocated in one go"""
+	index = _dataIDIndex(masterPlug)
+	if index is not None:
+		ids = index.ids
 	else:
-		raise TypeError("Invalid plugType value: %s" % plugType)
-	#END handle plug type
+		ids = _DataIDIndex.scan(masterPlug)[0]
+	# END obtain ids
+	
+	allocation = LogicalIndexAllocation()
+	allocation.begin()
+	try:
+		plugs = list()
+		for dataID in dataIDs:
+			logicalIndex = ids.get(dataID)
+			if logicalIndex is None:
+				if not autoCreate:
+					raise AttributeError("Plug with id %s not found" % dataID)
+				# END handle missing plug
+				matchedplug = _makeElementPlug(masterPlug, dataID)
+				if index is None:
+					ids[dataID] = matchedplug.logicalIndex()
+				# END keep local ids
+			else:
+				matchedplug = masterPlug.elementByLogicalIndex(logicalIndex)
+			# END handle existing plug
+			plugs.append(_typedStoragePlug(matchedplug, plugType))
+		# END for each dataID
+	finally:
+		allocation.end()
+	# END assure allocation ends
+	return plugs
 
 @undoable
 def makePlug(masterPlug, dataID):
@@ -157,6 +378,12 @@ def dataIDs(masterPlug, data_prefix=''):
 	:param data_prefix: the string prefix of data names which must match with the prefix
 		of the data id to be returned, with the matching prefix pruned. 
 		By default, all data ids will match"""
+	index = _dataIDIndex(masterPlug)
+	if index is not None:
+		lp = len(data_prefix)
+		return [did[lp:] for li, did in index.order if did.startswith(data_prefix)]
+	# END use index
+	
 	outids = list()
 	for compoundplug in masterPlug:
 		did = compoundplug.child(0).asString()
@@ -236,6 +463,86 @@ def deleteObjectSet(mdplug, setIndex):
 			
 #} END procedural access
 
+#{ Change Tracking
+
+def _untracked(value):
+	""":return: value, or the container wrapped by value if it is a `_TrackedContainer`"""
+	if type(value) is _TrackedContainer:
+		return value._container
+	return value
+
+class _TrackedContainer(object):
+	"""Wraps a container nested in the data of a PyPickleValue in change tracking
+	mode. Changes to it, or to any container nested in it, mark the top-level key 
+	it belongs to dirty.
+	
+	:note: items returned by iteration are not tracked"""
+	__slots__ = ('_container', '_owner', '_key')
+	
+	kTypes = (dict, list, set)
+	kMutators = set(('append', 'extend', 'insert', 'pop', 'remove', 'reverse', 'sort', 
+					'update', 'setdefault', 'popitem', 'clear', 'add', 'discard', 
+					'difference_update', 'intersection_update', 'symmetric_difference_update'))
+	
+	def __init__(self, container, owner, key):
+		self._container = container
+		self._owner = owner
+		self._key = key
+		
+	def _track(self, value):
+		if type(value) in self.kTypes:
+			return _TrackedContainer(value, self._owner, self._key)
+		return value
+		
+	def __getattr__(self, attr):
+		method = getattr(self._container, attr)
+		if attr in self.kMutators:
+			def mutator(*args, **kwargs):
+				self._owner._markDirty(self._key)
+				return method(*args, **kwargs)
+			# END mutator
+			return mutator
+		elif attr == 'get':
+			return lambda *args: self._track(method(*args))
+		# END handle method type
+		return method
+		
+	def __getitem__(self, key):
+		return self._track(self._container[key])
+		
+	def __setitem__(self, key, value):
+		self._owner._markDirty(self._key)
+		self._container[key] = _untracked(value)
+		
+	def __delitem__(self, key):
+		self._owner._markDirty(self._key)
+		del(self._container[key])
+		
+	def __iadd__(self, other):
+		self._owner._markDirty(self._key)
+		self._container += _untracked(other)
+		return self
+		
+	def __len__(self):
+		return len(self._container)
+		
+	def __iter__(self):
+		return iter(self._container)
+		
+	def __contains__(self, item):
+		return item in self._container
+		
+	def __eq__(self, other):
+		return self._container == _untracked(other)
+		
+	def __ne__(self, other):
+		return self._container != _untracked(other)
+		
+	def __repr__(self):
+		return repr(self._container)
+		
+#} END change tracking
+
 #{ Storage Access
 
 class StorageBase(iDuplicatable):
@@ -272,17 +579,32 @@ class StorageBase(iDuplicatable):
 
 	class PyPickleValue(object):
 		"""Wrapper object prividing native access to the wrapped python pickle object
-		and to the corresponding value plug, providing utlity methods for easier handling"""
-		__slots__ = ('_plug', '_pydata', '_isReferenced', '_updateCalled')
+		and to the corresponding value plug, providing utlity methods for easier handling
+		
+		In change tracking mode, all top-level keys whose values are set, deleted or 
+		changed in place are recorded as dirty - this includes changes to nested 
+		containers, like ``value['a']['b'] = x``. Values of referenced nodes will be 
+		written back once at the end of the undoable method which changed them."""
+		__slots__ = ('_plug', '_pydata', '_isReferenced', '_updateCalled', '_dirty', '_writePending')
+		
+		_kTrackedMethods = dict(update = '_trackedUpdate', pop = '_trackedPop', 
+								popitem = '_trackedPopitem', setdefault = '_trackedSetdefault', 
+								clear = '_trackedClear', get = '_trackedGet')
 
-		def __init__(self, valueplug, pythondata):
-			"""value plug contains the plugin data in pythondata"""
+		def __init__(self, valueplug, pythondata, trackChanges=False):
+			"""value plug contains the plugin data in pythondata
+			
+			:param trackChanges: if True, changes will be tracked, see class description"""
 			sa = object.__setattr__ 
 			sa(self, '_plug', valueplug)
 			sa(self, '_pydata', pythondata)
 			# note: Dont' use the wrapped node to prevent dependency cycles and improve performance
 			sa(self, '_isReferenced', MFnDependencyNode(valueplug.node()).isFromReferencedFile())
 			sa(self, '_updateCalled', False)
+			sa(self, '_dirty', None)
+			if trackChanges:
+				sa(self, '_dirty', set())
+			sa(self, '_writePending', False)
 
 		def __len__(self):
 			return len(self._pydata)
@@ -291,25 +613,91 @@ class StorageBase(iDuplicatable):
 			return iter(self._pydata)
 
 		def __getattr__(self, attr):
+			if self._dirty is not None and attr in self._kTrackedMethods:
+				return getattr(self, self._kTrackedMethods[attr])
 			return getattr(self._pydata, attr)
 
 		def __setattr__(self, attr, val):
 			try:
 				object.__setattr__(self, attr, val)
 			except AttributeError:
-				self._pydata[attr] = val
+				self.__setitem__(attr, val)
 
 		def __getitem__(self, key):
-			return self._pydata[key]
+			value = self._pydata[key]
+			if self._dirty is not None and type(value) in _TrackedContainer.kTypes:
+				return _TrackedContainer(value, self, key)
+			return value
 
 		def __setitem__(self, key, value):
+			if self._dirty is not None:
+				self._markDirty(key)
+				self._pydata[key] = _untracked(value)
+				return
+			# END handle change tracking
 			self._pydata[key] = value
 			if self._isReferenced:
 				self._valueChanged()		# assure we make it into the reference , but only if we change
 
 		def __delitem__(self, key):
+			if self._dirty is not None:
+				self._markDirty(key)
 			del(self._pydata[key])
 			
+		def _markDirty(self, key):
+			"""Record key as dirty and schedule the write back if required"""
+			self._dirty.add(key)
+			if not self._isReferenced or self._writePending:
+				return
+			
+			if sys._maya_stack_depth == 0:
+				# there is no scope to defer the write back to - write once like untracked values
+				self._valueChanged()
+				return
+			# END handle no undoable scope
+			self._writePending = True
+			undo.callAtScopeEnd(self._writeBack)
+			
+		def _writeBack(self):
+			"""Assure our changed value makes it into the reference"""
+			self._writePending = False
+			self._plug.msetMObject(self._plug.asMObject())
+			
+		#{ Tracked Methods
+		
+		def _trackedUpdate(self, *args, **kwargs):
+			values = dict(*args, **kwargs)
+			for key in values:
+				self[key] = values[key]
+			# END for each key
+			
+		def _trackedPop(self, key, *args):
+			if key in self._pydata:
+				self._markDirty(key)
+			return self._pydata.pop(key, *args)
+			
+		def _trackedPopitem(self):
+			item = self._pydata.popitem()
+			self._markDirty(item[0])
+			return item
+			
+		def _trackedSetdefault(self, key, default=None):
+			if key not in self._pydata:
+				self[key] = default
+			return self[key]
+			
+		def _trackedClear(self):
+			for key in self._pydata.keys():
+				del(self[key])
+			# END for each key
+			
+		def _trackedGet(self, key, default=None):
+			if key not in self._pydata:
+				return default
+			return self[key]
+			
+		#} END tracked methods
+			
 		def _valueChanged(self):
 			"""Will be called automatically if the underlying value changed if
 			the node of the underlying plug is referenced
@@ -328,6 +716,21 @@ class StorageBase(iDuplicatable):
 		def isReferenced(self):
 			""":return: True if the data is from a referenced plug"""
 			return self._isReferenced
+			
+		def isTrackingChanges(self):
+			""":return: True if we are in change tracking mode"""
+			return self._dirty is not None
+			
+		def dirtyKeys(self):
+			""":return: frozenset of top-level keys which changed since we were created or
+				since `clearDirtyKeys` was called. It is empty if changes are not tracked"""
+			return frozenset(self._dirty or tuple())
+			
+		def clearDirtyKeys(self):
+			"""Forget about all dirty keys, for instance after they have been serialized"""
+			if self._dirty is not None:
+				self._dirty.clear()
+			# END handle tracking
 
 		#} END interface
 	# END class pypickle value
@@ -356,6 +759,7 @@ class StorageBase(iDuplicatable):
 		"""Create a new instance with our type"""
 		return self.__class__(self._dprefix, self._node, self._aprefix)
 
+	@undoable
 	def copyFrom(self, other, *args, **kwargs):
 		"""Copy all values from other to ourselves
 		
@@ -363,25 +767,49 @@ class StorageBase(iDuplicatable):
 			 * shallow:
 			 	if True, default False, only a shallow copy will
 				be made. If False, a deep copy will be made
+			 * sets:
+			 	if True, default False, the object sets connected to the data of other
+			 	will be connected to our data as well, using the same set indices
 		:note: only does so if the attribute and data prefixes actually match (which should be
 			the case if we get here, checking for it anyway
 		:note: as pickle data always copies by reference to be efficient, we have to explicitly
 			create new data to assure we really copy it
-		:todo: copy connections to our messages as well, make it an option at least"""
+		:note: the data elements of both nodes are scanned once, each value is set 
+			only once and all set connections are made by a single modifier"""
 		self.setDataPrefix(other.dataPrefix())
 		self.setAttributePrefix(other.attributePrefix())
 
 		shallow = kwargs.pop("shallow", False)
-		for dataid in other.dataIDs():
-			othervalplug = other.storagePlug(dataid, plugType = self.kValue, autoCreate = False)
-			ownvalplug = self.storagePlug(dataid, plugType = self.kValue, autoCreate = True)
-
-			clearDataPlug(ownvalplug)
-
+		copySets = kwargs.pop("sets", False)
+		
+		dataIDs = [self._dprefix + dataid for dataid in other.dataIDs()]
+		otherplugs = storagePlugs(other.masterPlug(), dataIDs, self.kStorage)
+		ownplugs = storagePlugs(self.masterPlug(), dataIDs, self.kStorage, autoCreate = True)
+		
+		mod = transaction = None
+		if copySets:
+			transaction = undo.Transaction.active()
+			if transaction is not None:
+				mod = transaction.modifier()
+			else:
+				mod = undo.DGModifier()
+			# END handle transaction
+		# END setup modifier
+		
+		for otherplug, ownplug in zip(otherplugs, ownplugs):
+			othervalplug = otherplug.child(2)
+			ownvalplug = ownplug.child(2)
+			
 			if shallow:
-				ownvalplug.msetMObject(othervalplug.asMObject())
+				# the data is copied by reference
+				try:
+					ownvalplug.msetMObject(othervalplug.asMObject())
+				except RuntimeError:
+					clearDataPlug(ownvalplug)
+				# END handle null data
 			else:
-				owndict = self.pythonDataFromPlug(ownvalplug)
+				plugindataobj = api.MFnPluginData().create(PyPickleData.kPluginDataId)
+				owndict = Data(plugindataobj).data()
 				otherdict = other.pythonDataFromPlug(othervalplug)
 
 				# copy each value
@@ -397,8 +825,36 @@ class StorageBase(iDuplicatable):
 							owndict[key] = val
 					# END copy operation
 				# END for each key to deep copy
+				ownvalplug.msetMObject(plugindataobj)
 			# END shallow/deep copy
-		# END for each dataid
+			
+			if copySets:
+				othermsgplug = otherplug.child(3)
+				ownmsgplug = ownplug.child(3)
+				othermsgplug.evaluateNumElements()
+				for otherelement in othermsgplug:
+					inputplug = otherelement.minput()
+					if inputplug.isNull():
+						continue
+					# END skip unconnected elements
+					
+					ownelement = ownmsgplug.elementByLogicalIndex(otherelement.logicalIndex())
+					owninputplug = ownelement.minput()
+					if owninputplug == inputplug:
+						continue
+					elif not owninputplug.isNull():
+						mod.disconnect(owninputplug, ownelement)
+					# END handle existing connection
+					mod.connect(inputplug, ownelement)
+				# END for each set element
+			# END copy sets
+		# END for each data element
+		
+		if transaction is not None:
+			transaction.flush()
+		elif mod is not None:
+			mod.doIt()
+		# END apply set connections
 
 	#) END iDuplicatable
 
@@ -462,14 +918,30 @@ class StorageBase(iDuplicatable):
 			 * index: 
 			 	element number of the plug to retrieve, or -1 to get a new plug.
 				Plugs will always be created, the given index specifies a logical plug index
+			 * trackChanges:
+			 	if True, default False, the returned value tracks changes, see `PyPickleValue`
 			 * Additionally all arguments supported by `storagePlug`""" 
-		return self.pythonDataFromPlug(self._elementPlug(dataID, StorageBase.kValue, **kwargs))
+		trackChanges = kwargs.pop('trackChanges', False)
+		return self.pythonDataFromPlug(self._elementPlug(dataID, StorageBase.kValue, **kwargs), trackChanges)
+
+	def pythonDataMany(self, dataIDs, **kwargs):
+		""":return: list of PyPickleVal objects, one for each of the given dataIDs
+		:param dataIDs: iterable of ids of the data to retrieve
+		:param kwargs: trackChanges as supported by `pythonData`, and all arguments 
+			supported by `storagePlugs`, except for plugType
+		:note: the storage elements are scanned at most once, which is faster than 
+			calling `pythonData` for each id"""
+		trackChanges = kwargs.pop('trackChanges', False)
+		dataIDs = [self._dprefix + did for did in dataIDs]
+		plugs = storagePlugs(self.masterPlug(), dataIDs, StorageBase.kValue, **kwargs)
+		return [self.pythonDataFromPlug(p, trackChanges) for p in plugs]
 
 	@classmethod
-	def pythonDataFromPlug(cls, valplug):
+	def pythonDataFromPlug(cls, valplug, trackChanges=False):
 		"""Exract the python data using the given plug directly
 		
 		:param valplug: data value plug containing the plugin data
+		:param trackChanges: if True, the returned value tracks changes, see `PyPickleValue`
 		:return: PyPickleData object allowing data access"""
 
 		# initialize data if required
@@ -486,7 +958,7 @@ class StorageBase(iDuplicatable):
 
 		# exstract the data
 		#return plugindata.data()
-		return StorageBase.PyPickleValue(valplug, plugindata.data())
+		return StorageBase.PyPickleValue(valplug, plugindata.data(), trackChanges)
 
 	#} END query Data
 
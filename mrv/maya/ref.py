@@ -15,7 +15,8 @@ import maya.cmds as cmds
 import maya.OpenMaya as api
 from itertools import ifilter
 
-__all__ = ("createReference", "listReferences", "FileReference", "FileReferenceError")
+__all__ = ("createReference", "listReferences", "FileReference", "FileReferenceError", 
+           "ReferenceTree")
 
 #{ Exceptions
 class FileReferenceError(MRVError):
@@ -38,6 +39,238 @@ def listReferences(*args, **kwargs):
 #} END utilities 
 
 
+#{ Reference Tree
+
+class _ReferenceInfo(object):
+	"""Cached information about a single reference"""
+	__slots__ = ('path', 'parent', 'children', 'namespace', 'loaded', 'locked')
+	
+	def __init__(self, path, parent, namespace, loaded, locked):
+		self.path = path			# path with copy number
+		self.parent = parent		# reference node of the parent or None
+		self.children = list()		# reference nodes of the children
+		self.namespace = namespace
+		self.loaded = loaded
+		self.locked = locked
+		
+
+class ReferenceTree(object):
+	"""Cached hierarchy of all file references in the scene, with their paths, 
+	namespaces and their loaded and locked state, keyed by reference node name.
+	
+	The tree is built on first use. Creating and unloading references updates 
+	the affected parts of it with the next query. Loading, replacing, removing or 
+	importing references, as well as opening or clearing the scene, causes it to 
+	be rebuilt, as loading may change the paths, copy numbers and children of 
+	any reference. Queries on an up-to-date tree do not call into maya.
+	
+	:note: obtain the instance using `FileReference.referenceTree`
+	:note: changes to the locked state of loaded references, as well as namespace 
+		changes not done through `FileReference.setNamespace`, are not tracked"""
+	__slots__ = ('infos', 'paths', 'rootnodes', 'pending', 'callbackIDs')
+	
+	kStructureChanged, kLoadStateChanged = 1, 2
+	
+	def __init__(self):
+		self.infos = None		# refnode -> _ReferenceInfo
+		self.paths = None		# path with copy number -> refnode
+		self.rootnodes = None	# refnodes of all top-level references
+		self.pending = 0		# bitfield of changes we have to sync with
+		
+		msg = api.MSceneMessage
+		self.callbackIDs = list()
+		for msgname, callback in ((	'kAfterOpen', self._sceneChanged), 
+									('kAfterNew', self._sceneChanged), 
+									('kAfterImport', self._sceneChanged), 
+									('kAfterRemoveReference', self._sceneChanged), 
+									('kAfterImportReference', self._sceneChanged), 
+									('kAfterCreateReference', self._referenceCreated), 
+									('kAfterLoadReference', self._sceneChanged), 
+									('kAfterUnloadReference', self._loadStateChanged)):
+			if not hasattr(msg, msgname):
+				continue
+			self.callbackIDs.append(msg.addCallback(getattr(msg, msgname), callback))
+		# END for each message
+		
+		# catches changes done by undo and redo as well
+		self.callbackIDs.append(api.MDGMessage.addNodeAddedCallback(self._referenceNodeAdded, "reference"))
+		self.callbackIDs.append(api.MDGMessage.addNodeRemovedCallback(self._referenceNodeRemoved, "reference"))
+		
+	def _sceneChanged(self, clientData):
+		self.invalidate()
+		
+	def _referenceNodeAdded(self, node, clientData):
+		self.pending |= self.kStructureChanged
+		
+	def _referenceNodeRemoved(self, node, clientData):
+		self.invalidate()
+		
+	def _referenceCreated(self, clientData):
+		self.pending |= self.kStructureChanged
+		
+	def _loadStateChanged(self, clientData):
+		self.pending |= self.kLoadStateChanged
+		
+	def _scanChildren(self, parentrfn):
+		""":return: list of reference nodes of the references below the given parent
+		reference node, which have been scanned recursively"""
+		parentpath = ""
+		if parentrfn is not None:
+			parentpath = self.infos[parentrfn].path
+		# END handle parent
+		
+		out = list()
+		for path in noneToList(cmds.file(parentpath, q=1, r=1)):
+			refnode = cmds.referenceQuery(path, rfn=1)
+			if refnode not in self.infos:
+				refspace = cmds.file(path, q=1, ns=1)
+				parentspace = cmds.file(path, q=1, pns=1)[0]
+				if parentspace:
+					parentspace += ":"
+				# END handle parent namespace
+				info = _ReferenceInfo(	path, parentrfn, Namespace(":" + parentspace + refspace), 
+										cmds.file(rfn=refnode, q=1, dr=1) == False, 
+										cmds.getAttr(refnode + ".locked"))
+				self.infos[refnode] = info
+				self.paths[path] = refnode
+				info.children = self._scanChildren(refnode)
+			# END scan new reference
+			out.append(refnode)
+		# END for each reference path
+		return out
+		
+	def _dropChildren(self, refnode):
+		"""Remove all children of the given reference node from the tree, recursively"""
+		info = self.infos[refnode]
+		for child in info.children:
+			self._dropChildren(child)
+			self.paths.pop(self.infos.pop(child).path, None)
+		# END for each child
+		info.children = list()
+		
+	def _syncLoadState(self):
+		"""Update the loaded state of all references, and rescan the children 
+		of the ones which changed"""
+		for refnode, info in self.infos.items():
+			if refnode not in self.infos:	# dropped as child of a previous one
+				continue
+			loaded = cmds.file(rfn=refnode, q=1, dr=1) == False
+			if loaded == info.loaded:
+				continue
+			info.loaded = loaded
+			info.locked = cmds.getAttr(refnode + ".locked")
+			self._dropChildren(refnode)
+			info.children = self._scanChildren(refnode)
+		# END for each reference
+		
+	#{ Interface
+	
+	def update(self):
+		"""Build the tree if required, and bring it up-to-date"""
+		if self.infos is None:
+			self.infos = dict()
+			self.paths = dict()
+			self.pending = 0
+			self.rootnodes = self._scanChildren(None)
+			return
+		# END handle full rebuild
+		
+		pending = self.pending
+		self.pending = 0
+		if pending & self.kStructureChanged:
+			# new references are top-level ones, existing ones are kept
+			self.rootnodes = self._scanChildren(None)
+		# END handle new references
+		if pending & self.kLoadStateChanged:
+			self._syncLoadState()
+		# END handle loaded state
+		
+	def invalidate(self):
+		"""Mark the tree out of date, it will be rebuilt with the next query"""
+		self.infos = None
+		self.paths = None
+		self.rootnodes = None
+		
+	def remove(self):
+		"""Remove our callbacks"""
+		for callbackID in self.callbackIDs:
+			api.MMessage.removeCallback(callbackID)
+			if hasattr(callbackID, 'disown'):
+				callbackID.disown()
+			# END prevent memory leak message
+		# END for each callback id
+		
+	def roots(self):
+		""":return: list of reference nodes of all top-level references"""
+		return list(self.rootnodes)
+		
+	def contains(self, refnode):
+		""":return: True if the given reference node is part of the tree"""
+		return refnode in self.infos
+		
+	def children(self, refnode):
+		""":return: list of reference nodes of the direct children of the given
+		reference node"""
+		return list(self.infos[refnode].children)
+		
+	def parent(self, refnode):
+		""":return: reference node of the parent reference, or None if the given 
+		reference node is top-level"""
+		return self.infos[refnode].parent
+		
+	def path(self, refnode, copynumber=False):
+		""":return: Path of the file referenced by the given reference node
+		:param copynumber: see `FileReference.path`"""
+		path = self.infos[refnode].path
+		if not copynumber:
+			path = FileReference._splitCopyNumber(path)[0]
+		# END handle copy number
+		return make_path(path)
+		
+	def namespace(self, refnode):
+		""":return: Namespace of the given reference node"""
+		return self.infos[refnode].namespace
+		
+	def isLoaded(self, refnode):
+		""":return: True if the reference of the given reference node is loaded"""
+		return self.infos[refnode].loaded
+		
+	def isLocked(self, refnode):
+		""":return: True if the reference of the given reference node is locked"""
+		return self.infos[refnode].locked
+		
+	def referenceNodeFromPath(self, path):
+		""":return: reference node of the reference to the given path, which may 
+		have a copy number, or None if there is no such reference"""
+		return self.paths.get(str(path))
+		
+	#} END interface
+	
+# the tree is created on first use
+_referenceTreeInstance = None
+
+def _referenceTree():
+	""":return: up-to-date ReferenceTree of the current scene"""
+	global _referenceTreeInstance
+	if _referenceTreeInstance is None:
+		_referenceTreeInstance = ReferenceTree()
+		import atexit
+		atexit.register(_removeReferenceTree)
+	# END create tree
+	_referenceTreeInstance.update()
+	return _referenceTreeInstance
+	
+def _removeReferenceTree():
+	"""Remove the tree and its callbacks, it will be recreated on next use"""
+	global _referenceTreeInstance
+	if _referenceTreeInstance is None:
+		return
+	_referenceTreeInstance.remove()
+	_referenceTreeInstance = None
+	
+#} END reference tree
+
+
 class FileReference(iDagItem):
 	"""Represents a Maya file reference
 	
@@ -161,6 +394,11 @@ class FileReference(iDagItem):
 		filepath = (isinstance(filepath, type(self)) and filepath.path()) or filepath
 		filepath = self._splitCopyNumber(filepath)[0]
 		cmds.file(filepath, lr=self._refnode)
+		
+		# copy numbers of other references may have changed as well
+		if _referenceTreeInstance is not None:
+			_referenceTreeInstance.invalidate()
+		# END invalidate reference tree
 		return self
 
 	@undo.notundoable
@@ -267,11 +505,37 @@ class FileReference(iDagItem):
 			May be string, Path or FileReference
 		:param predicate: method returning true for each valid file reference object that 
 			should be part of the return value.
-		:return: list of `FileReference` s objects"""
+		:return: list of `FileReference` s objects
+		:note: the references are retrieved from the `ReferenceTree`"""
+		tree = _referenceTree()
+		refnodes = None
+		if isinstance(rootReference, cls):
+			if tree.contains(rootReference._refnode):
+				refnodes = tree.children(rootReference._refnode)
+			# END handle known reference
+		elif rootReference:
+			refnode = tree.referenceNodeFromPath(rootReference)
+			if refnode is not None:
+				refnodes = tree.children(refnode)
+			# END handle known path
+		else:
+			refnodes = tree.roots()
+		# END handle root reference
+		
+		out = list()
+		if refnodes is not None:
+			for refnode in refnodes:
+				refinst = FileReference(refnode = refnode)
+				if predicate(refinst):
+					out.append(refinst)
+			# END for each reference node
+			return out
+		# END handle cached references
+		
+		# let maya resolve paths unknown to the tree
 		if isinstance(rootReference, cls):
 			rootReference = rootReference.path(copynumber=1)
 		# END handle non-string type
-		out = list()
 		for reffile in cmds.file(str(rootReference), q=1, r=1):
 			refinst = FileReference(filepath = reffile)
 			if predicate(refinst):
@@ -286,11 +550,20 @@ class FileReference(iDagItem):
 		:param kwargs: support for arguments as in `ls`, hence you can use the 
 			rootReference flag to restrict the set of returned FileReferences."""
 		kwargs['predicate'] = predicate
-		refs = cls.ls(**kwargs)
-		out = refs
-		for ref in refs:
-			out.extend(ref.childrenDeep(order=cls.kOrder_BreadthFirst, predicate=predicate))
+		out = cls.ls(**kwargs)
+		
+		# breadth first, children of references rejected by the predicate are skipped
+		i = 0
+		while i < len(out):
+			out.extend(out[i].children(predicate=predicate))
+			i += 1
+		# END for each reference
 		return out
+	
+	@classmethod
+	def referenceTree(cls):
+		""":return: up-to-date `ReferenceTree` of the current scene"""
+		return _referenceTree()
 
 	#} listing
 	
@@ -325,6 +598,15 @@ class FileReference(iDagItem):
 			 * predicate: 
 			 	if function returns True for Node|MObject|MDagPath n, n will be yielded.
 			 	Defaults to return True for all.
+			 	
+			 * members:
+			 	if True, default False, only the nodes loaded by this reference and its 
+			 	sub-references are considered instead of all nodes of the scene, hence the
+			 	cost depends on the size of the reference rather than on the size of the scene.
+			 	Nodes which were added to the reference's namespace after loading it will not
+			 	be returned, dag nodes will only be returned with one of their dag paths.
+			 	Additional kwargs for `iterDagNodes` or `iterDgNodes` cannot be used in 
+			 	this mode.
 		:raise ValueError: if incompatible arguments have been given"""
 		import nt
 		
@@ -337,7 +619,10 @@ class FileReference(iDagItem):
 		dag = kwargs.pop('dag', False)
 		assemblies = kwargs.pop('assemblies', False)
 		assembliesInReference = kwargs.pop('assembliesInReference', False)
+		members = kwargs.pop('members', False)
 		
+		if members and [k for k in kwargs if k not in ('asNode', 'predicate')]:
+			raise ValueError("Cannot use iterator kwargs if members is specified")
 		
 		if (assemblies or assembliesInReference) and not dag:
 			raise ValueError("Cannot list assemblies of any kind if dag is not specified")
@@ -407,12 +692,84 @@ class FileReference(iDagItem):
 		
 		# have to iterate it manually in order to get the toNode conversion right
 		NodeFromObj = nt.NodeFromObj
+		if members:
+			for n in self._iterMemberNodes(args, dag, pred):
+				if asNode:
+					n = NodeFromObj(n)
+				if predicate(n):
+					yield n
+			# END for each member
+			return
+		# END handle members
+		
 		for n in iter_type(*args, **kwargs):
 			if asNode:
 				n = NodeFromObj(n)
 			if predicate(n):
 				yield n
 		# END for each node in iteartion
+		
+	def _memberObjects(self):
+		""":return: list of MObjects of all nodes loaded by this reference and 
+		its sub-references, each node is contained only once"""
+		import nt
+		
+		out = list()
+		seen = set()
+		hasHashCode = hasattr(api.MObjectHandle, 'hashCode')
+		useMFnReference = hasattr(api, 'MFnReference') and hasattr(api.MFnReference, 'nodes')
+		for ref in [self] + self.childrenDeep(order=self.kOrder_BreadthFirst):
+			if useMFnReference:
+				objects = api.MObjectArray()
+				api.MFnReference(nt.toApiobj(ref._refnode)).nodes(objects)
+			else:
+				objects = list()
+				sellist = nt.toSelectionListFromNames(noneToList(cmds.referenceQuery(ref._refnode, nodes=1, dagPath=1)))
+				for i in xrange(sellist.length()):
+					obj = api.MObject()
+					sellist.getDependNode(i, obj)
+					objects.append(obj)
+				# END for each selected node
+			# END handle maya support
+			
+			for obj in objects:
+				if hasHashCode:
+					key = api.MObjectHandle(obj).hashCode()
+					if key in seen:
+						continue
+					seen.add(key)
+				# END handle duplicates
+				out.append(obj)
+			# END for each object
+		# END for each reference
+		return out
+		
+	def _iterMemberNodes(self, types, dag, pred):
+		""":return: iterator yielding MObjects, or MDagPaths if dag is True, of 
+		our member nodes which are of one of the given types and pass the predicate"""
+		getAPathTo = api.MDagPath.getAPathTo
+		kDagNode = api.MFn.kDagNode
+		for n in self._memberObjects():
+			if types:
+				for t in types:
+					if n.hasFn(t):
+						break
+				else:
+					continue
+				# END type filter
+			# END handle types
+			
+			if dag:
+				if not n.hasFn(kDagNode):
+					continue
+				path = api.MDagPath()
+				getAPathTo(n, path)
+				n = path
+			# END handle dag nodes
+			
+			if pred(n):
+				yield n
+		# END for each member
 	#} nodes query
 
 	#{ Edit
@@ -490,13 +847,23 @@ class FileReference(iDagItem):
 		# set the namespace
 		cmds.file(self.path(copynumber=1), e=1, ns=shortname)
 		
+		# namespace changes are not signaled by maya
+		if _referenceTreeInstance is not None:
+			_referenceTreeInstance.invalidate()
+		# END update reference tree
+		
 		return self
 
 	#}END edit
 
 	def parent(self):
 		""":return: the parent reference of this instance or None if we are root"""
-		parentrfn = cmds.referenceQuery(self._refnode, rfn=1, p=1)
+		tree = _referenceTree()
+		if tree.contains(self._refnode):
+			parentrfn = tree.parent(self._refnode)
+		else:
+			parentrfn = cmds.referenceQuery(self._refnode, rfn=1, p=1)
+		# END handle cached references
 		if not parentrfn:
 			return None
 		return FileReference(refnode = parentrfn)
@@ -11,10 +11,115 @@ import mrv.util as util
 import maya.OpenMaya as api
 import maya.cmds as cmds
 from mrv.path import make_path
+from mrv.cmd.base import SpawnedJobCommand, SpawnedJobPool
 
 import inspect
+import tempfile
 
-__all__ = [ 'Scene' ]
+__all__ = [ 'Scene', 'SceneExportCommand' ]
+
+
+#{ Export Jobs
+
+# type characters of options in export job files
+_optionTypes = { bool : 'b', int : 'i', float : 'f', str : 's', unicode : 's' }
+_optionParsers = { 'b' : lambda v: bool( int( v ) ), 'i' : int, 'f' : float, 's' : str }
+
+def _writeExportJob( jobfile, source, output, filetype, nodes, options ):
+	"""Write the plain job file for the `SceneExportCommand`
+	
+	:param source: path to the scene the nodes are exported from
+	:param output: path to the file to export the nodes to
+	:param filetype: type of the output file as understood by the file command
+	:param nodes: list of node names to export, or None to export everything
+	:param options: dict of additional flags for the file command with bool, int, 
+		float or string values
+	:raise ValueError: if an option has an unsupported type"""
+	lines = [ "source %s" % source, "output %s" % output, "type %s" % filetype ]
+	for name, value in options.iteritems():
+		typechar = _optionTypes.get( type( value ) )
+		if typechar is None:
+			raise ValueError( "Cannot pass value %r of option %s to an export job" % ( value, name ) )
+		if typechar == 'b':
+			value = int( value )
+		# END convert bools
+		lines.append( "option %s %s %s" % ( name, typechar, value ) )
+	# END for each option
+	if nodes is not None:
+		lines.append( "all 0" )
+		lines.extend( "node %s" % n for n in nodes )
+	# END handle nodes
+	
+	fp = open( jobfile, 'w' )
+	try:
+		fp.write( '\n'.join( lines ) + '\n' )
+	finally:
+		fp.close()
+	# END assure file gets closed
+	
+def _readExportJob( jobfile ):
+	""":return: tuple( source, output, filetype, nodes, options ) as written by 
+		`_writeExportJob`"""
+	source = output = filetype = None
+	nodes = None
+	options = dict()
+	fp = open( jobfile )
+	try:
+		lines = fp.read().splitlines()
+	finally:
+		fp.close()
+	# END assure file gets closed
+	
+	for line in lines:
+		key, value = line.split( ' ', 1 )
+		if key == 'source':
+			source = value
+		elif key == 'output':
+			output = value
+		elif key == 'type':
+			filetype = value
+		elif key == 'all':
+			nodes = list()
+		elif key == 'node':
+			nodes.append( value )
+		elif key == 'option':
+			name, typechar, value = value.split( ' ', 2 )
+			options[ name ] = _optionParsers[ typechar ]( value )
+		# END handle key
+	# END for each line
+	return source, output, filetype, nodes, options
+	
+
+class SceneExportCommand( SpawnedJobCommand ):
+	"""Processes export jobs written by `Scene.exportAsync` in a mayapy process"""
+	__slots__ = tuple()
+	
+	k_class_path = "mrv.maya.scene.SceneExportCommand"
+	k_program_name = "mrv-scene-export"
+	_add_args = [ '--mrv-mayapy' ]
+	
+	@classmethod
+	def _exec_arguments( cls ):
+		""":return: arguments making workers run the maya version of this session"""
+		import env
+		return [ "%g" % env.appVersion()[ 0 ] ]
+	
+	def process_job( self, jobfile, progress ):
+		import nt
+		source, output, filetype, nodes, options = _readExportJob( jobfile )
+		
+		# jobs of one worker usually share their source
+		if Scene.name() != make_path( source ):
+			Scene.open( source, force=True )
+		# END open source scene
+		progress( 0.5 )
+		
+		if nodes is not None:
+			nodes = nt.toSelectionListFromNames( nodes )
+		# END handle nodes
+		return Scene.export( output, nodes, type=filetype, **options )
+		
+#} END export jobs
 
 
 class _SceneEvent( mutil.CallbackEventBase ):
@@ -75,6 +180,9 @@ class Scene( util.Singleton, util.EventSender ):
 	# END for each message id to create
 	
 	#} END events
+	
+	# pool used by exportAsync by default
+	_exportPool = None
 
 	
 
@@ -220,6 +328,76 @@ class Scene( util.Singleton, util.EventSender ):
 			# END if we have a selection to restore
 		# END handle selection
 		
+	@classmethod
+	def exportAsync( cls, exports, pool=None, **kwargs ):
+		"""Export nodes into many files in the background, using mayapy processes 
+		of the `SceneExportCommand`.
+		
+		The scene is written once into a snapshot, which the worker processes load 
+		to write the actual exports. If the scene is saved and unmodified, a copy 
+		of the scene file will serve as snapshot. This way, the scene may be saved
+		again while the exports are running.
+		
+		:param exports: iterable of tuple( outputFile, nodeListOrIterable ) tuples, 
+			see `export` for the supported values
+		:param pool: SpawnedJobPool to process the export jobs. If None, a pool 
+			shared by all calls will be used
+		:param kwargs: passed to cmds.file by the workers, values may be bool, int,
+			float or string
+		:return: list of SpawnedJob futures, one for each export, whose result is 
+			the path to the exported file
+		:raise RuntimeError: if the type of an output file is not supported
+		:note: the snapshot, the job files and their status files are kept in a 
+			temporary directory, which is the directory of each job's jobfile. It 
+			is removed once all jobs of the call are done, as noticed by the pool 
+			when it is queried"""
+		import nt
+		typ = kwargs.pop( 'type', kwargs.pop( 'typ', None ) )
+		jobs = list()
+		for outputFile, nodeListOrIterable in exports:
+			outputFile = make_path( outputFile ).abspath()
+			filetype = typ or cls.kFileTypeMap.get( outputFile.ext(), None )
+			if filetype is None:
+				raise RuntimeError( "Invalid type in %s" % outputFile )
+			# END handle type
+			
+			nodes = None
+			if nodeListOrIterable is not None:
+				sellist = nt.toSelectionList( nodeListOrIterable )
+				nodes = [ str( n ) for n in nt.fromSelectionList( sellist, handlePlugs=0 ) ]
+			# END handle nodes
+			jobs.append( ( outputFile, filetype, nodes ) )
+		# END for each export
+		
+		jobdir = make_path( tempfile.mkdtemp( prefix="mrv_export_" ) )
+		scenepath = cls.name()
+		if cls.isModified() or not scenepath.isfile():
+			source = jobdir / "snapshot.mb"
+			cmds.file( source, exportAll=True, type="mayaBinary", preserveReferences=True, force=True )
+		else:
+			source = jobdir / ( "snapshot" + scenepath.ext() )
+			scenepath.copy( source )
+		# END write snapshot
+		
+		jobfiles = list()
+		for i, ( outputFile, filetype, nodes ) in enumerate( jobs ):
+			jobfile = jobdir / ( "export%04i.job" % i )
+			_writeExportJob( jobfile, source, outputFile, filetype, nodes, kwargs )
+			jobfiles.append( jobfile )
+		# END for each job
+		
+		if pool is None:
+			if cls._exportPool is None:
+				cls._exportPool = SpawnedJobPool( SceneExportCommand )
+			# END create pool
+			pool = cls._exportPool
+		# END handle pool
+		
+		def removeJobDir( jobs ):
+			jobdir.rmtree( ignore_errors=True )
+		# END utility
+		return pool.submit( on_done=removeJobDir, *jobfiles )
+		
 	#} END edit methods
 
 	#{ Utilities
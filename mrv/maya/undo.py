@@ -35,6 +35,21 @@ Additionally it will turn off the maya undo queue as a convenience.
 If the mrv undo queue is disabled, MPlugs will not store undo information anymore
 and do not incur any overhead.
 
+Undo steps keep their operations, and all python objects they reference, alive 
+until maya drops them from its undo queue. To bound the memory used that way, set 
+``MRV_UNDO_MEMORY_LIMIT`` to the approximate amount of bytes the stored undo steps 
+may occupy (default 0, unlimited). If the limit is exceeded, a warning will be logged,
+or, if ``MRV_UNDO_MEMORY_EVICT`` is 1 (default 0), the undo data of the oldest 
+non-critical steps will be discarded. Use `setMemoryLimit` to change the limit at 
+runtime and `stackInfo` to query the current size of the undo stack.
+
+Set ``MRV_UNDO_PROFILE`` to 1 (default 0) to record the amount of calls, their 
+wall time and the amount of operations they created for each undoable function, as 
+well as the amount of operations and their undo and redo time per operation class. 
+Use `profiler` to obtain the statistics. If ``MRV_UNDO_PROFILE_FILE`` is set, they 
+will be written to the given file as JSON when the interpreter exits. 
+If profiling is disabled, it does not incur any overhead.
+
 Implementing an undoable method
 -------------------------------
    - decorate with @undoable
@@ -46,12 +61,23 @@ __docformat__ = "restructuredtext"
 
 import sys
 import os
+import weakref
+import time
+from collections import deque
+from mrv.util import approximateSize as _approximateSize
+import logging
+log = logging.getLogger("mrv.maya.undo")
 
 __all__ = ("undoable", "forceundoable", "notundoable", "MuteUndo", "StartUndo", "endUndo", "undoAndClear", 
            "UndoRecorder", "Operation", "GenericOperation", "GenericOperationStack", "DGModifier", 
-           "DagModifier")
+           "DagModifier", "Transaction", "callAtScopeEnd", "setMemoryLimit", "memoryLimit", "stackInfo", "UndoProfiler", 
+           "profiler")
 
 _undo_enabled_envvar = "MRV_UNDO_ENABLED"
+_memory_limit_envvar = "MRV_UNDO_MEMORY_LIMIT"
+_memory_evict_envvar = "MRV_UNDO_MEMORY_EVICT"
+_profile_envvar = "MRV_UNDO_PROFILE"
+_profile_file_envvar = "MRV_UNDO_PROFILE_FILE"
 _should_initialize_plugin = int(os.environ.get(_undo_enabled_envvar, True))
 
 #{ Initialization
@@ -95,7 +121,17 @@ if not hasattr(sys, "_maya_stack_depth"):
 	sys._maya_stack_depth = 0
 	sys._maya_stack = []
 
+# weak references to all undo commands that have been placed on maya's undo queue, 
+# oldest first
+if not hasattr(sys, "_maya_undo_history"):
+	sys._maya_undo_history = deque()
+
 _maya_undo_enabled = int(os.environ.get(_undo_enabled_envvar, True))
+_memory_limit = int(os.environ.get(_memory_limit_envvar, 0))
+_memory_evict = int(os.environ.get(_memory_evict_envvar, False))
+_memory_limit_warned = False
+_transaction = None			# currently active Transaction
+_scope_end_calls = list()	# callables to call when the outermost undoable scope ends
 
 if not _maya_undo_enabled:
 	undoInfo(swf=0)
@@ -111,6 +147,8 @@ if _should_initialize_plugin:
 		def __init__(self):
 			mpx.MPxCommand.__init__(self)
 			self._operations = None
+			self._nbytes = -1			# approximate size of our operations, -1 if unknown
+			self._evicted = False
 	
 		#{ Command Methods
 		def doIt(self,argList):
@@ -120,6 +158,7 @@ if _should_initialize_plugin:
 			if sys._maya_stack_depth == 0:
 				self._operations = sys._maya_stack
 				sys._maya_stack = list()					# clear the operations list
+				_registerUndoStep(self)
 				return
 			# END if stack 0
 	
@@ -133,6 +172,11 @@ if _should_initialize_plugin:
 			"""Called on once a redo is requested"""
 			if not self._operations:
 				return
+			
+			if _profiler is not None:
+				_profiler._timeOperations(self._operations, 'doIt', 'redoTime', 'redoCalls')
+				return
+			# END profile
 	
 			for op in self._operations:
 				op.doIt()
@@ -140,9 +184,16 @@ if _should_initialize_plugin:
 		def undoIt(self):
 			"""Called once undo is requested"""
 			if not self._operations:
+				if self._evicted:
+					log.warning("Undo data of this step was discarded as the undo memory limit was exceeded")
 				return
 	
 			# run in reversed order !
+			if _profiler is not None:
+				_profiler._timeOperations(reversed(self._operations), 'undoIt', 'undoTime', 'undoCalls')
+				return
+			# END profile
+			
 			for op in reversed(self._operations):
 				op.undoIt()
 	
@@ -197,6 +248,8 @@ def _decrStack(name = "unnamed"):
 	"""Indicate that a method level was exitted - and cause the
 	undo queue to be stored on the command if appropriate
 	We try to call the command only if needed"""
+	if _scope_end_calls and sys._maya_stack_depth == 1:
+		_callScopeEndCalls()
 	sys._maya_stack_depth -= 1
 
 	# store our stack on the undo queue
@@ -204,6 +257,92 @@ def _decrStack(name = "unnamed"):
 	if sys._maya_stack_depth == 0 and sys._maya_stack:
 		mel.eval("storeAPIUndo -id \""+name+"\"")
 
+def _operationsSize(operations):
+	""":return: approximate size in bytes of all given operations"""
+	size = 0
+	for op in operations:
+		approximateSize = getattr(op, 'approximateSize', None)
+		if approximateSize is None:
+			size += _approximateSize(op, 0)
+		else:
+			size += approximateSize()
+		# END handle non-operations
+	# END for each operation
+	return size
+
+def _iterUndoSteps():
+	""":return: iterator yielding all undo commands that are still alive, oldest first"""
+	for ref in sys._maya_undo_history:
+		step = ref()
+		if step is not None:
+			yield step
+	# END for each weak reference
+
+def _stepSize(step):
+	""":return: approximate size of the operations of the given undo command, cached"""
+	if step._nbytes < 0:
+		step._nbytes = _operationsSize(step._operations or tuple())
+	return step._nbytes
+
+def _isCriticalStep(step):
+	""":return: True if the undo data of the given step may not be discarded"""
+	for op in step._operations or tuple():
+		if getattr(op, 'kCritical', False):
+			return True
+	# END for each operation
+	return False
+
+def _registerUndoStep(step):
+	"""Keep track of the given undo command which was just put onto maya's undo queue
+	and apply the memory limit if it is set"""
+	history = sys._maya_undo_history
+	while history and history[0]() is None:
+		history.popleft()
+	# END prune released steps
+	history.append(weakref.ref(step))
+	
+	if _profiler is not None:
+		_profiler._countOperations(step._operations)
+	# END profile
+
+	if _memory_limit:
+		_applyMemoryLimit(step)
+	# END apply limit
+
+def _applyMemoryLimit(newstep):
+	"""Warn about or evict undo data if the undo steps exceed the memory limit
+	
+	:param newstep: most recent undo step, it will never be evicted"""
+	global _memory_limit_warned
+	steps = list(_iterUndoSteps())
+	total = 0
+	for step in steps:
+		total += _stepSize(step)
+	# END for each step
+
+	if total <= _memory_limit:
+		_memory_limit_warned = False
+		return
+	# END handle limit not exceeded
+
+	if _memory_evict:
+		for step in steps:
+			if total <= _memory_limit:
+				break
+			if step is newstep or step._evicted or _isCriticalStep(step):
+				continue
+			total -= _stepSize(step)
+			step._operations = None
+			step._nbytes = 0
+			step._evicted = True
+		# END for each step, oldest first
+	# END evict
+
+	if total > _memory_limit and not _memory_limit_warned:
+		log.warning("Undo steps occupy about %i bytes, exceeding the limit of %i bytes" % (total, _memory_limit))
+		_memory_limit_warned = True
+	# END warn once
+
 class MuteUndo(object):
 	"""Instantiate this class to disable the maya undo queue - on deletion, the
 	previous state will be restored
@@ -247,6 +386,33 @@ def endUndo():
 	
 	:note: prefer the @undoable decorator"""
 	_decrStack()
+	
+def callAtScopeEnd(func, *args, **kwargs):
+	"""Call func with the given arguments once the outermost undoable method 
+	returns, right before its operations are stored on the undo queue. This 
+	way, operations created by func are part of the same undo step.
+	
+	:note: if no undoable method is running, func will be called immediately
+	:note: exceptions raised by queued calls will be logged, but not propagated"""
+	if sys._maya_stack_depth == 0:
+		func(*args, **kwargs)
+		return
+	# END call immediately
+	_scope_end_calls.append((func, args, kwargs))
+	
+def _callScopeEndCalls():
+	"""Call all functions queued by `callAtScopeEnd`, including the ones they queue"""
+	while _scope_end_calls:
+		calls = _scope_end_calls[:]
+		del(_scope_end_calls[:])
+		for func, args, kwargs in calls:
+			try:
+				func(*args, **kwargs)
+			except Exception:
+				log.error("Call of %r at the end of an undoable scope failed" % func, exc_info=True)
+			# END handle exceptions
+		# END for each call
+	# END while there are calls
 
 def undoAndClear():
 	"""Undo all operations on the undo stack and clear it afterwards. The respective
@@ -425,6 +591,180 @@ class UndoRecorder(object):
 #} END utilities
 
 
+#{ Introspection
+
+def setMemoryLimit(nbytes, evict=False):
+	"""Set the approximate amount of bytes the undo steps on maya's undo queue may 
+	occupy
+	
+	:param nbytes: amount of bytes, or 0 to disable the limit
+	:param evict: if True, the undo data of the oldest steps which are not critical
+		will be discarded once the limit is exceeded, making them a no-op when undone.
+		Otherwise a warning will be logged"""
+	global _memory_limit, _memory_evict, _memory_limit_warned
+	_memory_limit = int(nbytes)
+	_memory_evict = bool(evict)
+	_memory_limit_warned = False
+
+def memoryLimit():
+	""":return: tuple(nbytes, evict) as set by `setMemoryLimit`"""
+	return (_memory_limit, bool(_memory_evict))
+
+def stackInfo():
+	""":return: dict with information about the size of the undo stack, containing
+		
+		 * pendingOperations: number of operations not yet placed on maya's undo queue
+		 * pendingBytes: approximate size of the pending operations
+		 * steps: number of undo steps on maya's undo queue, as created by mrv
+		 * stepOperations: number of operations in these steps
+		 * stepBytes: approximate size of the operations in these steps
+		 * evictedSteps: number of steps whose undo data was discarded
+		 
+	:note: sizes are approximations and do not include memory owned by maya"""
+	steps = list(_iterUndoSteps())
+	return dict(pendingOperations=len(sys._maya_stack),
+				pendingBytes=_operationsSize(sys._maya_stack),
+				steps=len(steps),
+				stepOperations=sum(len(s._operations or tuple()) for s in steps),
+				stepBytes=sum(_stepSize(s) for s in steps),
+				evictedSteps=len([s for s in steps if s._evicted]))
+
+
+class UndoProfiler(object):
+	"""Collects statistics about undoable functions and the operations they create.
+	
+	Statistics are kept in dicts mapping the name of the undoable function or 
+	the operation class to a dict of values:
+	
+	 * functions: calls, time (wall time in seconds), operations (amount of 
+	   operations created during the call, including the ones of nested undoable functions)
+	 * operations: count (amount of operations placed on maya's undo queue), 
+	   undoCalls, redoCalls (amount of times operations were undone or redone), 
+	   undoTime, redoTime (wall time in seconds)
+	   
+	:note: the wall time of functions includes the time spent in nested undoable
+		functions"""
+	__slots__ = ('_functions', '_operations')
+	
+	def __init__(self):
+		self.reset()
+		
+	#{ Internal
+	
+	def _recordCall(self, name, elapsed, numops):
+		"""Record a call to the undoable function with the given name"""
+		try:
+			stats = self._functions[name]
+		except KeyError:
+			stats = self._functions[name] = dict(calls=0, time=0.0, operations=0)
+		# END handle first call
+		stats['calls'] += 1
+		stats['time'] += elapsed
+		stats['operations'] += max(0, numops)
+		
+	def _operationStats(self, op):
+		""":return: stats dict of the class of the given operation"""
+		name = type(op).__name__
+		try:
+			return self._operations[name]
+		except KeyError:
+			stats = self._operations[name] = dict(count=0, undoCalls=0, redoCalls=0, undoTime=0.0, redoTime=0.0)
+			return stats
+		# END handle first operation
+		
+	def _countOperations(self, operations):
+		"""Count the given operations which are to be placed on maya's undo queue"""
+		for op in operations:
+			self._operationStats(op)['count'] += 1
+		# END for each operation
+		
+	def _timeOperations(self, operations, method, timeKey, callKey):
+		"""Call method on all operations and record the time it took under timeKey, 
+		counting the calls under callKey"""
+		for op in operations:
+			st = time.time()
+			try:
+				getattr(op, method)()
+			finally:
+				stats = self._operationStats(op)
+				stats[timeKey] += time.time() - st
+				stats[callKey] += 1
+			# END record time
+		# END for each operation
+	
+	#} END internal
+	
+	#{ Interface
+	
+	def reset(self):
+		"""Clear all statistics"""
+		self._functions = dict()
+		self._operations = dict()
+		
+	def functionStats(self):
+		""":return: dict of statistics per undoable function, see class description"""
+		return self._functions
+		
+	def operationStats(self):
+		""":return: dict of statistics per operation class, see class description"""
+		return self._operations
+		
+	def report(self, limit=None):
+		""":return: string with a human readable report of the statistics, the most
+			expensive functions and operations come first
+		:param limit: if not None, the maximum amount of functions and operation 
+			classes to list"""
+		lines = list()
+		lines.append("%-60s %10s %12s %12s" % ("undoable function", "calls", "time [s]", "operations"))
+		items = sorted(self._functions.items(), key=lambda i: i[1]['time'], reverse=True)
+		for name, stats in items[:limit]:
+			lines.append("%-60s %10i %12.4f %12i" % (name, stats['calls'], stats['time'], stats['operations']))
+		# END for each function
+		lines.append('')
+		lines.append("%-60s %10s %12s %12s" % ("operation", "count", "undo [s]", "redo [s]"))
+		items = sorted(self._operations.items(), key=lambda i: i[1]['count'], reverse=True)
+		for name, stats in items[:limit]:
+			lines.append("%-60s %10i %12.4f %12.4f" % (name, stats['count'], stats['undoTime'], stats['redoTime']))
+		# END for each operation
+		return '\n'.join(lines)
+		
+	def writeJSON(self, filepath):
+		"""Write all statistics as JSON object with the keys 'functions' and 'operations'
+		to the given file
+		
+		:return: filepath"""
+		try:
+			import json
+		except ImportError:
+			import simplejson as json
+		# END handle python version
+		fp = open(filepath, 'w')
+		try:
+			json.dump(dict(functions=self._functions, operations=self._operations), fp, indent=1)
+		finally:
+			fp.close()
+		# END assure file is closed
+		return filepath
+		
+	#} END interface
+
+
+def profiler():
+	""":return: the `UndoProfiler` instance, or None if profiling is disabled"""
+	return _profiler
+
+_profiler = None
+if int(os.environ.get(_profile_envvar, False)):
+	_profiler = UndoProfiler()
+	if os.environ.get(_profile_file_envvar):
+		import atexit
+		atexit.register(_profiler.writeJSON, os.environ[_profile_file_envvar])
+	# END write on exit
+# END setup profiler
+
+#} END introspection
+
+
 #{ Decorators
 
 def undoable(func):
@@ -449,16 +789,32 @@ def undoable(func):
 	if hasattr(func, "__name__"):
 		name = func.__name__
 
-	def undoableDecoratorWrapFunc(*args, **kwargs):
-		"""This is the long version of the method as it is slightly faster than
-		simply using the StartUndo helper"""
-		_incrStack()
-		try:
-			return func(*args, **kwargs)
-		finally:
-			_decrStack(name)
-		# END try finally
-	# END wrapFunc
+	if _profiler is not None:
+		profile_name = "%s.%s" % (getattr(func, '__module__', None), name)
+		def undoableDecoratorWrapFunc(*args, **kwargs):
+			"""Profiling version of the wrapper below"""
+			_incrStack()
+			numops = len(sys._maya_stack)
+			st = time.time()
+			try:
+				return func(*args, **kwargs)
+			finally:
+				_profiler._recordCall(profile_name, time.time() - st, len(sys._maya_stack) - numops)
+				_decrStack(name)
+			# END try finally
+		# END profiling wrapFunc
+	else:
+		def undoableDecoratorWrapFunc(*args, **kwargs):
+			"""This is the long version of the method as it is slightly faster than
+			simply using the StartUndo helper"""
+			_incrStack()
+			try:
+				return func(*args, **kwargs)
+			finally:
+				_decrStack(name)
+			# END try finally
+		# END wrapFunc
+	# END handle profiling
 
 	undoableDecoratorWrapFunc.__name__ = name
 	undoableDecoratorWrapFunc.__doc__ = func.__doc__
@@ -530,14 +886,21 @@ class Operation(object):
 	"""Simple command class as base for all operations
 	All undoable/redoable operation must support it
 	
-	:note: only operations may be placed on the undo stack !"""
+	:note: only operations may be placed on the undo stack !
+	:note: set kCritical to True in subclasses whose undo data may never be discarded
+		when the undo memory limit is exceeded"""
 	__slots__ = tuple()
+	kCritical = False
 	
 	def __init__(self):
 		"""Operations will always be placed on the undo queue if undo is available
 		This happens automatically upon creation
 		
 		:note: assure subclasses call the superclass init !"""
+		if _transaction is not None:
+			# keep the order of operations, queued transaction edits happened before us
+			_transaction._closeSegment()
+		# END handle transaction
 		if _maya_undo_enabled and not isUndoing() and undoInfo(q=1, st=1):
 			# sanity check !
 			if sys._maya_stack_depth < 1:
@@ -552,6 +915,11 @@ class Operation(object):
 	def undoIt(self):
 		"""Undo whatever you did"""
 		raise NotImplementedError
+		
+	def approximateSize(self):
+		""":return: approximate amount of bytes kept alive by this operation
+		:note: subclasses should add the size of the python objects they reference"""
+		return _approximateSize(self, 0)
 
 
 class GenericOperation(Operation):
@@ -604,6 +972,15 @@ class GenericOperation(Operation):
 			return
 
 		self._undofunc(*self._undoargs, **self._undokwargs)
+		
+	def approximateSize(self):
+		"""Includes the size of the stored arguments"""
+		size = _approximateSize(self, 0)
+		for item in (self._doargs, self._dokwargs, self._undoargs, self._undokwargs):
+			if item is not None:
+				size += _approximateSize(item)
+		# END for each argument container
+		return size
 
 
 
@@ -629,7 +1006,7 @@ class GenericOperationStack(Operation):
 		"""intiialize our variables"""
 		Operation.__init__(self)
 		self._docmds = list()				# list of Calls
-		self._undocmds = list()				# will store reversed list !
+		self._undocmds = deque()			# undo calls in order of their do calls
 		self._undocmds_tmp = list()			# keeps undo until their do was verified !
 
 
@@ -651,7 +1028,7 @@ class GenericOperationStack(Operation):
 						self._undocmds_tmp = None		# next time we only execute the cmds that worked (and will undo only them)
 						raise
 					else:
-						self._undocmds.insert(0, self._undocmds_tmp[i])	# push front
+						self._undocmds.append(self._undocmds_tmp[i])
 				# END for each call
 				self._undocmds_tmp = None			# free memory
 			else:
@@ -664,7 +1041,6 @@ class GenericOperationStack(Operation):
 
 	def undoIt(self):
 		"""Call all undoIt commands stored in our instance after temporarily disabling the undo queue"""
-		# NOTE: the undo list is already reversed !
 		prevstate = undoInfo(q=1, st=1)
 		undoInfo(swf=False)
 
@@ -673,7 +1049,7 @@ class GenericOperationStack(Operation):
 			if self._undocmds_tmp:
 				raise AssertionError("Tmp undo commands queue was not None on first undo call - this means doit has not been called before - check your code!")
 
-			for call in self._undocmds:
+			for call in reversed(self._undocmds):
 				call()
 		finally:
 			undoInfo(swf=prevstate)
@@ -698,10 +1074,23 @@ class GenericOperationStack(Operation):
 
 		rval = doCall()
 		self._docmds.append(doCall)
-		self._undocmds.insert(0, undoCall)
+		self._undocmds.append(undoCall)
 
 		undoInfo(swf=prevstate)
 		return rval
+		
+	def approximateSize(self):
+		"""Includes the size of the arguments of all stored `mrv.util.Call` instances"""
+		size = _approximateSize(self, 0)
+		for calls in (self._docmds, self._undocmds, self._undocmds_tmp):
+			for call in calls or tuple():
+				size += _approximateSize(call, 0)
+				for attr in ('args', 'kwargs'):
+					size += _approximateSize(getattr(call, attr, None))
+				# END for each call attribute
+			# END for each call
+		# END for each list of calls
+		return size
 
 
 class DGModifier(Operation):
@@ -738,6 +1127,158 @@ class DagModifier(DGModifier):
 	_modifier_class_ = api.MDagModifier
 	
 
-#} END operations
 
 
+class Transaction(object):
+	"""Routes node creation, deletion, renaming, reparenting and connections made 
+	through mrv into one shared `DagModifier`, which is applied when the 
+	transaction ends or `flush` is called. This saves creating and applying an 
+	individual modifier and undo operation for each of these edits.
+	
+	The transaction is an undoable scope of its own, all of its edits will be 
+	undone in one step.
+	
+	>>> t = Transaction()
+	>>> t.begin()
+	>>> # ... create, rename, connect or delete many nodes ...
+	>>> t.end()
+	
+	It may also be used in a with statement, which calls `abort` instead of `end` 
+	if the block raises.
+	
+	:note: edits which do not return a result, like deletions, renames and connections, 
+		are deferred until the next flush. Queries, as well as mel commands, will 
+		not see these changes until then, call `flush` if you require intermediate 
+		results
+	:note: errors of deferred edits are raised by `flush` or `end`
+	:note: creating any other undo operation automatically flushes queued edits to 
+		keep the order of operations intact
+	:note: transactions may be nested, the innermost one receives all edits"""
+	__slots__ = ('_op', '_prev', '_started')
+	
+	def __init__(self):
+		self._op = None			# DagModifier operation receiving our edits
+		self._prev = None		# transaction which was active before us
+		self._started = False
+		
+	def __enter__(self):
+		self.begin()
+		return self
+		
+	def __exit__(self, type, value, traceback):
+		if type is None:
+			self.end()
+		else:
+			self.abort()
+		# END handle exception
+		
+	#{ Internal
+	
+	def _closeSegment(self):
+		"""Apply all queued edits and start a new modifier for future edits"""
+		op = self._op
+		if op is None:
+			return
+		self._op = None
+		op.doIt()
+		
+	def _discardSegment(self):
+		"""Undo all edits of our current modifier, including queued ones, and 
+		remove it from the undo queue"""
+		op = self._op
+		if op is None:
+			return
+		self._op = None
+		
+		# queued edits are applied first, undoing them keeps the modifier consistent
+		try:
+			op.doIt()
+		except RuntimeError:
+			pass
+		# END ignore errors of queued edits
+		op.undoIt()
+		
+		if op in sys._maya_stack:
+			sys._maya_stack.remove(op)
+		# END remove from undo queue
+		
+	def _stop(self):
+		"""Stop routing edits into this transaction"""
+		global _transaction
+		_transaction = self._prev
+		self._prev = None
+		self._started = False
+		_decrStack("Transaction")
+		
+	#} END internal
+		
+	#{ Interface
+	
+	@staticmethod
+	def active():
+		""":return: the currently active Transaction or None"""
+		return _transaction
+	
+	def begin(self):
+		"""Start routing edits into this transaction
+		
+		:note: subsequent calls have no effect"""
+		global _transaction
+		if self._started:
+			return
+		if _transaction is not None:
+			_transaction._closeSegment()
+		# END handle outer transaction
+		
+		_incrStack()
+		self._started = True
+		self._prev = _transaction
+		_transaction = self
+		
+	def end(self):
+		"""Apply all queued edits and stop routing edits into this transaction
+		
+		:note: has no effect if begin was not called"""
+		if not self._started:
+			return
+		try:
+			self._closeSegment()
+		finally:
+			self._stop()
+		# END assure transaction ends
+		
+	def abort(self):
+		"""Discard all edits since the last operation which was not part of this 
+		transaction, and stop routing edits into this transaction. Edits 
+		applied by `flush` are undone as well.
+		
+		:note: has no effect if begin was not called
+		:note: edits of the transaction which were applied before another 
+			operation was created are kept, as that operation depends on them"""
+		if not self._started:
+			return
+		try:
+			self._discardSegment()
+		finally:
+			self._stop()
+		# END assure transaction ends
+		
+	def modifier(self):
+		""":return: MDagModifier to put edits on. It will be applied on the next `flush`
+		:note: use ``api.MDGModifier.createNode(modifier, typename)`` to create 
+			dependency nodes"""
+		if self._op is None:
+			self._op = DagModifier()
+		# END create modifier on demand
+		return self._op._modifier
+		
+	def flush(self):
+		"""Apply all edits queued so far. Edits queued afterwards will be put onto 
+		the same undo operation"""
+		if self._op is not None:
+			self._op.doIt()
+		# END apply edits
+		
+	#} END interface
+
+#} END operations
@@ -7,6 +7,22 @@ from mrv.path import BasePath
 
 import os
 import optparse
+import tempfile
+import shutil
+
+
+class CopyJobCommand(SpawnedJobCommand):
+	"""Stand-in worker copying the file named in the first line of the job file
+	to the file named in the second line. The job fails if there is a third line"""
+	k_class_path = "mrv.test.cmd.test_base.CopyJobCommand"
+	
+	def process_job(self, jobfile, progress):
+		lines = open(jobfile).read().splitlines()
+		progress(0.5)
+		if len(lines) > 2:
+			raise AssertionError(lines[2])
+		shutil.copyfile(lines[0], lines[1])
+		return lines[1]
 
 class TestBase( unittest.TestCase ):
 	def test_base( self ):
@@ -59,3 +75,70 @@ class TestBase( unittest.TestCase ):
 		
 		assert isinstance(find_mrv_script('mrv'), BasePath)
 		self.failUnlessRaises(EnvironmentError, find_mrv_script, 'something')
+		
+	def test_job_pool(self):
+		tmpdir = tempfile.mkdtemp()
+		try:
+			source = os.path.join(tmpdir, "source")
+			open(source, 'w').write("data")
+			
+			def jobfile(i, fail=False):
+				path = os.path.join(tmpdir, "job%i" % i)
+				lines = [source, os.path.join(tmpdir, "output%i" % i)]
+				if fail:
+					lines.append("job %i failed" % i)
+				open(path, 'w').write('\n'.join(lines))
+				return path
+			# END utility
+			
+			self.failUnlessRaises(ValueError, SpawnedJobPool, CopyJobCommand, max_workers=0)
+			pool = SpawnedJobPool(CopyJobCommand, max_workers=2)
+			
+			# jobs are distributed among the workers
+			jobs = pool.submit(*[jobfile(i) for i in range(5)])
+			assert len(jobs) == 5 and pool.pending() == 5
+			assert len(set(job.process for job in jobs)) == 2
+			
+			for i, job in enumerate(jobs):
+				assert job.result(timeout=60) == os.path.join(tmpdir, "output%i" % i)
+				assert job.done() and not job.running()
+				assert job.progress() == 1.0 and job.error() is None
+				assert open(job.result()).read() == "data"
+			# END for each job
+			assert pool.pending() == 0 and pool.wait()
+			
+			# errors are reported, other jobs of the same worker continue
+			pool = SpawnedJobPool(CopyJobCommand, max_workers=1)
+			failed, succeeded = pool.submit(jobfile(5, fail=True), jobfile(6))
+			self.failUnlessRaises(SpawnedJobError, failed.result, 60)
+			assert "job 5 failed" in failed.error()
+			assert succeeded.result(60) == os.path.join(tmpdir, "output6")
+			
+			# queued jobs can be cancelled, started ones cannot
+			pool = SpawnedJobPool(CopyJobCommand, max_workers=1)
+			running, queued = pool.submit(jobfile(7), jobfile(8))
+			late = pool.submit(jobfile(9))[0]
+			assert not running.cancel() and not queued.cancel()
+			assert late.cancel() and late.done() and late.error()
+			assert not os.path.isfile(os.path.join(tmpdir, "output9"))
+			assert pool.wait(60) and queued.result() == os.path.join(tmpdir, "output8")
+			
+			# missing job files are reported as errors
+			job = pool.submit(os.path.join(tmpdir, "doesnotexist"))[0]
+			self.failUnlessRaises(SpawnedJobError, job.result, 60)
+			
+			# callbacks are called once all jobs of a submission are done
+			self.failUnlessRaises(TypeError, pool.submit, jobfile(10), foo=1)
+			finished = list()
+			jobs = pool.submit(jobfile(11), jobfile(12), on_done=finished.append)
+			assert not finished
+			assert pool.wait(60) and finished == [jobs]
+			
+			running = pool.submit(jobfile(13))[0]
+			cancelled = pool.submit(jobfile(14), on_done=finished.append)
+			assert finished == [jobs]
+			assert cancelled[0].cancel() and finished == [jobs, cancelled]
+			assert pool.wait(60) and running.result()
+		finally:
+			shutil.rmtree(tmpdir)
+		# END cleanup
@@ -391,6 +391,29 @@ class TestDataBase( unittest.TestCase ):
 		assert a.mnextLogicalIndex() == 2
 		assert a.mnextLogicalPlug().logicalIndex()
 		
+		# mnextLogicalPlugs
+		assert [p.logicalIndex() for p in a.mnextLogicalPlugs(3)] == [2, 3, 4]
+		
+		# within an allocation block, each index is handed out only once
+		alloc = nt.LogicalIndexAllocation()
+		alloc.begin()
+		alloc.begin()	# doesn't matter
+		try:
+			assert a.mnextLogicalIndex() == 2
+			assert a.mnextLogicalIndex() == 3
+			assert a.mnextLogicalPlugs(2)[-1].logicalIndex() == 5
+			assert nt.LogicalIndexAllocator.active(a) is not None
+		finally:
+			alloc.end()
+		# END assure block ends
+		assert nt.LogicalIndexAllocator.active(a) is None
+		assert a.mnextLogicalIndex() == 2
+		
+		allocator = nt.LogicalIndexAllocator(a)
+		assert allocator.nextIndices(2) == [2, 3]
+		assert allocator.nextPlug().logicalIndex() == 4
+		self.failUnlessRaises(AssertionError, nt.LogicalIndexAllocator, persp.tx)
+		
 		# mwrappedAttribute
 		assert isinstance(a.mwrappedAttribute(), nt.Attribute)
 		
@@ -612,3 +635,31 @@ class TestDataBase( unittest.TestCase ):
 		ia = api.MIntArray.mfromRange(2,4)
 		assert len(ia) == 2 and ia[0] == 2 and ia[1] == 3
 		
+		# with step
+		self.failUnlessRaises(ValueError, api.MIntArray.mfromRange, 2, 4, 0)
+		ia = api.MIntArray.mfromRange(2, 9, 3)
+		assert list(ia) == [2, 5, 8]
+		
+	def test_bulk_array_creation(self):
+		import array
+		values = [4, 6, 7]
+		for cls, typecode in ((api.MIntArray, 'i'), (api.MDoubleArray, 'd')):
+			native = array.array(typecode, values)
+			for source in (values, tuple(values), native, buffer(native)):
+				ar = cls.mfromBulk(source)
+				assert isinstance(ar, cls)
+				assert list(ar) == values
+			# END for each source type
+			assert len(cls.mfromBulk(list())) == 0
+		# END for each array type
+		assert list(api.MIntArray.mfromBulk(xrange(3))) == [0, 1, 2]
+		
+		# compound elements are given value by value
+		pa = api.MPointArray.mfromBulk(array.array('d', (1.0, 2.0, 3.0, 1.0, 4.0, 5.0, 6.0, 1.0)))
+		assert len(pa) == 2 and pa[1] == api.MPoint(4.0, 5.0, 6.0)
+		self.failUnlessRaises(ValueError, api.MPointArray.mfromBulk, (1.0, 2.0, 3.0))
+		
+		# types without bulk support use the list
+		fa = api.MFloatArray.mfromBulk(array.array('f', values))
+		assert list(fa) == values
+		
@@ -236,6 +236,57 @@ class TestGeneral(unittest.TestCase):
 		newmesh3 = nt.createNode("otherparent|nodename|nodename", "mesh", forceNewLeaf = True)
 		assert newmesh3 != newmesh2 
 
+	@with_undo
+	def test_createNodes_batch(self):
+		specs = [("hello", "facade"), ("bla|world", "nurbsCurve"), ("a:b|c:world", "nurbsSurface"),
+				("a:b|child", "transform"), ("shape", "mesh", "|a:b"), ("leaf", "transform", "|a:b|child")]
+		nodes = nt.createNodes(specs)
+		assert len(nodes) == len(specs)
+		for node, spec in zip(nodes, specs):
+			assert isinstance(node, getattr(nt, capitalize(spec[1])))
+			assert node.isValid()
+		# END for each node
+		
+		# shared parents are created only once
+		assert nodes[2].parent() == nodes[3].parent() == nodes[4].parent()
+		assert nodes[5].parent() == nodes[3]
+		assert str(nodes[5]) == "|a:b|child|leaf"
+		
+		# one undo step
+		cmds.undo()
+		assert not [n for n in nodes if n.isValid()]
+		cmds.redo()
+		assert len([n for n in nodes if n.isValid()]) == len(nodes)
+		
+		# existing nodes
+		assert nt.createNodes([("hello", "facade")], forceNewLeaf=False)[0] == nodes[0]
+		assert nt.createNodes([("hello", "facade")])[0] != nodes[0]
+		self.failUnlessRaises(NameError, nt.createNodes, [("|bla|world", "nurbsSurface")], forceNewLeaf=False)
+		self.failUnlessRaises(NameError, nt.createNodes, [("other|hello", "mesh")], renameOnClash=False)
+		self.failUnlessRaises(RuntimeError, nt.createNodes, [("", "facade")])
+		
+		# parents may be nodes
+		child = nt.createNodes([("child", "transform", nodes[5])])[0]
+		assert child.parent() == nodes[5]
+		
+		# BULK DELETE
+		nt.delete(*(nodes + [child]), bulk=True)
+		assert not [n for n in nodes if n.isValid()] and not child.isValid()
+		cmds.undo()
+		assert len([n for n in nodes if n.isValid()]) == len(nodes) and child.isValid()
+		cmds.redo()
+		assert not child.isValid()
+		
+		# nodes which cannot be deleted don't prevent the others from being deleted
+		nodes = nt.createNodes([("deletable%i" % i, "network") for i in range(3)])
+		cmds.lockNode(str(nodes[1]), lock=True)
+		try:
+			nt.delete(*nodes, bulk=True)
+			assert not nodes[0].isValid() and not nodes[2].isValid()
+			assert nodes[1].isValid()
+		finally:
+			cmds.lockNode(str(nodes[1]), lock=False)
+		# END assure node is unlocked
 
 
 	def test_objectExistance(self):
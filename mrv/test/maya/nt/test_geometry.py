@@ -6,6 +6,8 @@ import mrv.maya.nt.geometry as modgeo
 import mrv.maya as mrvmaya
 
 import maya.OpenMaya as api
+import maya.cmds as cmds
+import array
 
 
 class TestGeometry( unittest.TestCase ):
@@ -113,6 +115,50 @@ class TestGeometry( unittest.TestCase ):
 					assert component.elementCount( ) == 2 
 			# END for each setcomponent
 		# END for each object
+		
+		# MANY SHAPES AT ONCE
+		def assignment_info(setcomps):
+			info = list()
+			for setnode, component in setcomps:
+				elements = tuple()
+				if not component.isNull():
+					elements = tuple(nt.SingleIndexedComponent(component).getElements())
+				# END handle component
+				info.append((str(setnode), elements))
+			# END for each assignment
+			return sorted(info)
+		# END utility
+		
+		assert nt.componentAssignmentsMany(list()) == list()
+		shapes = complist + noncomplist + (p2, )
+		for setfilter in (nt.Shape.fSetsRenderable, nt.Shape.fSetsObject):
+			for asComponent in range(2):
+				results = nt.componentAssignmentsMany(shapes, setFilter = setfilter, asComponent = asComponent)
+				assert len(results) == len(shapes)
+				for shape, setcomps in zip(shapes, results):
+					if shape.apiType() != api.MFn.kMesh:
+						continue
+					for setnode, component in setcomps:
+						assert isinstance(component, nt.Component) == (asComponent and not component.isNull())
+					assert assignment_info(setcomps) == assignment_info(shape.componentAssignments(setFilter = setfilter))
+				# END for each shape
+			# END for each wrap mode
+		# END for each filter
+		
+		# colliding keys are told apart by comparing the dag paths
+		import mrv.maya.nt.base as ntbase
+		prev_key = ntbase._dagPathKey
+		ntbase._dagPathKey = lambda dagpath: 0
+		try:
+			results = nt.componentAssignmentsMany(shapes)
+		finally:
+			ntbase._dagPathKey = prev_key
+		# END restore key function
+		for shape, setcomps in zip(shapes, results):
+			if shape.apiType() == api.MFn.kMesh:
+				assert assignment_info(setcomps) == assignment_info(shape.componentAssignments())
+			# END check meshes
+		# END for each shape
 
 
 		# TEST DEFORMER CONNECTIONS
@@ -205,6 +251,34 @@ class TestGeometry( unittest.TestCase ):
 			# END for each mesh name
 		# END for each component type
 		
+	@with_undo
+	def test_tweak_handling(self):
+		p1 = nt.Node( cmds.polyCube()[0] )[0]
+		ptweak = p1.pnts.elementByLogicalIndex( 0 )
+		puvtweak = p1.uvpt.elementByLogicalIndex( 0 )
+		ptweak.mchildByName('py').msetFloat( 1.0 )
+		puvtweak.mchildByName('uy').msetFloat( 1.0 )
+		assert modgeo._tweakArrayElements( p1.pnts )[ 0 ] == ( 0.0, 1.0, 0.0 )
+		
+		# COPY
+		other = nt.Node( cmds.polyPlane()[0] )[0]
+		p1.copyTweaksTo( other )
+		assert other.pnts.elementByLogicalIndex( 0 ).mchildByName('py').asFloat() == 1.0
+		cmds.undo()
+		assert other.pnts.elementByLogicalIndex( 0 ).mchildByName('py').asFloat() == 0.0
+		
+		# RESET
+		# vertex and uv tweaks together, undone in one step
+		p1.resetTweaks( [ p1.eComponentType.vertex, p1.eComponentType.uv ] )
+		assert ptweak.mchildByName('py').asFloat() == 0.0
+		assert puvtweak.mchildByName('uy').asFloat() == 0.0
+		cmds.undo()
+		assert ptweak.mchildByName('py').asFloat() == 1.0
+		assert puvtweak.mchildByName('uy').asFloat() == 1.0
+		cmds.redo()
+		assert ptweak.mchildByName('py').asFloat() == 0.0
+		assert puvtweak.mchildByName('uy').asFloat() == 0.0
+		
 	def test_mesh_components_and_iteration(self):
 		m = nt.Mesh()
 		pc = nt.PolyCube()
@@ -340,9 +414,97 @@ class TestGeometry( unittest.TestCase ):
 				e = c.elements()
 				assert len(e) == 2 and e[0] == 1 and e[1] == 5
 			# END for each type to check
+			
+			# bulk types
+			for indices in (array.array('i', (1,5)), buffer(array.array('i', (1,5))), xrange(1, 6, 4)):
+				e = c_helper[indices].elements()
+				assert len(e) == 2 and e[0] == 1 and e[1] == 5
+			# END for each bulk type
+			
+			# slices with steps
+			e = c_helper[1:6:4].elements()
+			assert len(e) == 2 and e[0] == 1 and e[1] == 5
+			e = c_helper[::2].elements()
+			assert len(e) and e[1] == 2 and not c_helper[::2].isComplete()
+			
+			# components convert indices themselves
+			e = c_helper.empty().addElements([1, 5]).elements()
+			assert len(e) == 2 and e[0] == 1 and e[1] == 5
 		# END for each component shortcut
 		
 	
+	def test_mesh_snapshot(self):
+		m = nt.Mesh()
+		pc = nt.PolyCube()
+		pc.output.mconnectTo(m.inMesh)
+		
+		self.failUnlessRaises(ValueError, m.snapshot, ('something', ))
+		self.failUnlessRaises(ValueError, m.snapshot, pointType='i')
+		
+		snapshot = m.snapshot(m.kSnapshotChannels)
+		assert snapshot.channels() == sorted(m.kSnapshotChannels)
+		assert isinstance(snapshot, nt.MeshSnapshot)
+		
+		# POINTS
+		points = api.MPointArray()
+		m.getPoints(points)
+		for pointType in ('f', 'd'):
+			psnapshot = m.snapshot(('points', ), pointType=pointType)
+			assert psnapshot.channels() == ['points']
+			self.failUnlessRaises(KeyError, psnapshot.data, 'normals')
+			values = psnapshot['points']
+			assert values.typecode == pointType
+			assert psnapshot.count('points') == points.length() == 8
+			for i in range(points.length()):
+				p = points[i]
+				assert tuple(values[i*3:i*3+3]) == (p.x, p.y, p.z)
+			# END for each point
+		# END for each point type
+		
+		# COMPOUND ARRAYS
+		# all values of 4 component elements are copied, in order
+		values = (0.5, -1.25, 2.0, 1.0, 3.5, 4.0, -5.75, 0.25)
+		for marraytype, typecode in ((api.MFloatPointArray, 'f'), (api.MPointArray, 'd')):
+			marray = marraytype()
+			marray.setLength(2)
+			marray.set(0, *values[:4])
+			marray.set(1, *values[4:])
+			
+			copied = modgeo._arrayFromMArray(marray, typecode, 4)
+			assert copied.typecode == typecode
+			assert tuple(copied) == values
+			assert copied == modgeo._arrayFromMArrayElements(marray, typecode, 4)
+			assert len(modgeo._arrayFromMArray(marraytype(), typecode, 4)) == 0
+		# END for each compound array type
+		
+		# NORMALS AND UVS
+		normals = api.MFloatVectorArray()
+		m.getNormals(normals)
+		assert snapshot.count('normals') == normals.length()
+		n = normals[normals.length()-1]
+		assert tuple(snapshot['normals'][-3:]) == (n.x, n.y, n.z)
+		assert snapshot['normals'] == modgeo._arrayFromMArrayElements(normals, 'f', 3)
+		
+		u, v = api.MFloatArray(), api.MFloatArray()
+		m.getUVs(u, v)
+		assert snapshot.count('uvs') == u.length() == m.numUVs()
+		assert tuple(snapshot['uvs'][2:4]) == (u[1], v[1])
+		
+		# TOPOLOGY
+		counts, connects = api.MIntArray(), api.MIntArray()
+		m.getVertices(counts, connects)
+		assert list(snapshot['faceCounts']) == list(counts) == [4] * 6
+		assert list(snapshot['faceConnects']) == list(connects)
+		assert list(snapshot['uvCounts']) == list(snapshot['faceCounts'])
+		assert len(snapshot['uvIds']) == len(connects)
+		
+		# VIEWS
+		values = snapshot['faceConnects']
+		view = snapshot.view('faceConnects', 4, 8)
+		assert len(view) == 4 * values.itemsize
+		assert str(view) == values[4:8].tostring()
+		assert len(snapshot.view('faceConnects')) == len(values) * values.itemsize
+		
 	@with_scene("mesh_lightlinks.ma")
 	def test_lightLinkCopy( self ):
 		# currently we only call variants of the respective method to run it - verification
@@ -354,5 +516,30 @@ class TestGeometry( unittest.TestCase ):
 			target.copyLightLinks( source, substitute = 1 )	# back to source
 			source.copyLightLinks( target, substitute = 0 )	# copy it to target
 		# END for each source mesh name
+		
+		# BULK COPY
+		def linkers( shape ):
+			return sorted( str( p.mparent().array() ) for p in shape.message.moutputs() if p.node().apiType() == api.MFn.kLightLink )
+		# END utility
+		
+		pairs = list()
+		for sourcename in ( "sphere", "torus" ):
+			source = nt.Node( sourcename )
+			target = nt.Node( "%s_target" % sourcename )
+			pairs.append( ( source, target ) )
+		# END for each source mesh name
+		nt.copyLightLinksMany( list() )
+		
+		num_links = [ len( linkers( target ) ) for source, target in pairs ]
+		nt.copyLightLinksMany( pairs )
+		for ( source, target ), nl in zip( pairs, num_links ):
+			assert len( linkers( target ) ) == nl + len( linkers( source ) )
+		# END for each pair
+		
+		# substitution moves all links
+		nt.copyLightLinksMany( [ ( target, source ) for source, target in pairs ], substitute = True )
+		for source, target in pairs:
+			assert not linkers( target )
+		# END for each pair
 
 
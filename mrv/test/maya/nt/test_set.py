@@ -2,6 +2,7 @@
 """ Test sets and partitions """
 from mrv.test.maya import *
 import mrv.maya.nt as nt
+import mrv.maya.nt.set as set_module
 
 import maya.cmds as cmds
 import maya.OpenMaya as api
@@ -211,6 +212,85 @@ class TestSets( unittest.TestCase ):
 		assert [ m for m in s ] == s.members().mtoList()
 		assert iter(s).next() in s
 
+	@with_undo
+	def test_membershipIndex( self ):
+		s = nt.createNode( "indexedSet", "objectSet" )
+		memberlist = self._getMemberList()
+		others = [ nt.Node( "top" ), nt.Node( "side" ).dagPath(), nt.Node( "persp" ).rotate ]
+		
+		index = s.membershipIndex()
+		assert s.membershipIndex() is index
+		assert len( index ) == 0
+		assert s.areMembers( memberlist ) == [ False ] * len( memberlist )
+		
+		s.addMembers( memberlist )
+		assert len( index ) == len( memberlist )
+		assert s.areMembers( memberlist ) == [ True ] * len( memberlist )
+		assert s.areMembers( others ) == [ False ] * len( others )
+		assert s.areMembers( s.members() ) == [ True ] * len( memberlist )
+		for member in memberlist:
+			assert member in s and index.contains( member )
+		# END for each member
+		
+		# objects work as well as dag paths and nodes
+		assert nt.Node( "front" ) in s and nt.Node( "front" ).object() in index
+		
+		# changes invalidate the index
+		s.removeMember( memberlist[ 0 ] )
+		assert memberlist[ 0 ] not in s
+		cmds.undo()
+		assert memberlist[ 0 ] in s
+		
+		# COMPONENTS
+		############
+		mesh = nt.Node( cmds.polyCube()[0] )[0]
+		f3 = nt.SingleIndexedComponent.create( api.MFn.kMeshPolygonComponent )
+		for i in range( 3 ): f3.addElement( i )
+		f1 = nt.SingleIndexedComponent.create( api.MFn.kMeshPolygonComponent )
+		f1.addElement( 1 )
+		f5 = nt.SingleIndexedComponent.create( api.MFn.kMeshPolygonComponent )
+		f5.addElement( 5 )
+		
+		s.addMember( mesh, component = f3 )
+		assert mesh in s
+		assert index.contains( mesh, f3 ) and index.contains( mesh, f1 )
+		assert not index.contains( mesh, f5 )
+		
+		# whole objects contain all components
+		s.removeMember( mesh, component = f3 )
+		assert mesh not in s
+		s.addMember( mesh )
+		assert index.contains( mesh, f5 )
+		
+		# HASH COLLISIONS
+		#################
+		# members colliding with the key of another one are not mistaken for it
+		front, top = nt.Node( "front" ).object(), nt.Node( "top" ).object()
+		# simulate front colliding with top by storing it under top's key
+		key = set_module._memberKey( top )
+		members = { key : [ front, True, dict(), list() ] }
+		ckey, entry = set_module._findMember( members, top )
+		assert entry is None and ckey != key
+		members[ ckey ] = [ top, True, dict(), list() ]
+		assert set_module._findMember( members, top ) == ( ckey, members[ ckey ] )
+		
+		# front resolves to its own key, not to the entry stored under top's key
+		assert set_module._findMember( members, front ) == ( set_module._memberKey( front ), None )
+		members[ set_module._memberKey( front ) ] = [ front, True, dict(), list() ]
+		assert set_module._findMember( members, front )[ 1 ][ 0 ] is front
+		assert set_module._findMember( members, top )[ 1 ][ 0 ] is top
+		
+		# CACHE CLEANUP
+		###############
+		assert set_module._membershipIndexCache.get( set_module._nodeKey( s.object() ) ) is index
+		nt.delete( s )
+		assert index not in set_module._membershipIndexCache.values()
+		
+		nt.createNode( "otherSet", "objectSet" ).membershipIndex()
+		assert set_module._membershipIndexCache
+		cmds.file( new = 1, force = 1 )
+		assert not set_module._membershipIndexCache
+		
 	def test_setOperations( self ):
 		"""byroniom.maya.nt.sets: unions, intersections, difference, overloaded ops"""
 		memberlist = self._getMemberList( )
@@ -259,6 +339,16 @@ class TestSets( unittest.TestCase ):
 		s3.addMembers( fewmembers )
 		sellist = s.intersection( [ s2, s3 ] )
 		assert sellist.length() == len( fewmembers ) 
+		
+		# members need to be in all of the sets
+		s4 = nt.createNode( "partialSet", "objectSet" )
+		s4.addMembers( memberlist[ 1:5 ] )
+		sellist = s.intersection( [ s2, s4 ] )
+		assert sellist.length() == len( memberlist[ 1:3 ] )
+		assert s.intersection( [ s4, s2 ] ).length() == sellist.length()
+		s4.clear()
+		s4.addMember( memberlist[ 4 ] )
+		assert s.intersection( [ s2, s4 ] ).length() == 0
 
 		list( s.iterIntersection( s2 ) )
 
@@ -285,6 +375,56 @@ class TestSets( unittest.TestCase ):
 		assert s.members().length() - s2.members().length() - s3.members().length() == sellist.length() 
 		
 
+	@with_undo
+	def test_componentSetOperations( self ):
+		mesh = nt.Node( cmds.polyCube()[0] )[0]
+		def faces( *indices ):
+			comp = nt.SingleIndexedComponent.create( api.MFn.kMeshPolygonComponent )
+			for i in indices: comp.addElement( i )
+			return comp
+		# END utility
+		def elements( sellist ):
+			path = api.MDagPath()
+			comp = api.MObject()
+			sellist.getDagPath( 0, path, comp )
+			if comp.isNull():
+				return None
+			return sorted( nt.SingleIndexedComponent( comp ).getElements() )
+		# END utility
+		
+		s1 = nt.createNode( "compSet1", "objectSet" )
+		s2 = nt.createNode( "compSet2", "objectSet" )
+		s1.addMember( mesh, component = faces( 0, 1, 2 ) )
+		s2.addMember( mesh, component = faces( 2, 3 ) )
+		
+		# no temporary nodes are created, and nothing is put onto the undo queue
+		nodes_before = len( cmds.ls() )
+		cmds.flushUndo()
+		
+		assert elements( s1.union( s2 ) ) == [ 0, 1, 2, 3 ]
+		assert elements( s1.intersection( s2 ) ) == [ 2 ]
+		assert elements( s1.difference( s2 ) ) == [ 0, 1 ]
+		assert elements( s1.intersection( [ s2, s2 ] ) ) == [ 2 ]
+		assert s1.difference( s1 ).length() == 0
+		assert s1.intersection( [] ).length() == 0
+		assert elements( s1.difference( [] ) ) == [ 0, 1, 2 ]
+		
+		# whole objects contain all components
+		sellist = api.MSelectionList()
+		sellist.add( mesh.dagPath() )
+		assert elements( s1.intersection( sellist ) ) == [ 0, 1, 2 ]
+		assert elements( s1.union( sellist ) ) is None
+		
+		assert len( cmds.ls() ) == nodes_before
+		assert not cmds.undoInfo( q=1, undoName=1 )
+		
+		# whole objects minus components require maya
+		s2.clear()
+		s2.addMember( mesh )
+		assert s2.difference( s1 ).length() == 1
+		assert elements( s2.intersection( s1 ) ) == [ 0, 1, 2 ]
+		assert s2.members().length() == 1
+		
 	def test_partitions( self ):
 
 		# one transform, two sets, one partition
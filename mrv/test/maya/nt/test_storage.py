@@ -6,10 +6,16 @@ import mrv.maya as mrvmaya
 from mrv.path import make_path
 
 from mrv.maya.nt.persistence import createStorageAttribute, PyPickleData
+import mrv.maya.nt.persistence as persistence
+import mrv.maya.nt.storage as storage
 
 import maya.cmds as cmds
+import maya.OpenMaya as api
 
 import tempfile
+import time
+import sys
+import gc
 
 class TestStorage(unittest.TestCase):
 	@with_undo
@@ -141,6 +147,298 @@ class TestStorage(unittest.TestCase):
 		# END for each filetype
 
 
+	@with_persistence
+	def test_storagePayloadFormat(self):
+		tmpdir = make_path(tempfile.gettempdir())
+		self.failUnlessRaises(ValueError, persistence.setPayloadFormat, version=5)
+		self.failUnlessRaises(ValueError, persistence.setPayloadFormat, foo=1)
+		
+		prev_format = persistence.payloadFormat()
+		small = dict(key="value")
+		large = dict(list=range(50000), string="hello world" * 1000)
+		
+		# each written format, including the legacy one, must be readable
+		formats = (	dict(version=0), 
+					dict(compressionThreshold=-1, rawBinary=0), 
+					dict(compressionThreshold=-1, rawBinary=1, protocol=0), 
+					dict(compressionThreshold=1024, rawBinary=0), 
+					dict(compressionThreshold=1024, rawBinary=1))
+		try:
+			for fmt in formats:
+				for filetype in (".ma", ".mb"):
+					persistence.setPayloadFormat(**prev_format)
+					persistence.setPayloadFormat(**fmt)
+					mrvmaya.Scene.new(force = True)
+					
+					snode = nt.createNode("storage", "storageNode")
+					snode.pythonData("small", autoCreate=True).update(small)
+					snode.pythonData("large", autoCreate=True).update(large)
+					snode.pythonData("empty", autoCreate=True)
+					
+					filepath = tmpdir / ("storageformattest" + filetype)
+					mrvmaya.Scene.save(filepath)
+					mrvmaya.Scene.open(filepath, force=True)
+					
+					snode = nt.Node("storage")
+					assert dict(snode.pythonData("small")._pydata) == small
+					assert dict(snode.pythonData("large")._pydata) == large
+					assert len(snode.pythonData("empty")) == 0
+					filepath.remove()
+				# END for each filetype
+			# END for each format
+		finally:
+			persistence.setPayloadFormat(**prev_format)
+		# END restore format
+
+	@with_persistence
+	def test_storageBlobStore(self):
+		tmpdir = make_path(tempfile.gettempdir())
+		prev_format = persistence.payloadFormat()
+		large = dict(list=range(10000))
+		try:
+			persistence.setPayloadFormat(blobThreshold=1024)
+			for filetype in (".ma", ".mb"):
+				mrvmaya.Scene.new(force = True)
+				snode = nt.createNode("storage", "storageNode")
+				snode.pythonData("small", autoCreate=True)['key'] = 'value'
+				snode.pythonData("large", autoCreate=True).update(large)
+				
+				filepath = tmpdir / ("storageblobtest" + filetype)
+				store = persistence.blobStore(filepath)
+				mrvmaya.Scene.save(filepath)
+				
+				# only the large value went into the store
+				digests = list(store.digests())
+				assert len(digests) == 1
+				blobpath = store.path(digests[0])
+				mtime = blobpath.mtime()
+				
+				mrvmaya.Scene.open(filepath, force=True)
+				snode = nt.Node("storage")
+				assert dict(snode.pythonData("large")._pydata) == large
+				assert snode.pythonData("small")['key'] == 'value'
+				
+				# unchanged blobs are not written again
+				time.sleep(0.01)
+				mrvmaya.Scene.save(filepath)
+				assert blobpath.mtime() == mtime
+				
+				# copies work as usual
+				dup = snode.duplicate()
+				assert dict(dup.pythonData("large")._pydata) == large
+				
+				# changes create a new blob
+				snode.pythonData("large")['other'] = 1
+				mrvmaya.Scene.save(filepath)
+				assert len(list(store.digests())) == 2
+				
+				# untouched external payloads go into the store of the file being 
+				# written, for save as as well as for exports
+				large['other'] = 1
+				for saveas in (True, False):
+					mrvmaya.Scene.open(filepath, force=True)
+					otherpath = tmpdir / ("storageblobothertest%i%s" % (saveas, filetype))
+					otherstore = persistence.blobStore(otherpath)
+					if saveas:
+						mrvmaya.Scene.save(otherpath)
+					else:
+						mrvmaya.Scene.export(otherpath)
+						assert mrvmaya.Scene.name() == filepath
+					# END save as or export
+					assert len(list(otherstore.digests())) == 1
+					
+					# they don't depend on the source store anymore
+					store.root().rename(store.root() + ".moved")
+					try:
+						mrvmaya.Scene.open(otherpath, force=True)
+						assert dict(nt.Node("storage").pythonData("large")._pydata) == large
+					finally:
+						(store.root() + ".moved").rename(store.root())
+					# END restore source store
+					
+					otherpath.remove()
+					otherstore.root().rmtree()
+				# END for each way to write another file
+				
+				# disabling the blob store inlines untouched external payloads
+				mrvmaya.Scene.open(filepath, force=True)
+				persistence.setPayloadFormat(blobThreshold=-1)
+				inlinepath = tmpdir / ("storageblobinlinetest" + filetype)
+				mrvmaya.Scene.save(inlinepath)
+				persistence.setPayloadFormat(blobThreshold=1024)
+				assert not persistence.blobStore(inlinepath).root().exists()
+				mrvmaya.Scene.open(inlinepath, force=True)
+				assert dict(nt.Node("storage").pythonData("large")._pydata) == large
+				inlinepath.remove()
+				
+				# references resolve the blobs next to the referenced file
+				mrvmaya.Scene.new(force = True)
+				mrvmaya.ref.createReference(filepath, namespace="referenced")
+				assert nt.Node("referenced:storage").pythonData("large")['other'] == 1
+				
+				mrvmaya.Scene.new(force = True)
+				filepath.remove()
+				store.root().rmtree()
+			# END for each filetype
+		finally:
+			persistence.setPayloadFormat(**prev_format)
+		# END restore format
+
+	@with_persistence
+	def test_storageLazyUnpickling(self):
+		import maya.OpenMayaMPx as mpx
+		tmpdir = make_path(tempfile.gettempdir())
+		tdict = sys._maya_pyPickleData_trackingDict
+		rawdata = lambda plug: tdict.raw(mpx.asHashable(api.MFnPluginData(plug.asMObject()).data()))
+		
+		for filetype in (".ma", ".mb"):
+			mrvmaya.Scene.new(force = True)
+			snode = nt.createNode("storage", "storageNode")
+			snode.pythonData("lazy", autoCreate=True)['key'] = 'value'
+			
+			filepath = tmpdir / ("storagelazytest" + filetype)
+			mrvmaya.Scene.save(filepath)
+			mrvmaya.Scene.open(filepath, force=True)
+			
+			# data is not unpickled during load
+			snode = nt.Node("storage")
+			valplug = snode.storagePlug("lazy", snode.kValue)
+			payload = rawdata(valplug)
+			assert isinstance(payload, persistence._Payload) and not payload.isLoaded()
+			
+			# copies share the payload
+			dup = snode.duplicate(shallow=True)
+			assert rawdata(dup.storagePlug("lazy", dup.kValue)) is payload
+			
+			# untouched data is written as is
+			mrvmaya.Scene.save(filepath)
+			assert not payload.isLoaded()
+			
+			# first access unpickles 
+			assert snode.pythonData("lazy")['key'] == 'value'
+			assert payload.isLoaded()
+			assert dup.pythonData("lazy")['key'] == 'value'
+			
+			mrvmaya.Scene.open(filepath, force=True)
+			assert nt.Node("storage").pythonData("lazy")['key'] == 'value'
+			filepath.remove()
+		# END for each filetype
+
+	@with_undo
+	@with_persistence
+	def test_storageChangeTracking(self):
+		tmpdir = make_path(tempfile.gettempdir())
+		mrvmaya.Scene.new(force = True)
+		snode = nt.createNode("storage", "storageNode")
+		
+		val = snode.pythonData("test", autoCreate=True)
+		assert not val.isTrackingChanges() and not val.dirtyKeys()
+		val['a'] = dict(b=dict(c=1))
+		val['l'] = [1, 2]
+		val['s'] = 1
+		
+		val = snode.pythonData("test", trackChanges=True)
+		assert val.isTrackingChanges() and not val.dirtyKeys()
+		
+		# reading does not make dirty
+		assert val['a']['b']['c'] == 1 and val.get('l') == [1, 2] and val['s'] == 1
+		assert not val.dirtyKeys()
+		
+		# looking up a mutator does not make dirty, calling it does
+		val['l'].append
+		assert not val.dirtyKeys()
+		
+		# nested changes
+		val['a']['b']['c'] = 2
+		assert val.dirtyKeys() == frozenset(('a', ))
+		assert snode.pythonData("test")['a']['b']['c'] == 2
+		val['l'].append(3)
+		val['l'] += [4]
+		assert val.dirtyKeys() == frozenset(('a', 'l'))
+		assert type(val._pydata['l']) is list and val['l'] == [1, 2, 3, 4]
+		
+		val.clearDirtyKeys()
+		assert not val.dirtyKeys()
+		
+		val.update(s=2, n=1)
+		val.pop('a')
+		assert val.dirtyKeys() == frozenset(('s', 'n', 'a'))
+		val.clearDirtyKeys()
+		val.clear()
+		assert val.dirtyKeys() == frozenset(('s', 'n', 'l'))
+		
+		# attribute access tracks changes as well
+		val['l'] = [1]
+		val.clearDirtyKeys()
+		val.attr = val['l']
+		assert val.dirtyKeys() == frozenset(('attr', ))
+		assert type(val._pydata['attr']) is list and val['attr'] == [1]
+		
+		# REFERENCED VALUES
+		snode.pythonData("test")['a'] = dict(b=1)
+		filepath = tmpdir / "storagetrackingtest.ma"
+		mrvmaya.Scene.save(filepath)
+		
+		mrvmaya.Scene.new(force = True)
+		mrvmaya.ref.createReference(filepath, namespace="referenced")
+		refnode = nt.Node("referenced:storage")
+		
+		@undoable
+		def change():
+			rval = refnode.pythonData("test", trackChanges=True)
+			assert rval.isReferenced()
+			rval['a']['b'] = 2
+			rval['a']['c'] = 3
+			# written back once the undoable method finished
+			assert rval._writePending
+			return rval
+		# END change
+		rval = change()
+		assert not rval._writePending
+		assert rval.dirtyKeys() == frozenset(('a', ))
+		
+		# without undoable scope, each change is written back right away
+		rval['a']['d'] = 4
+		assert not rval._writePending
+		
+		filewithrefpath = tmpdir / "refstoragetrackingtest.ma"
+		mrvmaya.Scene.save(filewithrefpath)
+		mrvmaya.Scene.open(filewithrefpath, force = True)
+		assert nt.Node("referenced:storage").pythonData("test")['a'] == dict(b=2, c=3, d=4)
+		
+	@with_persistence
+	def test_storageTrackingMemory(self):
+		mrvmaya.Scene.new(force = True)
+		snode = nt.createNode("storage", "storageNode")
+		snode.pythonData("test", autoCreate=True)['data'] = range(10000)
+		gc.collect()
+		
+		info = persistence.dataTrackingInfo()
+		assert info['entries'] >= info['data'] > 0 and info['bytes'] > 10000
+		
+		# each retrieval creates copies of the data object, which share the data
+		for i in xrange(2000):
+			val = snode.pythonData("test")
+			val['count'] = i
+			plug = snode.storagePlug("test", snode.kValue)
+			api.MPlug.setMObject(plug, plug.asMObject())
+			
+			plugs = [snode.storagePlug("test", snode.kValue).asMObject() for c in range(5)]
+			if i == 0:
+				busy_info = persistence.dataTrackingInfo()
+				assert busy_info['entries'] > info['entries']
+				assert busy_info['data'] == info['data']
+			# END check shared data
+			del(val, plug, plugs)
+		# END for each get/set cycle
+		gc.collect()
+		
+		# all copies are gone, shared data was counted only once
+		after = persistence.dataTrackingInfo()
+		assert after['entries'] <= info['entries'] + 1
+		assert after['data'] <= info['data'] + 1
+		assert after['bytes'] < info['bytes'] * 2
+		
 	@with_persistence
 	def test_storageAttributeHanlding(self):
 		mrvmaya.Scene.new(force = True)
@@ -204,6 +502,95 @@ class TestStorage(unittest.TestCase):
 		assert conarray.length() == 10 
 		assert len(persp.message.moutputs()) == 10 
 
+	@with_undo
+	@with_persistence
+	def test_storageDataIDIndex(self):
+		mrvmaya.Scene.new(force = True)
+		snode = nt.createNode("storage",  "storageNode")
+		ids = ["id%i" % i for i in range(20)]
+		
+		# BULK ACCESS
+		self.failUnlessRaises(AttributeError, snode.pythonDataMany, ids)
+		vals = snode.pythonDataMany(ids, autoCreate=True)
+		assert len(vals) == len(ids)
+		assert snode.dataIDs() == ids
+		for did, val in zip(ids, vals):
+			assert val._plug.mparent().mchildByName('id').asString() == did
+			val[did] = did
+		# END for each value
+		assert snode.pythonData(ids[-1])[ids[-1]] == ids[-1]
+		assert [v[did] for did, v in zip(ids, snode.pythonDataMany(ids))] == ids
+		
+		# CHANGES MADE BY OTHERS
+		mplug = snode.findStoragePlug(ids[0])
+		mplug.mchildByName('id').msetString("renamed")
+		assert snode.findStoragePlug(ids[0]) is None
+		assert snode.findStoragePlug("renamed") == mplug
+		
+		cmds.undo()
+		assert snode.findStoragePlug("renamed") is None
+		assert snode.findStoragePlug(ids[0]) == mplug
+		
+		cmds.removeMultiInstance(mplug.name(), b=True)
+		assert snode.findStoragePlug(ids[0]) is None
+		assert len(snode.dataIDs()) == len(ids) - 1
+		
+		# new ids are still found
+		snode.makePlug("new")
+		assert snode.dataIDs()[-1] == "new"
+		assert snode.findStoragePlug("new") is not None
+		
+		# new ids filling a gap in the logical indices are listed in physical order
+		cmds.removeMultiInstance(snode.findStoragePlug(ids[5]).name(), b=True)
+		assert snode.dataIDs() == ids[1:5] + ids[6:] + ["new"]
+		assert snode.makePlug("gap").logicalIndex() == 5
+		assert snode.dataIDs() == ids[1:5] + ["gap"] + ids[6:] + ["new"]
+		
+		# CACHE CLEANUP
+		assert len(storage._dataIDIndexCache) == 1
+		nt.delete(snode)
+		assert not storage._dataIDIndexCache
+		
+		snode = nt.createNode("storage",  "storageNode")
+		snode.dataIDs()
+		assert len(storage._dataIDIndexCache) == 1
+		mrvmaya.Scene.new(force = True)
+		assert not storage._dataIDIndexCache
+		
+	@with_undo
+	@with_persistence
+	def test_storageCopyFrom(self):
+		mrvmaya.Scene.new(force = True)
+		snode = nt.createNode("storage",  "storageNode")
+		ids = ["id%i" % i for i in range(5)]
+		for did, val in zip(ids, snode.pythonDataMany(ids, autoCreate=True)):
+			val[did] = [did]
+		# END for each value
+		objset = snode.objectSet(ids[1], 2, autoCreate = True)
+		
+		for shallow in range(2):
+			dnode = nt.createNode("storagecopy",  "storageNode")
+			dnode.copyFrom(snode, shallow=shallow)
+			assert dnode.dataIDs() == ids
+			assert not dnode.setsByID(ids[1])
+			for did in ids:
+				dval = dnode.pythonData(did)
+				assert dval[did] == [did]
+				assert (dval[did] is snode.pythonData(did)[did]) == shallow
+			# END for each id
+			
+			# set connections are copied in one go, and are undoable
+			dnode.copyFrom(snode, shallow=shallow, sets=True)
+			assert dnode.dataIDs() == ids
+			assert dnode.objectSet(ids[1], 2) == objset
+			cmds.undo()
+			assert not dnode.setsByID(ids[1])
+			cmds.redo()
+			assert dnode.objectSet(ids[1], 2) == objset
+			assert snode.objectSet(ids[1], 2) == objset
+			dnode.delete()
+		# END for each copy mode
+		
 	@with_undo
 	@with_persistence
 	def test_storageSetHandling(self):
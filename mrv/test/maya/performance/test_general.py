@@ -160,6 +160,39 @@ class TestGeneralPerformance( unittest.TestCase ):
 			# END for each dag value
 		# END for each asNode value
 
+	def test_namespace_index(self):
+		# large_scene_100000.mb is created by _DISABLED_test_buildTestScene
+		for nodecount in (2500, 100000):
+			benchfile = get_maya_file("large_scene_%i.mb" % nodecount)
+			if not benchfile.isfile():
+				print >>sys.stderr, "Skipped namespace index benchmark as %s does not exist" % benchfile
+				continue
+			# END skip missing scenes
+			mrvmaya.Scene.open(benchfile, force=True)
+			
+			st = time.time()
+			ns._namespaceIndex().invalidate()
+			ns._namespaceIndex()
+			elapsed = time.time() - st
+			nn = len(cmds.ls())
+			print >>sys.stderr, "Indexed %i nodes by namespace in %f s ( %f / s )" % (nn, elapsed, nn / elapsed)
+			
+			namespaces = list(chain((ns.RootNamespace, ), ns.RootNamespace.childrenDeep()))
+			for depth in (0, -1):
+				for index in range(2):
+					for asNode in range(2):
+						nn = 0
+						st = time.time()
+						for namespace in namespaces:
+							nn += len(list(namespace.iterNodes(asNode=asNode, depth=depth, index=index)))
+						# END for each namespace
+						elapsed = time.time() - st
+						print >>sys.stderr, "%i namespaces iterNodes(asNode=%i, depth=%i, index=%i): got %i nodes in %f s ( %f / s )" % (len(namespaces), asNode, depth, index, nn, elapsed, nn / elapsed)
+					# END for each asNode value
+				# END for each index mode
+			# END for each depth
+		# END for each scene
+
 	@with_undo
 	@with_scene('empty.ma')
 	def test_createNodes( self ):
@@ -378,6 +411,50 @@ class TestGeneralPerformance( unittest.TestCase ):
 			print >>sys.stderr, "Renamed %i %s nodes in  %f s ( %f nodes / s )" % (nn, node_type, elapsed, nn/elapsed)
 		# END for each node type
 		
+	@with_scene('empty.ma')
+	def test_create_delete_nodes_batched(self):
+		for nn in (1000, 10000, 100000):
+			for node_type in ("network", "transform"):
+				specs = [("%s%i" % (node_type, i), node_type) for i in xrange(nn)]
+				
+				# CREATE NODES
+				st = time.time()
+				node_list = nt.createNodes(specs)
+				elapsed = time.time() - st
+				assert len(node_list) == nn
+				print >>sys.stderr, "Batch-created %i %s nodes in  %f s ( %f nodes / s )" % (nn, node_type, elapsed, nn/elapsed)
+				
+				# DELETE NODES
+				st = time.time()
+				nt.delete(*node_list, bulk=True)
+				elapsed = time.time() - st
+				assert not node_list[-1].isValid()
+				print >>sys.stderr, "Bulk-deleted %i %s nodes in  %f s ( %f nodes / s )" % (nn, node_type, elapsed, nn/elapsed)
+			# END for each node type
+			
+			# SHARED PARENTS
+			parent_count = 10
+			specs = [("|parent%i|ns:child%i" % (i % parent_count, i), "transform") for i in xrange(nn)]
+			st = time.time()
+			node_list = nt.createNodes(specs)
+			elapsed = time.time() - st
+			print >>sys.stderr, "Batch-created %i transforms below %i parents in  %f s ( %f nodes / s )" % (nn, parent_count, elapsed, nn/elapsed)
+			
+			st = time.time()
+			nt.delete(*(node_list + [n.parent() for n in node_list[:parent_count]]), bulk=True)
+			elapsed = time.time() - st
+			print >>sys.stderr, "Bulk-deleted %i transforms and their parents in  %f s ( %f nodes / s )" % (nn, elapsed, nn/elapsed)
+			
+			# compare to individual deletion
+			if nn > 10000:
+				continue
+			node_list = nt.createNodes(specs)
+			st = time.time()
+			nt.delete(*node_list)
+			elapsed = time.time() - st
+			print >>sys.stderr, "Deleted %i transforms individually in  %f s ( %f nodes / s )" % (nn, elapsed, nn/elapsed)
+		# END for each node count
+		
 	@with_scene('empty.ma')
 	def test_ref_iteration(self):
 		scene_file = get_maya_file( "large_scene_2500.mb" )
@@ -403,9 +480,49 @@ class TestGeneralPerformance( unittest.TestCase ):
 			# END for each dag value
 		# END for each asNode option
 		
+		# member iteration
+		for asNode in range(2):
+			for dag in range(2):
+				st = time.time()
+				nodes_list = list(ref.iterNodes(asNode=asNode, dag=dag, members=True))
+				elapsed = time.time() - st
+				nn = len(nodes_list)
+				print >>sys.stderr, "ref.iterNodes(asNode=%i, dag=%i, members=1): iterated %i nodes in  %f s ( %f nodes / s )" % (asNode, dag, nn, elapsed, nn/elapsed)
+			# END for each dag value
+		# END for each asNode option
+		
 		# try namespace iteration
 		self._iterate_namespace(ref.namespace(), unlimited_depth=True)
 		
+	@with_scene('ref2re.ma')
+	def test_reference_listing(self):
+		ni = 100
+		for cached in range(2):
+			if not cached:
+				FileReference.referenceTree().invalidate()
+			# END force rebuild
+			st = time.time()
+			nr = len(FileReference.lsDeep())
+			elapsed = time.time() - st
+			print >>sys.stderr, "FileReference.lsDeep(cached=%i): listed %i references in %f s ( %f references / s )" % (cached, nr, elapsed, nr/elapsed)
+		# END for each cache mode
+		
+		st = time.time()
+		for i in xrange(ni):
+			FileReference.lsDeep()
+		# END for each iteration
+		elapsed = time.time() - st
+		print >>sys.stderr, "FileReference.lsDeep(cached=1): listed all references %i times in %f s ( %f / s )" % (ni, elapsed, ni/elapsed)
+		
+		tlr = FileReference.ls()[0]
+		st = time.time()
+		for i in xrange(ni):
+			tlr.setLoaded(i % 2)
+			FileReference.lsDeep()
+		# END for each iteration
+		elapsed = time.time() - st
+		print >>sys.stderr, "FileReference.lsDeep: listed all references after changing the loaded state %i times in %f s ( %f / s )" % (ni, elapsed, ni/elapsed)
+		
 	@with_scene('empty.ma')
 	def test_typeconversion_overhead(self):
 		# this method will be extended once we actually do typeconversions automatically 
@@ -93,6 +93,120 @@ class TestGeometryPerformance( unittest.TestCase ):
 		print >>sys.stderr, "Iterated %i face-vertices and queried position in %f s ( %f queries/s )" % (nc, elapsed, nc/elapsed)
 		
 		
+	@with_scene('mesh40k.mb')
+	def test_mesh_snapshot(self):
+		m = nt.Node('mesh40k')
+		nv = m.numVertices()
+		
+		# ITERATOR
+		st = time.time()
+		points = list()
+		for it in m.vtx:
+			p = it.position()
+			points.extend((p.x, p.y, p.z))
+		# END for each vertex
+		iter_elapsed = time.time() - st
+		print >>sys.stderr, "Read %i vertex positions using iterators in %f s ( %f pos/s )" % (nv, iter_elapsed, nv/iter_elapsed)
+		
+		# SNAPSHOT
+		for pointType in ('f', 'd'):
+			st = time.time()
+			snapshot = m.snapshot(('points', ), pointType=pointType)
+			elapsed = time.time() - st
+			assert snapshot.count('points') == nv
+			print >>sys.stderr, "Read %i vertex positions using a snapshot (%s) in %f s ( %f pos/s ), %f times faster" % (nv, pointType, elapsed, nv/elapsed, iter_elapsed/elapsed)
+		# END for each point type
+		
+		# polygons
+		st = time.time()
+		ia = nt.api.MIntArray()
+		counts = list()
+		connects = list()
+		for it in m.f:
+			it.getVertices(ia)
+			counts.append(len(ia))
+			connects.extend(ia)
+		# END for each polygon
+		iter_elapsed = time.time() - st
+		nf = len(counts)
+		print >>sys.stderr, "Read %i polygon vertex ids using iterators in %f s ( %f polys/s )" % (nf, iter_elapsed, nf/iter_elapsed)
+		
+		st = time.time()
+		snapshot = m.snapshot(('faceCounts', 'faceConnects'))
+		elapsed = time.time() - st
+		assert list(snapshot['faceCounts']) == counts
+		print >>sys.stderr, "Read %i polygon vertex ids using a snapshot in %f s ( %f polys/s ), %f times faster" % (nf, elapsed, nf/elapsed, iter_elapsed/elapsed)
+		
+		# all channels
+		st = time.time()
+		snapshot = m.snapshot(m.kSnapshotChannels)
+		elapsed = time.time() - st
+		print >>sys.stderr, "Read all channels (%s) of a mesh with %i vertices in %f s" % (", ".join(snapshot.channels()), nv, elapsed)
+		
+	def test_light_link_copy(self):
+		import maya.cmds as cmds
+		
+		def copy_light_links_scan(source, target):
+			"""Copy the light links like copyLightLinks did before it used copyLightLinksMany, 
+			scanning the linker array for a free index for each link"""
+			for input_plug in source.message.moutputs():
+				if input_plug.node().apiType() != nt.api.MFn.kLightLink:
+					continue
+				parent_compound = input_plug.mparent()
+				array_plug = parent_compound.array()
+				
+				new_parent_compound = None
+				for iphysical in xrange(array_plug.numElements() - 1, -1, -1):
+					try_plug = array_plug.elementByLogicalIndex(array_plug[iphysical].logicalIndex() + 1)
+					if try_plug.child(0).minput().isNull():
+						new_parent_compound = try_plug
+						break
+				# END for each physical index
+				
+				light_plug = parent_compound.child(0).minput()
+				if not light_plug.isNull():
+					light_plug.mconnectTo(new_parent_compound.child(0), force=False)
+				target.message.mconnectTo(new_parent_compound.child(1))
+			# END for each output plug
+		# END utility
+		
+		num_shapes = 500
+		light = cmds.pointLight()
+		sources = list()
+		for i in xrange(num_shapes):
+			cube = cmds.polyCube()[0]
+			cmds.lightlink(make=1, light=light, object=cube)
+			sources.append(nt.Node(cube)[0])
+		# END for each source shape
+		
+		scan_elapsed = None
+		for mode in ("scan", "single", "bulk"):
+			targets = [ nt.Node(cmds.polyCube()[0])[0] for i in xrange(num_shapes) ]
+			st = time.time()
+			if mode == "bulk":
+				nt.copyLightLinksMany(zip(sources, targets))
+			else:
+				copy = copy_light_links_scan
+				if mode == "single":
+					copy = lambda source, target: source.copyLightLinks(target)
+				# END handle mode
+				for source, target in zip(sources, targets):
+					copy(source, target)
+				# END for each pair
+			# END handle mode
+			elapsed = time.time() - st
+			
+			num_links = lambda shape: len([p for p in shape.message.moutputs() if p.node().apiType() == nt.api.MFn.kLightLink])
+			for source, target in zip(sources, targets):
+				assert num_links(target) == num_links(source)
+			# END for each pair
+			
+			if scan_elapsed is None:
+				scan_elapsed = elapsed
+			# END remember baseline
+			print >>sys.stderr, "Copied light links of %i shapes (%s) in %f s ( %f shapes/s ), %f times faster than scanning" % (num_shapes, mode, elapsed, num_shapes/elapsed, scan_elapsed/elapsed)
+		# END for each mode
+		
 	@with_scene('mesh40k.mb')
 	def test_set_vertex_colors(self):
 		st = time.time()
@@ -148,3 +262,32 @@ class TestGeometryPerformance( unittest.TestCase ):
 		
 		
 		
+	@with_scene('mesh40k.mb')
+	def test_component_creation(self):
+		import array
+		m = nt.Node('mesh40k')
+		nv = m.numVertices()
+		indices = range(nv)
+		
+		st = time.time()
+		ia = nt.api.MIntArray()
+		for i in indices:
+			ia.append(i)
+		# END for each index
+		m.cvtx.empty().addElements(ia)
+		elapsed = time.time() - st
+		print >>sys.stderr, "Created component with %i vertices by appending in %f s ( %f indices/s )" % (nv, elapsed, nv/elapsed)
+		
+		for name, source in (("list", indices), ("array", array.array('i', indices)), ("xrange", xrange(nv))):
+			st = time.time()
+			c = m.cvtx[source]
+			elapsed = time.time() - st
+			assert len(c.elements()) == nv
+			print >>sys.stderr, "Created component with %i vertices from %s in %f s ( %f indices/s )" % (nv, name, elapsed, nv/elapsed)
+		# END for each source
+		
+		st = time.time()
+		c = m.cvtx[0:nv:2]
+		elapsed = time.time() - st
+		print >>sys.stderr, "Created component with %i vertices from stepped slice in %f s ( %f indices/s )" % (nv/2, elapsed, (nv/2)/elapsed)
+		
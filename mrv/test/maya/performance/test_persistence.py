@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Test the performance of the persistence system
+"""
+from mrv.test.maya import *
+import mrv.maya as mrvmaya
+import mrv.maya.nt as nt
+import mrv.maya.nt.persistence as persistence
+from mrv.path import make_path
+
+import tempfile
+import sys
+import time
+
+class TestPersistencePerformance( unittest.TestCase ):
+
+	@with_persistence
+	def test_storage_file_io(self):
+		mrvmaya.Scene.new(force=True)
+		tmpdir = make_path(tempfile.gettempdir())
+
+		# 10 MB of payload, distributed on a few nodes
+		num_nodes = 10
+		payload_size = 1024 * 1024
+		for i in xrange(num_nodes):
+			snode = nt.createNode("storage%i" % i, "storageNode")
+			val = snode.pythonData("payload", autoCreate=True)
+			val['bytes'] = str(i) * payload_size
+			val['list'] = range(payload_size / 64)
+		# END for each node
+
+		prev_format = persistence.payloadFormat()
+		formats = (	("legacy", dict(version=0)), 
+					("base64", dict(compressionThreshold=-1, rawBinary=0)), 
+					("raw", dict(compressionThreshold=-1, rawBinary=1)), 
+					("zlib+base64", dict(rawBinary=0)), 
+					("zlib+raw", dict(rawBinary=1)))
+		try:
+			for fmt_name, fmt in formats:
+				persistence.setPayloadFormat(**prev_format)
+				persistence.setPayloadFormat(**fmt)
+				for ext in (".mb", ".ma"):
+					filepath = tmpdir / ("storage_perf%s" % ext)
+		
+					st = time.time()
+					mrvmaya.Scene.save(filepath)
+					elapsed = time.time() - st
+					print >> sys.stderr, "%s: Saved %i MB of storage data to %s in %f s ( %f MB / s ), file size is %i kB" % (fmt_name, num_nodes, ext, elapsed, num_nodes / elapsed, filepath.size() / 1024)
+		
+					st = time.time()
+					mrvmaya.Scene.open(filepath, force=True)
+					elapsed = time.time() - st
+					print >> sys.stderr, "%s: Opened %s with %i MB of storage data in %f s ( %f MB / s )" % (fmt_name, ext, num_nodes, elapsed, num_nodes / elapsed)
+		
+					assert len(nt.Node("storage0").pythonData("payload")['bytes']) == payload_size
+					filepath.remove()
+				# END for each file type
+			# END for each format
+		finally:
+			persistence.setPayloadFormat(**prev_format)
+		# END restore format
+	
+	@with_persistence
+	def test_storage_copy(self):
+		mrvmaya.Scene.new(force=True)
+		
+		num_ids = 1000
+		snode = nt.createNode("storage", "storageNode")
+		oset = nt.createNode("set", "objectSet")
+		st = time.time()
+		for i in xrange(num_ids):
+			val = snode.pythonData("id%i" % i, autoCreate=True)
+			val['list'] = range(100)
+			oset.addMember(snode.storagePlug("id%i" % i, plugType=snode.kMessage))
+		# END for each data id
+		elapsed = time.time() - st
+		print >> sys.stderr, "Created %i data ids with set connections in %f s ( %f / s )" % (num_ids, elapsed, num_ids / elapsed)
+		
+		for shallow in (True, False):
+			for sets in (False, True):
+				dnode = nt.createNode("storagecopy", "storageNode")
+				st = time.time()
+				dnode.copyFrom(snode, shallow=shallow, sets=sets)
+				elapsed = time.time() - st
+				print >> sys.stderr, "Copied %i data ids ( shallow = %i, sets = %i ) in %f s ( %f / s )" % (num_ids, shallow, sets, elapsed, num_ids / elapsed)
+				
+				assert len(dnode.dataIDs()) == num_ids
+				dnode.delete()
+			# END for each sets mode
+		# END for each copy mode
@@ -3,6 +3,7 @@
 from mrv.test.maya import *
 
 import mrv.maya.nt as nt
+import maya.cmds as cmds
 import time
 import sys
 
@@ -45,3 +46,73 @@ class TestSetsPerformance( unittest.TestCase ):
 		# END for each ignore_failure value
 		
 		
+	
+	def test_membership_queries(self):
+		s = nt.ObjectSet()
+		num_nodes = 5000
+		nodes = [ nt.Transform() for i in xrange(num_nodes) ]
+		s.addMembers(nodes[::2])
+		
+		st = time.time()
+		for node in nodes[:num_nodes/10]:
+			s.isMember(node)
+		# END for each node
+		elapsed = time.time() - st
+		print >>sys.stderr, "Tested %i nodes for membership (isMember) in %f s ( %f nodes/s )" % (num_nodes/10, elapsed, (num_nodes/10)/elapsed)
+		
+		st = time.time()
+		index = s.membershipIndex()
+		for node in nodes:
+			node in index
+		# END for each node
+		elapsed = time.time() - st
+		print >>sys.stderr, "Tested %i nodes for membership (MembershipIndex) in %f s ( %f nodes/s )" % (num_nodes, elapsed, num_nodes/elapsed)
+		
+		st = time.time()
+		results = s.areMembers(nodes)
+		elapsed = time.time() - st
+		print >>sys.stderr, "Tested %i nodes for membership (areMembers) in %f s ( %f nodes/s )" % (num_nodes, elapsed, num_nodes/elapsed)
+		assert results.count(True) == len(nodes[::2])
+	
+	def test_set_operations(self):
+		num_nodes = 5000
+		nodes = [ nt.Transform() for i in xrange(num_nodes) ]
+		s1 = nt.ObjectSet()
+		s2 = nt.ObjectSet()
+		s1.addMembers(nodes[:num_nodes/2 + num_nodes/4])
+		s2.addMembers(nodes[num_nodes/4:])
+		
+		for opname in ("union", "intersection", "difference"):
+			for other_name, other in (("set", s2), ("list", nodes[num_nodes/4:])):
+				st = time.time()
+				result = getattr(s1, opname)(other)
+				elapsed = time.time() - st
+				print >>sys.stderr, "%s of %i members with %s of %i members in %f s ( %f members/s )" % (opname, num_nodes*3/4, other_name, num_nodes*3/4, elapsed, num_nodes/elapsed)
+				assert result.length()
+			# END for each operand type
+		# END for each operation
+	
+	def test_component_assignments_many(self):
+		num_shapes = 1000
+		isb = nt.Node("initialShadingGroup")
+		sg = nt.ShadingEngine()
+		shapes = list()
+		for i in xrange(num_shapes):
+			shape = nt.Node(cmds.polyCube()[0])[0]
+			sg.addMember(shape, shape.cf[0, 2], force=True)
+			shapes.append(shape)
+		# END for each shape
+		
+		for asComponent in range(2):
+			st = time.time()
+			results = [ s.componentAssignments(asComponent=asComponent) for s in shapes ]
+			elapsed = time.time() - st
+			print >>sys.stderr, "Queried component assignments of %i shapes one by one (asComponent=%i) in %f s ( %f shapes/s )" % (num_shapes, asComponent, elapsed, num_shapes/elapsed)
+			
+			st = time.time()
+			bresults = nt.componentAssignmentsMany(shapes, asComponent=asComponent)
+			elapsed = time.time() - st
+			print >>sys.stderr, "Queried component assignments of %i shapes at once (asComponent=%i) in %f s ( %f shapes/s )" % (num_shapes, asComponent, elapsed, num_shapes/elapsed)
+			
+			assert [ len(r) for r in results ] == [ len(r) for r in bresults ]
+		# END for each wrap mode
@@ -3,6 +3,7 @@
 from mrv.test.maya import *
 from mrv.maya.ns import *
 import mrv.maya as mrvmaya
+import mrv.maya.nt as nt
 
 import maya.cmds as cmds
 
@@ -140,3 +141,128 @@ class TestReferenceRunner( unittest.TestCase ):
 		
 		# namespaces have slots
 		self.failUnlessRaises( AttributeError, setattr, ns, "myattr", 2 )
+
+	@with_undo
+	@with_scene('namespace.ma')
+	def test_namespaceIndex( self ):
+		def names( ns, **kwargs ):
+			rval = set()
+			for n in ns.iterNodes( asNode = 0, **kwargs ):
+				if isinstance( n, nt.api.MDagPath ):
+					rval.add( n.fullPathName() )
+				else:
+					rval.add( nt.api.MFnDependencyNode( n ).name() )
+				# END handle dag paths
+			# END for each node
+			return rval
+		
+		def assert_index_matches_iteration( ):
+			for ns in [ RootNamespace ] + RootNamespace.childrenDeep():
+				for depth in ( 0, 1, 2, -1 ):
+					for dag in range( 2 ):
+						indexed = names( ns, dag = dag, depth = depth )
+						assert indexed == names( ns, dag = dag, depth = depth, index = False )
+					# END for each dag mode
+				# END for each depth
+			# END for each namespace
+		# END utility
+		
+		# the index yields the same nodes as the iteration, for all namespaces 
+		# and depths, including the root namespace
+		assert_index_matches_iteration()
+		assert len( names( RootNamespace, depth = -1 ) ) == len( cmds.ls() )
+		assert len( names( RootNamespace, depth = -1, index = False ) ) == len( cmds.ls() )
+		assert len( names( RootNamespace ) ) < len( cmds.ls() )
+		
+		# dag iteration yields all instances
+		ns = RootNamespace.children()[ 0 ]
+		rel = ns.toRelative()
+		child = nt.createNode( "%s:instparent|%s:instchild" % ( rel, rel ), "transform" )
+		other = nt.createNode( "%s:otherparent" % rel, "transform" )
+		cmds.parent( str( child ), str( other ), addObject = 1 )
+		paths = names( ns, dag = 1 )
+		assert len( [ p for p in paths if p.endswith( "|%s:instchild" % rel ) ] ) == 2
+		assert_index_matches_iteration()
+		
+		# type filters and predicates are honored
+		ns = RootNamespace.children()[ 0 ]
+		assert len( list( ns.iterNodes( nt.api.MFn.kTransform, depth = -1 ) ) ) == len( list( ns.iterNodes( nt.api.MFn.kTransform, depth = -1, index = False ) ) )
+		assert not list( ns.iterNodes( predicate = lambda n: False ) )
+		
+		# adding, renaming and removing nodes invalidates the index
+		numnodes = len( names( ns ) )
+		node = nt.createNode( ns + ":indexed", "transform" )
+		assert node.name() in names( ns )
+		assert len( names( ns ) ) == numnodes + 1
+		
+		node.rename( ":notindexed" )
+		assert len( names( ns ) ) == numnodes
+		assert "notindexed" in names( RootNamespace )
+		
+		node.delete()
+		assert "notindexed" not in names( RootNamespace )
+		
+		cmds.undo()
+		assert "notindexed" in names( RootNamespace )
+		
+		# removing the index removes its callbacks, it is recreated on demand
+		import mrv.maya.ns as nsm
+		nsm._removeNamespaceIndex()
+		assert nsm._namespaceIndexInstance is None
+		assert "notindexed" in names( RootNamespace )
+		assert nsm._namespaceIndexInstance is not None
+	
+	@with_undo
+	@with_scene('namespace.ma')
+	def test_bulkOperations( self ):
+		numns = len( RootNamespace.childrenDeep() )
+		
+		# FIND UNIQUE
+		#############
+		existingns = RootNamespace.children()[ 0 ]
+		uniques = Namespace.findUniqueMany( ( existingns, existingns, ":bulk" ) )
+		assert len( set( uniques ) ) == 3
+		for ns in uniques:
+			assert not ns.exists()
+		assert uniques[ 0 ] == Namespace.findUnique( existingns )
+		
+		# CREATE
+		########
+		names = [ ":bulk:a", ":bulk:b:c", "bulk:a", existingns ]
+		created = Namespace.createMany( names )
+		assert len( created ) == len( names )
+		for ns in created:
+			assert ns.exists()
+		assert len( RootNamespace.childrenDeep() ) == numns + 4
+		
+		cmds.undo()
+		assert not Namespace( ":bulk" ).exists() and existingns.exists()
+		cmds.redo()
+		assert Namespace( ":bulk:b:c" ).exists()
+		
+		# MOVE
+		######
+		node = nt.createNode( "bulk:a:node", "transform" )
+		self.failUnlessRaises( ValueError, Namespace.moveNodesMany, ( ( ":doesnotexist", ":bulk" ), ) )
+		self.failUnlessRaises( ValueError, Namespace.moveNodesMany, ( ( ":bulk:a", ":new" ), ), autocreate = False )
+		assert node.name() == "bulk:a:node"
+		
+		Namespace.moveNodesMany( ( ( ":bulk:a", ":bulk:b" ), ( ":bulk:b", ":moved:target" ) ) )
+		assert node.name() == "moved:target:node"
+		cmds.undo()
+		assert node.name() == "bulk:a:node" and not Namespace( ":moved" ).exists()
+		
+		# DELETE
+		########
+		self.failUnlessRaises( ValueError, Namespace.deleteMany, ( RootNamespace, ) )
+		self.failUnlessRaises( ValueError, Namespace.deleteMany, ( ":bulk", ), move_to_namespace = ":bulk:b:new" )
+		
+		Namespace( ":bulk:b:c" ).setCurrent()
+		Namespace.deleteMany( ( ":bulk", ":doesnotexist" ), move_to_namespace = ":trash" )
+		assert not Namespace( ":bulk" ).exists()
+		assert node.name() == "trash:node"
+		assert Namespace.current() == RootNamespace
+		
+		cmds.undo()
+		assert Namespace( ":bulk:b:c" ).exists() and node.name() == "bulk:a:node"
+		assert not Namespace( ":trash" ).exists()
@@ -172,13 +172,14 @@ class TestReferenceRunner( unittest.TestCase ):
 			for dag in range(2):
 				for assemblies in range(2):
 					for air in range(2):
-						for predicate_var in (True, False):
+						for predicate_var, members in ((True, False), (False, False), (True, True), (False, True)):
 							predicate = lambda n: predicate_var
 							try:
 								node_list = list(ref.iterNodes(asNode=asNode, dag=dag, 
 																assemblies=assemblies, 
 																assembliesInReference=air, 
-																predicate=predicate ))
+																predicate=predicate, 
+																members=members ))
 							except ValueError:
 								continue
 							# END handle unsupported combinations
@@ -198,6 +199,19 @@ class TestReferenceRunner( unittest.TestCase ):
 				# END for each assembly value
 			# END for each dag value
 		# END for each asNode value
+		
+		# member iteration only yields nodes of the full iteration
+		for dag in range(2):
+			all_nodes = set(str(n) for n in ref.iterNodes(dag=dag))
+			member_nodes = [str(n) for n in ref.iterNodes(dag=dag, members=True)]
+			assert len(member_nodes) == len(set(member_nodes))
+			assert set(member_nodes).issubset(all_nodes)
+			if ref.isLoaded() and dag:
+				assert member_nodes
+			
+			assert len(list(ref.iterNodes(nt.api.MFn.kMesh, dag=dag, members=True))) == len([n for n in ref.iterNodes(dag=dag, members=True) if n.apiType() == nt.api.MFn.kMesh])
+		# END for each dag value
+		self.failUnlessRaises(ValueError, list, ref.iterNodes(members=True, underworld=True))
 	
 	
 	def _assert_ref_node(self, rfn):
@@ -316,3 +330,86 @@ class TestReferenceRunner( unittest.TestCase ):
 			assert not sr.exists()
 		# END remove subref
 
+		
+	@with_scene('ref2re.ma')
+	def test_referenceTree(self):
+		fr = FileReference
+		
+		def assert_tree_matches_scene():
+			tree = fr.referenceTree()
+			assert tree.roots() == [r._refnode for r in listReferences()]
+			for ref in fr.lsDeep():
+				rfn = ref._refnode
+				assert tree.contains(rfn)
+				assert tree.path(rfn) == ref.path()
+				assert tree.path(rfn, copynumber=1) == ref.path(copynumber=1)
+				assert tree.namespace(rfn) == ref.namespace()
+				assert tree.isLoaded(rfn) == ref.isLoaded()
+				assert tree.isLocked(rfn) == ref.isLocked()
+				assert tree.referenceNodeFromPath(ref.path(copynumber=1)) == rfn
+				
+				parentrfn = cmds.referenceQuery(rfn, rfn=1, p=1) or None
+				assert tree.parent(rfn) == parentrfn
+				assert tree.children(rfn) == [r._refnode for r in ref.children()]
+				
+				# compare with maya directly, as children are served from the tree
+				childpaths = [tree.path(c, copynumber=1) for c in tree.children(rfn)]
+				assert childpaths == [make_path(p) for p in (cmds.file(ref.path(copynumber=1), q=1, r=1) or list())]
+			# END for each reference
+			return tree
+		# END utility
+		
+		tree = assert_tree_matches_scene()
+		assert len(tree.roots()) == 2
+		
+		# queries are served from the tree
+		tlr = listReferences()[0]
+		assert len(fr.ls(rootReference=tlr)) == 2
+		assert len(fr.ls(rootReference=tlr.path(copynumber=1))) == 2
+		assert fr.ls(rootReference=tlr) == tlr.children()
+		assert tlr.children()[0].parent() == tlr
+		assert len(fr.lsDeep()) == 6
+		
+		# unloading drops the children, loading brings them back
+		tlr.setLoaded(False)
+		tree = assert_tree_matches_scene()
+		assert not tree.isLoaded(tlr._refnode)
+		
+		tlr.setLoaded(True)
+		tree = assert_tree_matches_scene()
+		assert tree.isLoaded(tlr._refnode) and len(tree.children(tlr._refnode)) == 2
+		
+		# creation and removal
+		newref = createReference(get_maya_file("sphere.ma"))
+		tree = assert_tree_matches_scene()
+		assert newref._refnode in tree.roots()
+		
+		newref.remove()
+		tree = assert_tree_matches_scene()
+		assert len(tree.roots()) == 2
+		
+		# namespace changes
+		tlr.setNamespace("renamed")
+		assert_tree_matches_scene()
+		
+		# replacing a reference changes its path and children, and may renumber others
+		otlr = listReferences()[1]
+		children = fr.ls(rootReference=tlr)
+		tlr.replace(get_maya_file("sphere.ma"))
+		tree = assert_tree_matches_scene()
+		assert tree.path(tlr._refnode).basename() == "sphere.ma"
+		assert len(fr.lsDeep()) == 6 - len(children) + len(fr.ls(rootReference=tlr))
+		
+		tlr.replace(otlr)
+		tree = assert_tree_matches_scene()
+		assert len(fr.ls(rootReference=tlr)) == len(fr.ls(rootReference=otlr))
+		
+		# reloading a loaded reference rereads it
+		tlr.setLoaded(True)
+		assert tlr.isLoaded()
+		cmds.file(loadReference=tlr._refnode)
+		assert_tree_matches_scene()
+		
+		# scene changes
+		mrvmaya.Scene.new(force=True)
+		assert not fr.referenceTree().roots() and not fr.lsDeep()
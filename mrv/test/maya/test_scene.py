@@ -2,6 +2,7 @@
 """ Test the scene methods """
 from mrv.test.maya import *
 from mrv.maya.scene import *
+from mrv.cmd.base import SpawnedJobPool
 import mrv.maya.env as env
 from mrv.path import BasePath, make_path
 import mrv.maya.ref as ref
@@ -153,4 +154,58 @@ class TestScene( unittest.TestCase ):
 		assert len(list(esref.iterNodes(api.MFn.kMesh))) == 1
 		
 		shutil.rmtree( tmpdir )	# cleanup
-
+		
+	def test_exportAsync( self ):
+		import mrv.maya.scene as scene
+		tmpdir = make_path( tempfile.mkdtemp() )
+		try:
+			# job files roundtrip
+			jobfile = tmpdir / "job"
+			options = dict( preserveReferences = True, force = False, count = 2, ratio = 0.5, name = "some thing" )
+			scene._writeExportJob( jobfile, "source.mb", "out put.ma", "mayaAscii", [ "a", "|b|c" ], options )
+			assert scene._readExportJob( jobfile ) == ( "source.mb", "out put.ma", "mayaAscii", [ "a", "|b|c" ], options )
+			scene._writeExportJob( jobfile, "source.mb", "output.ma", "mayaAscii", None, dict() )
+			assert scene._readExportJob( jobfile )[ 3 ] is None
+			self.failUnlessRaises( ValueError, scene._writeExportJob, jobfile, "s", "o", "mayaAscii", None, dict( flag = object() ) )
+			
+			# workers run our maya version, without altering the class defaults
+			assert scene.SceneExportCommand._exec_arguments() == [ "%g" % env.appVersion()[ 0 ] ]
+			assert scene.SceneExportCommand._exec_args == list()
+			
+			Scene.new( force = 1 )
+			spheres = [ cmds.polySphere()[ 0 ] for i in range( 3 ) ]
+			self.failUnlessRaises( RuntimeError, Scene.exportAsync, [ ( tmpdir / "invalid.ext", None ) ] )
+			
+			exports = [ ( tmpdir / ( "sphere%i.ma" % i ), [ s ] ) for i, s in enumerate( spheres ) ]
+			exports.append( ( tmpdir / "all.mb", None ) )
+			jobs = Scene.exportAsync( exports, pool = SpawnedJobPool( SceneExportCommand, max_workers = 2 ) )
+			assert len( jobs ) == len( exports )
+			
+			# the session is not blocked - we can change the scene right away
+			cmds.delete( spheres )
+			
+			for job, ( outputFile, nodes ) in zip( jobs, exports ):
+				assert make_path( job.result( timeout = 600 ) ) == outputFile.abspath()
+				assert job.progress() == 1.0 and job.error() is None
+				assert outputFile.isfile()
+			# END for each job
+			
+			# the temporary files are removed once all jobs are done
+			jobdir = make_path( jobs[ 0 ].jobfile ).dirname()
+			assert jobs[ 0 ].done() and not jobdir.exists()
+			
+			# it truly exported our sphere
+			Scene.new( force = 1 )
+			esref = ref.createReference( exports[ 0 ][ 0 ] )
+			assert len( list( esref.iterNodes( api.MFn.kMesh ) ) ) == 1
+			
+			# saved scenes are copied, as they may be saved again meanwhile
+			scenepath = Scene.save( tmpdir / "saved.ma" )
+			jobs = Scene.exportAsync( [ ( tmpdir / "savedexport.ma", None ) ] )
+			source = make_path( scene._readExportJob( jobs[ 0 ].jobfile )[ 0 ] )
+			assert source != scenepath and source.ext() == ".ma"
+			assert jobs[ 0 ].result( timeout = 600 )
+		finally:
+			Scene.new( force = 1 )
+			shutil.rmtree( tmpdir )
+		# END cleanup
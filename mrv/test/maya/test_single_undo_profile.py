@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import mrv.test.maya.util as tutil
+
+class TestUndoProfile( tutil.StandaloneTestBase ):
+	envvarname = 'MRV_UNDO_PROFILE'
+	prev_val = None
+	
+	def setup_environment(self):
+		self.prev_val = os.environ.get(self.envvarname, "0") 
+		os.environ[self.envvarname] = "1"
+		
+	def undo_setup_environment(self):
+		os.environ[self.envvarname] = self.prev_val
+		
+	def post_standalone_initialized(self):
+		import maya.cmds as cmds
+		import mrv.maya.undo as undo
+		import mrv.maya.nt as nt
+		
+		profiler = undo.profiler()
+		assert profiler is not None
+		profiler.reset()
+		
+		p = nt.Node("persp")
+		p.tx.msetDouble(10.0)
+		p.ty.msetDouble(10.0)
+		
+		fstats = profiler.functionStats()
+		assert len(fstats) == 1
+		name, stats = fstats.items()[0]
+		assert name.endswith('wrappedSetAttr')
+		assert stats['calls'] == 2 and stats['operations'] == 2
+		
+		ostats = profiler.operationStats()['GenericOperation']
+		assert ostats['count'] == 2
+		cmds.undo()
+		cmds.redo()
+		# a single fast operation may not take measurable time
+		assert ostats['undoCalls'] == 1 and ostats['redoCalls'] == 1
+		assert ostats['undoTime'] >= 0.0 and ostats['redoTime'] >= 0.0
+		
+		assert 'wrappedSetAttr' in profiler.report()
+		
+		filepath = tempfile.mktemp(suffix='.json')
+		assert profiler.writeJSON(filepath) == filepath
+		assert os.path.getsize(filepath)
+		os.remove(filepath)
@@ -7,6 +7,7 @@ from mrv.maya.nt import *
 
 import maya.cmds as cmds
 import maya.OpenMaya as api
+from mrv.util import Call
 
 import sys
 
@@ -294,3 +295,199 @@ class TestUndoQueue( unittest.TestCase ):
 		# END for each decorator
 		
 
+	@with_undo
+	def test_operation_stack_order(self):
+		calls = list()
+		undo.startUndo()
+		try:
+			op = undo.GenericOperationStack()
+			for i in range(3):
+				op.addCmd(Call(calls.append, i), Call(calls.append, -i))
+			# END for each call
+			op.doIt()
+			assert calls == [0, 1, 2]
+			op.undoIt()
+			assert calls[3:] == [-2, -1, 0]
+			
+			op = undo.GenericOperationStack()
+			for i in range(3):
+				op.addCmdAndCall(Call(calls.append, i), Call(calls.append, -i))
+			# END for each call
+			del(calls[:])
+			op.undoIt()
+			assert calls == [-2, -1, 0]
+		finally:
+			undo.undoAndClear()
+			undo.endUndo()
+		# END assure stack is restored
+		
+	@with_undo
+	def test_memory_accounting(self):
+		mrvmaya.Mel.flushUndo()
+		assert undo.memoryLimit() == (0, False)
+		info = undo.stackInfo()
+		assert info['pendingOperations'] == 0
+		base_steps = info['steps']
+		
+		payload = 'x' * 100000
+		def push_payload():
+			undo.startUndo()
+			op = undo.GenericOperation()
+			op.setDoitCmd(len, payload)
+			op.setUndoitCmd(len, payload)
+			op.doIt()
+			assert undo.stackInfo()['pendingBytes'] > len(payload)
+			undo.endUndo()
+		# END utility
+		
+		push_payload()
+		info = undo.stackInfo()
+		assert info['pendingOperations'] == 0
+		assert info['steps'] == base_steps + 1
+		assert info['stepBytes'] > len(payload)
+		
+		# evict the oldest data once we are above the limit - each step 
+		# accounts for the payload twice
+		limit = len(payload) * 5
+		undo.setMemoryLimit(limit, evict=True)
+		assert undo.memoryLimit() == (limit, True)
+		try:
+			for i in range(4):
+				push_payload()
+			# END for each step
+			info = undo.stackInfo()
+			assert info['steps'] == base_steps + 5
+			assert info['evictedSteps'] == 3
+			assert info['stepBytes'] <= limit
+			
+			# undoing evicted steps does nothing, but works
+			for i in range(5):
+				cmds.undo()
+		finally:
+			undo.setMemoryLimit(0)
+		# END assure limit is reset
+		mrvmaya.Mel.flushUndo()
+		
+	@with_undo
+	def test_callAtScopeEnd(self):
+		calls = list()
+		
+		# no scope - called immediately
+		undo.callAtScopeEnd(calls.append, 0)
+		assert calls == [0]
+		
+		persp = Node("persp")
+		@undoable
+		def inner():
+			undo.callAtScopeEnd(persp.tx.msetFloat, 5.0)
+			undo.callAtScopeEnd(calls.append, 1)
+			assert calls == [0]
+			
+		@undoable
+		def outer():
+			inner()
+			assert calls == [0]
+			persp.ty.msetFloat(4.0)
+		
+		ttx, tty = persp.tx.asFloat(), persp.ty.asFloat()
+		outer()
+		assert calls == [0, 1]
+		assert persp.tx.asFloat() == 5.0 and persp.ty.asFloat() == 4.0
+		
+		# operations of queued calls are part of the same undo step
+		cmds.undo()
+		assert persp.tx.asFloat() == ttx and persp.ty.asFloat() == tty
+		cmds.redo()
+		assert persp.tx.asFloat() == 5.0
+		
+		# failing calls do not break the scope
+		@undoable
+		def failing():
+			undo.callAtScopeEnd(int, "no int")
+			undo.callAtScopeEnd(calls.append, 2)
+		failing()
+		assert calls[-1] == 2 and sys._maya_stack_depth == 0
+		
+	@with_undo
+	def test_transaction(self):
+		mrvmaya.Scene.new(force=1)
+		assert undo.Transaction.active() is None
+		
+		t = undo.Transaction()
+		t.begin()
+		t.begin()	# doesn't matter
+		try:
+			assert undo.Transaction.active() is t
+			nodes = [createNode("t%i" % i, "transform") for i in range(3)]
+			assert len([n for n in nodes if n.isValid()]) == 3
+			dgnode = createNode("dgnode", "network")
+			
+			nodes[1] = nodes[1].reparent(nodes[0])
+			assert nodes[1].parent() == nodes[0]
+			
+			# deferred edits
+			nodes[2].rename("renamed")
+			nodes[0].tx.mconnectTo(nodes[2].tx)
+			dgnode.delete()
+			assert dgnode.isValid()
+			assert not nodes[0].tx.misConnectedTo(nodes[2].tx)
+			
+			t.flush()
+			assert not dgnode.isValid()
+			assert nodes[2].basename() == "renamed"
+			assert nodes[0].tx.misConnectedTo(nodes[2].tx)
+			
+			# other operations apply the queued edits first
+			nodes[0].ty.mconnectTo(nodes[2].ty)
+			nodes[0].ty.msetFloat(5.0)
+			assert nodes[0].ty.misConnectedTo(nodes[2].ty)
+		finally:
+			t.end()
+		# END assure transaction ends
+		assert undo.Transaction.active() is None
+		
+		# everything is undone in one step
+		cmds.undo()
+		assert not nodes[0].isValid() and not nodes[2].isValid()
+		assert dgnode.isAlive() and not dgnode.isValid()
+		
+		cmds.redo()
+		assert nodes[0].isValid() and nodes[2].basename() == "renamed"
+		assert not dgnode.isValid()
+		assert nodes[0].ty.misConnectedTo(nodes[2].ty)
+		
+		# ABORT
+		#######
+		# failing with blocks discard their pending edits, including flushed ones
+		def failing():
+			t = undo.Transaction()
+			t.__enter__()
+			try:
+				createNode("aborted", "transform")
+				t.flush()
+				nodes[2].rename("abortedrename")
+				raise ValueError("failure")
+			except:
+				if not t.__exit__(*sys.exc_info()):
+					raise
+			# END emulate with statement
+		# END failing
+		self.failUnlessRaises(ValueError, failing)
+		assert undo.Transaction.active() is None
+		assert not cmds.objExists("aborted")
+		assert nodes[2].basename() == "renamed"
+		
+		# name clashes within transactions leave no stray nodes behind
+		createNode("clash", "network")
+		t = undo.Transaction()
+		t.begin()
+		try:
+			self.failUnlessRaises(NameError, createNode, "|parent|clash", "transform", renameOnClash=False)
+			createNode("afterclash", "network")
+		finally:
+			t.end()
+		# END assure transaction ends
+		assert cmds.objExists("afterclash")
+		assert not cmds.objExists("parent") and not cmds.objExists("clash1")
+		
+		
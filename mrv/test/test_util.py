@@ -6,6 +6,10 @@ import mrv
 from mrv.util import *
 from mrv.interface import *
 import re
+import os
+import time
+import shutil
+import tempfile
 import weakref
 import mrv.info as info
 
@@ -302,3 +306,48 @@ class TestDAGTree( unittest.TestCase ):
 			sm = fun(mrv.__file__)
 			assert len(sm) and isinstance(sm, (list, set))
 		#END for each function to test
+		
+	def test_approximate_size(self):
+		data = dict(a=range(100), b="x" * 1000)
+		assert approximateSize("x" * 1000) >= 1000
+		# nested containers are included up to the given depth
+		assert approximateSize(data, 0) < approximateSize(data, 1) < approximateSize(data, 2)
+		assert approximateSize(data, 2) > approximateSize(data["b"]) + approximateSize(data["a"], 0)
+		
+	def test_blob_store(self):
+		tmpdir = tempfile.mkdtemp()
+		try:
+			store = BlobStore(os.path.join(tmpdir, "blobs"))
+			assert not list(store.digests())
+			
+			data = "hello world" * 1000
+			digest = store.put(data)
+			assert digest == BlobStore.digest(data)
+			assert store.has(digest)
+			assert store.path(digest).startswith(store.root())
+			assert list(store.digests()) == [digest]
+			
+			# blobs are memory mapped
+			blob = store.open(digest)
+			assert len(blob) == len(data) and blob[:5] == "hello"
+			blob.close()
+			assert store.read(digest) == data
+			
+			# equal content is written only once
+			mtime = os.path.getmtime(store.path(digest))
+			time.sleep(0.01)
+			assert store.put(data) == digest
+			assert os.path.getmtime(store.path(digest)) == mtime
+			
+			# empty blobs work as well
+			edigest = store.put('')
+			assert store.read(edigest) == ''
+			assert len(list(store.digests())) == 2
+			
+			store.remove(digest)
+			assert not store.has(digest)
+			store.remove(digest)
+			self.failUnlessRaises(IOError, store.open, digest)
+		finally:
+			shutil.rmtree(tmpdir)
+		# END cleanup
@@ -10,15 +10,16 @@ from interface import iDuplicatable
 from path import make_path
 
 import os
+import sys
 import logging
 log = logging.getLogger("mrv.maya.ui.util")
 
 __docformat__ = "restructuredtext"
 __all__ = ("decodeString", "decodeStringOrList", "capitalize", "uncapitalize", 
-	"pythonIndex", "copyClsMembers", "packageClasses", "iterNetworkxGraph", 
+	"pythonIndex", "approximateSize", "copyClsMembers", "packageClasses", "iterNetworkxGraph", 
            "Call", "CallAdv", "WeakInstFunction", "Event", "EventSender", 
            "InterfaceMaster", "Singleton", "CallOnDeletion", 
-           "DAGTree", "PipeSeparatedFile", "MetaCopyClsMembers", "And", "Or", 
+           "DAGTree", "PipeSeparatedFile", "BlobStore", "MetaCopyClsMembers", "And", "Or", 
            "list_submodules", "list_subpackages") 
            
 
@@ -79,6 +80,41 @@ def pythonIndex(index, length):
 	if index > -1: return index
 	return length + index			# yes, length be better 1 or more ;)
 
+_getsizeof = getattr(sys, 'getsizeof', None)		# python 2.6 and newer
+
+def approximateSize(obj, depth=2):
+	""":return: approximate size of obj in bytes, including the items of builtin 
+		containers up to the given depth
+	:note: the size of data owned by maya cannot be determined"""
+	size = None
+	if _getsizeof is not None:
+		try:
+			size = _getsizeof(obj)
+		except TypeError:
+			pass
+	# END use getsizeof
+	if size is None:
+		if isinstance(obj, basestring):
+			size = len(obj) + 40
+		else:
+			size = 64
+		# END handle string
+	# END estimate size
+
+	if depth:
+		depth -= 1
+		if isinstance(obj, dict):
+			for key, value in obj.iteritems():
+				size += approximateSize(key, depth) + approximateSize(value, depth)
+			# END for each item
+		elif isinstance(obj, (tuple, list, Deque, set, frozenset)):
+			for item in obj:
+				size += approximateSize(item, depth)
+			# END for each item
+		# END handle containers
+	# END handle depth
+	return size
+
 def copyClsMembers(sourcecls, destcls, overwritePrefix = None, forbiddenMembers = list(), copyNamespaceGlobally=None):
 	"""Copy the members or sourcecls to destcls while ignoring member names in forbiddenMembers
 	It will only copy mebers of this class, not its base classes
@@ -829,6 +865,138 @@ class PipeSeparatedFile(object):
 		self._fileobj.write(self._formatstr % tokens)
 
 
+class BlobStore(object):
+	"""Stores blobs of data as files within a root directory, each of which is named
+	after the sha1 of its content. Hence a blob is written only if its content 
+	changed, and equal blobs are stored only once.
+	
+	**Layout**:
+	
+		root/ab/ab0123...
+		...
+	"""
+	__slots__ = '_root'
+	
+	def __init__(self, root):
+		"""Initialize the instance
+		
+		:param root: directory to contain the blobs. It will be created once 
+			the first blob is written"""
+		self._root = make_path(root)
+		
+	#{ Interface
+	
+	@classmethod
+	def digest(cls, data):
+		""":return: hex digest identifying the given data string"""
+		try:
+			from hashlib import sha1
+		except ImportError:
+			# python 2.4
+			from sha import new as sha1
+		# END handle hashlib
+		return sha1(data).hexdigest()
+	
+	def root(self):
+		""":return: path to our root directory"""
+		return self._root
+		
+	def path(self, digest):
+		""":return: path to the file storing the blob with the given digest"""
+		return self._root / digest[:2] / digest
+		
+	def has(self, digest):
+		""":return: True if a blob with the given digest exists"""
+		return os.path.isfile(self.path(digest))
+		
+	def put(self, data):
+		"""Store the given data string unless a blob with the same content exists
+		
+		:return: digest identifying the blob
+		:raise OSError:"""
+		digest = self.digest(data)
+		path = self.path(digest)
+		if os.path.isfile(path):
+			return digest
+		# END blob exists
+		
+		dirpath = os.path.dirname(path)
+		if not os.path.isdir(dirpath):
+			os.makedirs(dirpath)
+		# END create directory
+		
+		# write a temporary file first, readers never see partial blobs this way
+		tmppath = "%s.tmp%i" % (path, os.getpid())
+		fp = open(tmppath, 'wb')
+		try:
+			fp.write(data)
+		finally:
+			fp.close()
+		# END assure file is closed
+		
+		try:
+			os.rename(tmppath, path)
+		except OSError:
+			# on windows, the blob might have been written by someone else meanwhile
+			os.remove(tmppath)
+			if not os.path.isfile(path):
+				raise
+		# END handle rename
+		return digest
+		
+	def open(self, digest):
+		""":return: read-only memory map of the blob with the given digest. It supports 
+			the file protocol as well as slicing. Empty blobs are returned as StringIO 
+			instance
+		:raise IOError: if the blob does not exist"""
+		import mmap
+		import cStringIO
+		fp = open(self.path(digest), 'rb')
+		try:
+			if os.fstat(fp.fileno()).st_size == 0:
+				return cStringIO.StringIO()
+			# END handle empty files
+			return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+		finally:
+			fp.close()
+		# END assure file is closed
+		
+	def read(self, digest):
+		""":return: data string of the blob with the given digest
+		:raise IOError: if the blob does not exist"""
+		fp = open(self.path(digest), 'rb')
+		try:
+			return fp.read()
+		finally:
+			fp.close()
+		# END assure file is closed
+		
+	def remove(self, digest):
+		"""Remove the blob with the given digest if it exists"""
+		path = self.path(digest)
+		if os.path.isfile(path):
+			os.remove(path)
+		# END remove blob
+		
+	def digests(self):
+		""":return: iterator yielding the digests of all stored blobs"""
+		if not os.path.isdir(self._root):
+			return
+		# END handle no root
+		for dirname in os.listdir(self._root):
+			dirpath = os.path.join(self._root, dirname)
+			if len(dirname) != 2 or not os.path.isdir(dirpath):
+				continue
+			# END skip foreign items
+			for filename in os.listdir(dirpath):
+				if filename.startswith(dirname) and '.' not in filename:
+					yield filename
+			# END for each file
+		# END for each directory
+		
+	#} END interface
+
+
 class MetaCopyClsMembers(type):
 	"""Meta class copying members from given classes onto the type to be created
 	it will read the following attributes from the class dict: